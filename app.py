@@ -8,14 +8,9 @@ from database.utils import create_projects_table, create_bearing_lookup, update_
 from datetime import timedelta
 from db_admin import register_db_admin_routes
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
-)
+# Configure logging (queued to a listener thread; levels from LOG_LEVEL / LOG_LEVELS)
+from services.logging_config import configure_logging
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -27,11 +22,8 @@ def create_app():
     app = Flask(__name__, 
                 static_folder=static_folder)
     
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(message)s'
-    )
+    # Configure logging (no-op unless this is a new worker process)
+    configure_logging()
     logger = logging.getLogger(__name__)
     logger.info("Starting Flask application...")
     logger.info(f"Static folder: {static_folder}")
@@ -43,6 +35,22 @@ def create_app():
     app.config['SESSION_COOKIE_HTTPONLY'] = True  # Prevent JavaScript access to session cookie
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'  # CSRF protection
     
+    # Per-route latency / SQL metrics, served at /metrics
+    from services.metrics import init_metrics
+    init_metrics(app)
+    
+    # Admin-triggered or sampled cProfile of single requests (/db-admin/profiles)
+    from services.profiling import init_profiling
+    init_profiling(app)
+    
+    # tracemalloc per request when MEMORY_TRACKING=1 (/db-admin/memory)
+    from services.memory_tracking import init_memory_tracking
+    init_memory_tracking(app)
+    
+    # Per-class concurrency limits so heavy endpoints cannot take every thread (ADMISSION_LIMITS)
+    from services.admission import init_admission_control
+    init_admission_control(app)
+    
     # Enable CORS with more options for production
     CORS(app, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
     
@@ -86,11 +94,11 @@ def create_app():
             has_data = False
             for table in tables:
                 table_name = table[0]
-                cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                count = cursor.fetchone()[0]
-                if count > 0:
+                # Only existence matters, so stop at the first row instead of counting
+                cursor.execute(f'SELECT 1 FROM "{table_name}" LIMIT 1')
+                if cursor.fetchone():
                     has_data = True
-                    logger.info(f"Found {count} records in {table_name} - skipping schema.sql")
+                    logger.info(f"Found records in {table_name} - skipping schema.sql")
                     break
             
             if not has_data:
@@ -0,0 +1,76 @@
+"""Customer matcher scaling benchmark.
+
+Simulates importing a register from a new branch: every existing customer
+name is misspelt a few ways and mixed with unrelated names, then matched
+against the current Customers table with 1..N worker processes.
+
+    python benchmarks/bench_customer_matcher.py --names 20000 --workers 1 2 4 8
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import get_db_connection
+from services.customer_matcher import match_names
+
+
+def _misspell(name, rng):
+    chars = list(name)
+    pos = rng.randrange(len(chars))
+    edit = rng.choice(('drop', 'swap', 'replace', 'suffix'))
+    if edit == 'drop' and len(chars) > 4:
+        del chars[pos]
+    elif edit == 'swap' and pos < len(chars) - 1:
+        chars[pos], chars[pos + 1] = chars[pos + 1], chars[pos]
+    elif edit == 'replace':
+        chars[pos] = rng.choice(string.ascii_lowercase)
+    else:
+        chars.extend(rng.choice((' Pvt Ltd', ' LLC', ' Co.', ' Industries')))
+    return ''.join(chars)
+
+
+def build_names(customers, count, seed=0):
+    rng = random.Random(seed)
+    words = [w for c in customers for w in c['primary_name'].split() if len(w) > 3]
+    names = []
+    while len(names) < count:
+        if rng.random() < 0.7:
+            names.append(_misspell(rng.choice(customers)['primary_name'], rng))
+        else:
+            names.append(' '.join(rng.sample(words, 3)))
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--names', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--threshold', type=float, default=0.88)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    customers = [{'id': row[0], 'primary_name': row[1]}
+                 for row in conn.execute('SELECT id, primary_name FROM Customers ORDER BY id')]
+    conn.close()
+    names = build_names(customers, args.names)
+    print(f"{len(names)} names against {len(customers)} customers, {os.cpu_count()} CPUs")
+
+    baseline = None
+    for workers in sorted(set(args.workers)):
+        started = time.perf_counter()
+        results = match_names(names, customers, args.threshold, workers=workers, min_names=0)
+        elapsed = time.perf_counter() - started
+        if baseline is None:
+            baseline = (elapsed, results)
+        matches = sum(1 for match_id, _ in results if match_id)
+        print(f"workers={workers:<3} {elapsed:7.2f}s  speedup x{baseline[0] / elapsed:4.1f}  "
+              f"matched={matches}  identical={results == baseline[1]}")
+
+
+if __name__ == '__main__':
+    main()
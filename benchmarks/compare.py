@@ -0,0 +1,68 @@
+"""Compare two benchmark reports from benchmarks/run.py.
+
+    python benchmarks/compare.py benchmarks/results/before.json benchmarks/results/after.json
+
+Prints the median of every benchmark and scale both reports have, with the
+change. Exits 1 when any median grew by more than --threshold (a fraction)
+and by more than --min-ms, so small timings jittering around do not count.
+"""
+import sys
+import json
+import argparse
+
+
+def compare(before, after, threshold=0.2, min_ms=1.0):
+    """Rows of (scale, name, before_ms, after_ms, change, regressed) for every shared measurement."""
+    rows = []
+    for scale, results in after['scales'].items():
+        previous = before['scales'].get(scale)
+        if previous is None:
+            continue
+        for name, timing in results['benchmarks'].items():
+            old = previous['benchmarks'].get(name, {})
+            if 'median' not in timing or 'median' not in old:
+                continue
+            before_ms, after_ms = old['median'] * 1000, timing['median'] * 1000
+            change = after_ms / before_ms - 1 if before_ms else 0.0
+            regressed = change > threshold and after_ms - before_ms > min_ms
+            rows.append((scale, name, before_ms, after_ms, change, regressed))
+    return rows
+
+
+def _describe(report):
+    env = report.get('environment', {})
+    commit = (env.get('commit') or 'unknown')[:10] + (' (dirty)' if env.get('dirty') else '')
+    return f"{report.get('created_at')} {commit} on {env.get('machine')}, Python {env.get('python')}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown that counts as a regression')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='Ignore changes smaller than this')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"before: {_describe(before)}")
+    print(f"after:  {_describe(after)}")
+    if before.get('environment', {}).get('machine') != after.get('environment', {}).get('machine'):
+        print("warning: the reports come from different machines")
+
+    rows = compare(before, after, args.threshold, args.min_ms)
+    print(f"\n{'scale':>6}  {'benchmark':<32}{'before ms':>12}{'after ms':>12}{'change':>9}")
+    for scale, name, before_ms, after_ms, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{scale:>6}  {name:<32}{before_ms:12.1f}{after_ms:12.1f}{change:+9.0%}{flag}")
+
+    regressions = sum(1 for row in rows if row[5])
+    if regressions:
+        print(f"\n{regressions} regression(s) over {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
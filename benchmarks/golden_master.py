@@ -0,0 +1,238 @@
+"""Golden-master check for replacement pricing engines.
+
+Generates randomized, valid fan calculator forms from the live catalog
+(FanWeights, VendorWeightDetails, MotorPrices, BearingLookup,
+DrivePackLookup), prices every form with calculations.price_fan (the
+code behind /calculate_fan) and with each candidate engine, and diffs
+every output field. Forms cover the branches a faster engine is most likely to get
+wrong: mixed MS/SS splits, custom materials, custom vendor rates (with the
+2.5/3.0/4.0 SS304/SS316/aluminium multipliers), bearing doubling off
+arrangement 4, drive packs, motor discounts, custom accessories, optional
+items and manual isolator/shaft overrides.
+
+    python benchmarks/golden_master.py --specs 5000 --engine mypackage.engine:create_engine
+
+An engine factory takes an open database connection and returns a callable
+that prices a list of forms (the JSON body /calculate_fan receives) and
+returns one result per form, shaped like legacy_result() output. Without
+--engine the legacy path is checked against itself, which reports its
+throughput and catches non-determinism. Exits 1 on any mismatch.
+"""
+import os
+import sys
+import json
+import time
+import math
+import random
+import logging
+import argparse
+import importlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculations import ACCESSORY_NAME_MAP, price_fan
+
+MATERIALS = ('ms', 'ss304', 'ss316', 'aluminium', 'mixed', 'others')
+ISOLATORS = ('not_required', 'polybond', 'dunlop')
+CUSTOM_MATERIALS = ('MS Plate', 'SS304 Sheet', 'Aluminium Casting', 'GI Sheet', 'FRP Liner')
+OPTIONAL_ITEMS = ('Silencer', 'Inspection Door', 'Drain Plug', 'Weather Cover', 'Spark Proof Coating')
+
+# Fields compared between engines; nested dicts are compared key by key
+COMPARED_FIELDS = (
+    'bare_fan_weight', 'total_weight', 'accessory_weights', 'no_of_isolators', 'shaft_diameter',
+    'accessory_weight_details', 'custom_weights', 'fabrication_cost', 'vendor_rate',
+    'vibration_isolators_price', 'bearing_price', 'drive_pack_price', 'motor_list_price',
+    'discounted_motor_price', 'motor_discount', 'optional_items_cost', 'optional_items_detail',
+    'bought_out_cost', 'total_raw_cost', 'fabrication_selling_price', 'bought_out_selling_price',
+    'total_selling_price', 'total_job_margin'
+)
+
+
+def load_catalog(conn):
+    """The catalog rows forms are drawn from."""
+    def rows(sql):
+        return [tuple(row) for row in conn.execute(sql).fetchall()]
+    columns = ['Fan Model', 'Fan Size', 'Class', 'Arrangement'] + list(ACCESSORY_NAME_MAP.values())
+    return {
+        'fans': [dict(zip(columns, row)) for row in rows(
+            'SELECT ' + ', '.join(f'"{c}"' for c in columns) + ' FROM FanWeights WHERE "Bare Fan Weight" IS NOT NULL')],
+        'vendors': [row[0] for row in rows('SELECT DISTINCT Vendor FROM VendorWeightDetails ORDER BY Vendor')],
+        'motors': rows('SELECT Brand, "Motor kW", Pole, Efficiency FROM MotorPrices ORDER BY 1, 2, 3, 4'),
+        'bearing_brands': [row[0] for row in rows('SELECT DISTINCT Brand FROM BearingLookup ORDER BY Brand')],
+        'drive_packs': [row[0] for row in rows('SELECT "Motor kW" FROM DrivePackLookup ORDER BY 1')]
+    }
+
+
+def random_form(rng, catalog):
+    """One calculator form, as the fan calculator page posts it."""
+    fan = rng.choice(catalog['fans'])
+    available = [key for key, column in ACCESSORY_NAME_MAP.items() if fan[column] is not None]
+    form = {
+        'Fan Model': fan['Fan Model'],
+        'Fan_Size': fan['Fan Size'],
+        'Class': fan['Class'],
+        'Arrangement': fan['Arrangement'],
+        'vendor': rng.choice(catalog['vendors']),
+        'material': rng.choice(MATERIALS),
+        'vibration_isolators': rng.choice(ISOLATORS),
+        'fabrication_margin': rng.choice((15, 20, 25, 30, 35)),
+        'bought_out_margin': rng.choice((10, 15, 20, 25)),
+        'bearing_brand': rng.choice(catalog['bearing_brands']),
+        'accessories': {key: rng.random() < 0.4 for key in available},
+        'customAccessories': {},
+        'optional_items': {}
+    }
+    if rng.random() < 0.25:
+        form['vendor_rate'] = rng.choice((180, 210, 245.5, 300, 380))
+    if form['material'] == 'mixed':
+        form['ms_percentage'] = rng.choice((10, 25, 40, 50, 60, 75, 90))
+    elif form['material'] == 'others':
+        for i, name in enumerate(rng.sample(CUSTOM_MATERIALS, rng.randint(1, 5))):
+            form[f'material_name_{i}'] = name
+            form[f'material_weight_{i}'] = round(rng.uniform(5, 400), 1)
+            form[f'material_rate_{i}'] = rng.choice((95, 180, 240.5, 520, 610))
+    if rng.random() < 0.2:
+        form['customAccessories'] = {'Guard': rng.choice((12, 18.5, 30)), 'Bracket': rng.choice((4, 7.5))}
+    if rng.random() < 0.2:
+        form['optional_items'] = {name: rng.choice((1500, 4200, 12500)) for name in rng.sample(OPTIONAL_ITEMS, 2)}
+    if catalog['motors'] and rng.random() < 0.9:
+        brand, kw, pole, efficiency = rng.choice(catalog['motors'])
+        form.update(motor_brand=brand, motor_kw=kw, pole=pole, efficiency=efficiency,
+                    motor_discount=rng.choice((0, 0, 10, 35.5, 60, 75)))
+    if catalog['drive_packs'] and rng.random() < 0.7:
+        form['drive_pack'] = rng.choice(catalog['drive_packs'])
+    if rng.random() < 0.1:
+        form['no_of_isolators'] = rng.choice((4, 6, 8))
+    if rng.random() < 0.1:
+        form['shaft_diameter'] = rng.choice((25, 35, 45, 55))
+    return form
+
+
+def generate_forms(conn, count, seed=0):
+    rng = random.Random(seed)
+    catalog = load_catalog(conn)
+    return [random_form(rng, catalog) for _ in range(count)]
+
+
+def legacy_result(cursor, form):
+    """Price one form with calculations.price_fan, the code /calculate_fan runs.
+
+    Returns the response fields with the nested 'weights' merged in, or
+    {'error': message} where the route answers 400.
+    """
+    result, error = price_fan(cursor, form)
+    if error:
+        return {'error': error['message']}
+    return dict(result, **result['weights'])
+
+
+def legacy_engine(conn):
+    """The current engine: one cursor round trip per lookup, form by form."""
+    cursor = conn.cursor()
+    return lambda forms: [legacy_result(cursor, form) for form in forms]
+
+
+def load_engine(path):
+    """'package.module:factory' -> factory."""
+    module, _, attr = path.partition(':')
+    if not attr:
+        raise ValueError(f"Engine must be module:factory, got {path}")
+    return getattr(importlib.import_module(module), attr)
+
+
+def diff_values(expected, actual, tolerance, path=''):
+    """Paths where actual differs from expected beyond tolerance (numbers) or at all (anything else)."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = []
+        for key in sorted(set(expected) | set(actual), key=str):
+            if key not in expected or key not in actual:
+                diffs.append((f"{path}.{key}", expected.get(key), actual.get(key)))
+            else:
+                diffs.extend(diff_values(expected[key], actual[key], tolerance, f"{path}.{key}"))
+        return diffs
+    numeric = (int, float)
+    if isinstance(expected, numeric) and isinstance(actual, numeric) \
+            and not isinstance(expected, bool) and not isinstance(actual, bool):
+        if math.isclose(expected, actual, rel_tol=0, abs_tol=tolerance):
+            return []
+        return [(path, expected, actual)]
+    return [] if expected == actual else [(path, expected, actual)]
+
+
+def compare_results(expected, actual, tolerance):
+    """Field mismatches between two results for the same form."""
+    if 'error' in expected or 'error' in actual:
+        # Both engines must refuse the same forms; the wording may differ
+        return [] if ('error' in expected) == ('error' in actual) else [('error', expected.get('error'), actual.get('error'))]
+    diffs = []
+    for field in COMPARED_FIELDS:
+        diffs.extend(diff_values(expected.get(field), actual.get(field), tolerance, field))
+    return diffs
+
+
+def _timed(engine, forms):
+    started = time.perf_counter()
+    results = engine(forms)
+    return results, time.perf_counter() - started
+
+
+def run(conn, forms, candidates, tolerance=0.01):
+    """Price forms with the legacy engine and every candidate.
+
+    Returns {name: {'seconds', 'forms_per_second', 'mismatches': [(index, diffs)]}}
+    with the legacy engine under 'legacy'.
+    """
+    expected, seconds = _timed(legacy_engine(conn), forms)
+    report = {'legacy': {'seconds': seconds, 'forms_per_second': len(forms) / seconds if seconds else None,
+                         'errors': sum(1 for r in expected if 'error' in r), 'mismatches': []}}
+    for name, factory in candidates.items():
+        results, seconds = _timed(factory(conn), forms)
+        if len(results) != len(forms):
+            raise ValueError(f"{name} returned {len(results)} results for {len(forms)} forms")
+        mismatches = [(i, diffs) for i, diffs in
+                      ((i, compare_results(e, a, tolerance)) for i, (e, a) in enumerate(zip(expected, results))) if diffs]
+        report[name] = {'seconds': seconds, 'forms_per_second': len(forms) / seconds if seconds else None,
+                        'speedup': report['legacy']['seconds'] / seconds if seconds else None,
+                        'mismatches': mismatches}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--specs', type=int, default=5000, help='Number of random forms')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', action='append', default=[], help='Candidate engine factory, module:callable')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='Largest accepted difference per numeric field')
+    parser.add_argument('--show', type=int, default=10, help='Mismatching forms to print per engine')
+    args = parser.parse_args()
+
+    # The legacy path logs every lookup, and the forms it refuses at ERROR
+    logging.disable(logging.ERROR)
+    from database import get_db_connection
+    conn = get_db_connection()
+    try:
+        forms = generate_forms(conn, args.specs, args.seed)
+        candidates = {path: load_engine(path) for path in args.engine} or {'legacy (rerun)': legacy_engine}
+        report = run(conn, forms, candidates, args.tolerance)
+    finally:
+        conn.close()
+
+    legacy = report.pop('legacy')
+    print(f"{len(forms)} forms (seed {args.seed}), {legacy['errors']} refused by the legacy engine")
+    print(f"{'legacy':<40}{legacy['forms_per_second']:>10.0f} forms/s")
+    failed = False
+    for name, result in report.items():
+        print(f"{name:<40}{result['forms_per_second']:>10.0f} forms/s  x{result['speedup']:.1f}  "
+              f"{len(result['mismatches'])} mismatching forms")
+        for index, diffs in result['mismatches'][:args.show]:
+            failed = True
+            print(f"  form {index}: {json.dumps(forms[index], sort_keys=True)}")
+            for field, expected, actual in diffs:
+                print(f"    {field}: legacy {expected!r} != {actual!r}")
+        failed = failed or bool(result['mismatches'])
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
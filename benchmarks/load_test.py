@@ -0,0 +1,479 @@
+"""Load test a local gunicorn on a synthetic dataset.
+
+Starts gunicorn with gunicorn.conf.py for each --configs WORKERSxTHREADS
+on a scratch copy of the synthetic dataset for --scale (see run.py and
+synthetic.py), drives it with --clients concurrent logged-in users for
+--duration seconds, and reports throughput, latency percentiles, errors and
+"database is locked" failures per configuration, overall and per request
+type.
+
+    python benchmarks/load_test.py --scale 1 --configs 1x4 4x1 9x2 --clients 16 --duration 60
+    python benchmarks/load_test.py --replay captured.jsonl --configs 4x2
+
+Without --replay every user loops over MIX: calculator edits, fan saves,
+dashboard loads, register and order browsing, customer 360 and directory
+pages, and the occasional Excel export or order import (upload, preview,
+apply). --think adds an exponential pause between requests (mean seconds);
+the default 0 keeps every user busy, which measures capacity.
+
+--replay sends captured requests instead, one JSON object per line:
+
+    {"offset": 1.25, "label": "fan_save", "method": "PUT", "path": "/api/projects/E1/fans/1", "json": {...}}
+
+Only "path" is required. "data" is sent form-encoded, "files" maps form
+fields to files relative to the dataset directory, and "{token}" in a path
+is the last upload token the same user received. Entries with a "user"
+number go out in file order from user number % --clients, the rest are
+dealt round-robin; none before offset seconds after the start (scaled by
+--speed; --speed 0 sends them as fast as possible). Lines without a path
+are skipped. --record writes whatever a run sends in this format, so a mix
+can be replayed against another configuration or build.
+"""
+import os
+import re
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import socket
+import sqlite3
+import tempfile
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+
+from run import ROOT, RESULTS_DIR, ensure_dataset, environment
+from golden_master import generate_forms
+
+GUNICORN_CONFIG = os.path.join(ROOT, 'gunicorn.conf.py')
+USERNAME, PASSWORD = 'loadtest', 'loadtest'
+LOCKED = b'database is locked'
+PERCENTILES = (50, 90, 95, 99)
+
+# scenario -> relative weight
+MIX = {
+    'calculator_edit': 40,
+    'fan_save': 10,
+    'dashboard': 12,
+    'register_browse': 14,
+    'orders_browse': 4,
+    'customer_360': 12,
+    'customer_list': 3,
+    'export': 4,
+    'import': 1
+}
+
+
+class Traffic:
+    """Request inputs drawn from the dataset the server runs on."""
+
+    def __init__(self, directory, seed):
+        conn = sqlite3.connect(os.path.join(directory, 'data', 'fan_pricing.db'))
+        conn.row_factory = sqlite3.Row
+        try:
+            self.forms = generate_forms(conn, 500, seed)
+            self.fans = [(row['enquiry_number'], row['fan_number'], {
+                'specifications': json.loads(row['specifications'] or '{}'),
+                'motor': json.loads(row['motor'] or '{}')
+            }) for row in conn.execute('''
+                SELECT p.enquiry_number, f.fan_number, f.specifications, f.motor
+                FROM Projects p JOIN Fans f ON f.project_id = p.id
+                WHERE json_extract(f.specifications, '$."Fan Size"') IS NOT NULL
+                  AND json_extract(f.costs, '$.total_selling_price') > 0
+                ORDER BY f.id LIMIT 200
+            ''')]
+            self.customers = [(row[0], row[1]) for row in conn.execute('SELECT id, primary_name FROM Customers ORDER BY id')]
+        finally:
+            conn.close()
+        with open(os.path.join(directory, 'register.xlsx'), 'rb') as f:
+            self.register = f.read()
+
+
+def add_user(directory):
+    """The admin account the simulated users log in with."""
+    conn = sqlite3.connect(os.path.join(directory, 'data', 'fan_pricing.db'))
+    try:
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO users (username, password, full_name, is_admin) VALUES (?, ?, ?, 1)',
+                         (USERNAME, PASSWORD, 'Load Test'))
+    finally:
+        conn.close()
+
+
+class Client:
+    """One simulated user: a logged-in session that records every request it sends."""
+
+    def __init__(self, index, base_url, started, recorder=None, directory=None):
+        self.index = index
+        self.base_url = base_url
+        self.started = started
+        self.recorder = recorder
+        self.directory = directory
+        self.session = requests.Session()
+        self.samples = []
+        self.token = None
+
+    def login(self):
+        response = self.session.post(self.base_url + '/login', data={'username': USERNAME, 'password': PASSWORD},
+                                     allow_redirects=False, timeout=60)
+        if response.status_code != 302:
+            raise RuntimeError(f"Login failed with HTTP {response.status_code}")
+
+    def send(self, label, method, path, json_body=None, data=None, files=None):
+        """Send one request; returns the response, or None when it failed to complete."""
+        if self.recorder:
+            self.recorder.write(self.index, label, method, path, json_body, data, files)
+        if '{token}' in path:
+            path = path.replace('{token}', self.token or '')
+        upload = {field: (os.path.basename(name), content) for field, (name, content) in files.items()} if files else None
+        offset = time.perf_counter() - self.started
+        status, locked, error, response = None, False, None, None
+        try:
+            response = self.session.request(method, self.base_url + path, json=json_body, data=data, files=upload,
+                                            allow_redirects=False, timeout=300)
+            status = response.status_code
+            locked = LOCKED in response.content
+            found = re.search(r'/db-admin/uploads/(\w+)/confirm', response.text) if label == 'import' else None
+            if found:
+                self.token = found.group(1)
+        except requests.RequestException as e:
+            error = type(e).__name__
+        self.samples.append({'label': label, 'offset': offset, 'seconds': time.perf_counter() - self.started - offset,
+                             'status': status, 'locked': locked, 'error': error})
+        return response
+
+
+class Recorder:
+    """Writes sent requests in the --replay format."""
+
+    def __init__(self, path, started):
+        self.file = open(path, 'w')
+        self.started = started
+        self.lock = threading.Lock()
+
+    def write(self, user, label, method, path, json_body, data, files):
+        entry = {'offset': round(time.perf_counter() - self.started, 3), 'user': user, 'label': label,
+                 'method': method, 'path': path}
+        if json_body is not None:
+            entry['json'] = json_body
+        if data is not None:
+            entry['data'] = data
+        if files:
+            entry['files'] = {field: name for field, (name, _) in files.items()}
+        with self.lock:
+            self.file.write(json.dumps(entry) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+def _search_term(rng, traffic):
+    words = [w for w in rng.choice(traffic.customers)[1].split() if len(w) > 3] or ['a']
+    return rng.choice(words)[:4]
+
+
+def calculator_edit(client, traffic, rng):
+    client.send('calculator_edit', 'POST', '/calculate_fan', json_body=rng.choice(traffic.forms))
+
+
+def fan_save(client, traffic, rng):
+    enquiry_number, fan_number, payload = rng.choice(traffic.fans)
+    client.send('fan_save', 'PUT', f'/api/projects/{enquiry_number}/fans/{fan_number}', json_body=payload)
+
+
+def dashboard(client, traffic, rng):
+    query = f'?search={_search_term(rng, traffic)}' if rng.random() < 0.2 else ''
+    client.send('dashboard', 'GET', '/api/dashboard_stats' + query)
+
+
+def register_browse(client, traffic, rng):
+    query = f'?search={_search_term(rng, traffic)}' if rng.random() < 0.3 else ''
+    client.send('register_browse', 'GET', '/api/combined-enquiries' + query)
+
+
+def orders_browse(client, traffic, rng):
+    client.send('orders_browse', 'GET', '/api/orders')
+
+
+def customer_360(client, traffic, rng):
+    client.send('customer_360', 'GET', f'/api/customers/{rng.choice(traffic.customers)[0]}')
+
+
+def customer_list(client, traffic, rng):
+    client.send('customer_list', 'GET', '/api/customers')
+
+
+def export(client, traffic, rng):
+    client.send('export', 'GET', f'/api/projects/{rng.choice(traffic.fans)[0]}/export/excel')
+
+
+def import_orders(client, traffic, rng):
+    client.token = None
+    client.send('import', 'POST', '/db-admin/upload-orders', files={'file': ('register.xlsx', traffic.register)})
+    if client.token:
+        client.send('import', 'POST', '/db-admin/uploads/{token}/confirm', data={'link_customers': '0'})
+
+
+SCENARIOS = {
+    'calculator_edit': calculator_edit,
+    'fan_save': fan_save,
+    'dashboard': dashboard,
+    'register_browse': register_browse,
+    'orders_browse': orders_browse,
+    'customer_360': customer_360,
+    'customer_list': customer_list,
+    'export': export,
+    'import': import_orders
+}
+
+
+def load_replay(path):
+    """The replayable entries of a captured request log, and how many lines were skipped."""
+    entries, skipped = [], 0
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                skipped += 1
+                continue
+            if not isinstance(entry, dict) or not isinstance(entry.get('path'), str) or not entry['path'].startswith('/'):
+                skipped += 1
+                continue
+            entries.append(entry)
+    return entries, skipped
+
+
+def _mix_user(client, traffic, seed, deadline, think):
+    rng = random.Random(seed)
+    names = list(MIX)
+    weights = [MIX[name] for name in names]
+    while time.perf_counter() < deadline:
+        SCENARIOS[rng.choices(names, weights)[0]](client, traffic, rng)
+        if think:
+            time.sleep(min(rng.expovariate(1 / think), max(0.0, deadline - time.perf_counter())))
+
+
+def _replay_user(client, entries, speed, deadline):
+    for entry in entries:
+        if time.perf_counter() >= deadline:
+            return
+        if speed and entry.get('offset'):
+            delay = client.started + entry['offset'] / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        files = None
+        if entry.get('files'):
+            files = {}
+            for field, name in entry['files'].items():
+                with open(os.path.join(client.directory, name), 'rb') as f:
+                    files[field] = (name, f.read())
+        client.send(entry.get('label') or f"{entry.get('method', 'GET')} {entry['path'].split('?')[0]}",
+                    entry.get('method', 'GET'), entry['path'], entry.get('json'), entry.get('data'), files)
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of an ascending list."""
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(samples, seconds):
+    """Throughput, latency percentiles (ms), errors and lock failures of a list of samples."""
+    latencies = sorted(s['seconds'] for s in samples if s['status'] is not None)
+    summary = {
+        'requests': len(samples),
+        'per_second': len(samples) / seconds if seconds else 0.0,
+        'errors': sum(1 for s in samples if s['error'] or s['status'] >= 400),
+        'failed_to_complete': sum(1 for s in samples if s['error']),
+        'database_locked': sum(1 for s in samples if s['locked'])
+    }
+    if latencies:
+        summary.update({f'p{p}_ms': percentile(latencies, p) * 1000 for p in PERCENTILES})
+        summary['max_ms'] = latencies[-1] * 1000
+    return summary
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(directory, workers, threads, log_path, timeout=300):
+    """gunicorn on the dataset in directory, once it answers. Returns (process, base_url)."""
+    port = _free_port()
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop('DB_PATH', None)
+    env.pop('RENDER', None)
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'app:create_app()', '--config', GUNICORN_CONFIG, '--workers', str(workers),
+         '--threads', str(threads), '--bind', f'127.0.0.1:{port}', '--chdir', directory],
+        cwd=directory, env=env, stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}, see {log_path}")
+        try:
+            if requests.get(base_url + '/login', timeout=5).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"gunicorn did not answer within {timeout}s, see {log_path}")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run_config(dataset_dir, workers, threads, args, entries=None):
+    """One load run against a fresh copy of the dataset; returns its report."""
+    scratch = tempfile.mkdtemp(prefix='tcf-load-')
+    try:
+        shutil.copytree(dataset_dir, scratch, dirs_exist_ok=True)
+        add_user(scratch)
+        traffic = Traffic(scratch, args.seed) if entries is None else None
+        log_path = os.path.join(scratch, 'gunicorn.log')
+        process, base_url = start_server(scratch, workers, threads, log_path)
+        try:
+            started = time.perf_counter()
+            recorder = Recorder(args.record, started) if args.record else None
+            clients = [Client(i, base_url, started, recorder, scratch) for i in range(args.clients)]
+            for client in clients:
+                client.login()
+            started = time.perf_counter()
+            for client in clients:
+                client.started = started
+            if recorder:
+                recorder.started = started
+            deadline = started + args.duration
+            if entries is None:
+                users = [threading.Thread(target=_mix_user, args=(client, traffic, args.seed * 1000 + i, deadline, args.think))
+                         for i, client in enumerate(clients)]
+            else:
+                queues = [[] for _ in clients]
+                for i, entry in enumerate(entries):
+                    user = entry.get('user')
+                    queues[(user if isinstance(user, int) else i) % len(clients)].append(entry)
+                users = [threading.Thread(target=_replay_user, args=(client, queue, args.speed, deadline))
+                         for client, queue in zip(clients, queues)]
+            for user in users:
+                user.start()
+            for user in users:
+                user.join()
+            elapsed = time.perf_counter() - started
+            if recorder:
+                recorder.close()
+        finally:
+            stop_server(process)
+        with open(log_path, errors='replace') as f:
+            log = f.read()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    # Requests still running after --warmup seconds are the ones measured
+    samples = [s for client in clients for s in client.samples if s['offset'] >= args.warmup]
+    measured = max(elapsed - args.warmup, 0.0)
+    by_label = defaultdict(list)
+    for sample in samples:
+        by_label[sample['label']].append(sample)
+    return {
+        'workers': workers,
+        'threads': threads,
+        'seconds': measured,
+        'overall': summarize(samples, measured),
+        'by_label': {label: summarize(items, measured) for label, items in sorted(by_label.items())},
+        'server_log': {
+            'database_locked': log.count(LOCKED.decode()),
+            'worker_timeouts': log.count('WORKER TIMEOUT'),
+            'worker_restarts': log.count('Booting worker') - workers
+        }
+    }
+
+
+def _config(value):
+    try:
+        workers, threads = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WORKERSxTHREADS, got {value!r}")
+    return workers, threads
+
+
+def _print_summary(name, summary, server_log=None):
+    line = (f"{name:<20}{summary['requests']:>8}{summary['per_second']:>9.1f}" +
+            ''.join(f"{summary.get(f'p{p}_ms', 0):>9.0f}" for p in PERCENTILES) +
+            f"{summary['errors']:>8}{summary['database_locked']:>8}")
+    if server_log:
+        line += f"{server_log['database_locked']:>8}{server_log['worker_timeouts']:>9}"
+    print(line)
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1, help='Synthetic dataset scale')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--configs', type=_config, nargs='+',
+                        default=[(cpus * 2 + 1, 2), (cpus, 4), (cpus, 1)],
+                        help='WORKERSxTHREADS to run (default: gunicorn.conf.py, then two alternatives)')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of load per configuration')
+    parser.add_argument('--warmup', type=float, default=5, help='Leading seconds left out of the figures')
+    parser.add_argument('--think', type=float, default=0, help='Mean pause between a user\'s requests, in seconds')
+    parser.add_argument('--replay', help='Captured request log (JSON lines) to send instead of the mix')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay speed-up; 0 ignores the captured offsets')
+    parser.add_argument('--record', help='Write the requests sent to this file, in the --replay format')
+    parser.add_argument('--regenerate', action='store_true', help='Rebuild the dataset')
+    parser.add_argument('--out', help='Report path (default benchmarks/results/load-<time>.json)')
+    args = parser.parse_args()
+
+    entries = None
+    if args.replay:
+        entries, skipped = load_replay(args.replay)
+        if skipped:
+            print(f"Skipped {skipped} lines of {args.replay} that are not requests", file=sys.stderr)
+        if not entries:
+            parser.error(f"{args.replay} has no replayable requests")
+
+    dataset_dir, rows = ensure_dataset(args.scale, args.seed, args.regenerate)
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'scale': args.scale, 'seed': args.seed,
+              'rows': rows, 'clients': args.clients, 'duration': args.duration, 'warmup': args.warmup,
+              'think': args.think, 'replay': args.replay, 'environment': environment(), 'configs': []}
+    for workers, threads in args.configs:
+        print(f"{workers} workers x {threads} threads, {args.clients} users for {args.duration:g}s", file=sys.stderr)
+        report['configs'].append(run_config(dataset_dir, workers, threads, args, entries))
+
+    header = f"{'':<20}{'requests':>8}{'req/s':>9}" + ''.join(f"{f'p{p} ms':>9}" for p in PERCENTILES) + f"{'errors':>8}{'locked':>8}"
+    for result in report['configs']:
+        print(f"\n{result['workers']} workers x {result['threads']} threads")
+        print(header + f"{'log lck':>8}{'timeouts':>9}")
+        _print_summary('all', result['overall'], result['server_log'])
+        for label, summary in result['by_label'].items():
+            _print_summary(label, summary)
+
+    out = args.out or os.path.join(RESULTS_DIR, 'load-' + datetime.now().strftime('%Y%m%dT%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {out}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
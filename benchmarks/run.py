@@ -0,0 +1,271 @@
+"""Benchmark suite over seeded synthetic datasets.
+
+Times the fan calculator, project and dashboard queries, the customer
+directory, merge suggestions, the Excel importers and the project Excel
+export at each requested scale of today's data, and writes a JSON report
+benchmarks/compare.py can diff against another run.
+
+    python benchmarks/run.py --scales 1 10 100 --out benchmarks/results/today.json
+    python benchmarks/run.py --scales 1 --only calculate_fan get_project
+
+Datasets are generated and migrated once per scale and seed under
+benchmarks/data (see synthetic.py); --regenerate rebuilds them. Each scale
+runs in its own process on a scratch copy of its dataset, chdir'd into it
+so the app's relative data/ paths point at the copy, never at the real
+database, and saves or imports in one run do not carry over to the next.
+Every benchmark records its first (cold) call separately, then repeats
+until --repeat runs or --budget seconds. get_suggested_merges is timed
+with one customer queued per call, the refresh after an edit. Logging is
+raised to ERROR while timing, so the figures leave out log formatting and
+I/O.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+DATA_DIR = os.path.join(ROOT, 'benchmarks', 'data')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+
+def _check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def _nonempty(value):
+    if not value:
+        raise RuntimeError(f"Empty result: {value!r}")
+    return value
+
+
+def _succeeded(ok):
+    if not ok:
+        raise RuntimeError("Import reported failure (see the app log)")
+    return ok
+
+
+def build_cases(app, dataset_dir):
+    """name -> zero-argument callable, against the dataset the process is chdir'd into."""
+    import database
+    from database import get_db_connection
+    from services.excel_service import ExcelService
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['is_admin'] = 1
+        session['username'] = 'benchmark'
+
+    conn = get_db_connection()
+    # A fully priced fan (drafts are resampled too) on the largest project that has one
+    row = conn.execute('''
+        SELECT p.enquiry_number, f.fan_number, f.specifications, f.motor
+        FROM Projects p JOIN Fans f ON f.project_id = p.id
+        WHERE json_extract(f.specifications, '$."Fan Size"') IS NOT NULL
+          AND json_extract(f.costs, '$.total_selling_price') > 0
+        ORDER BY p.total_fans DESC, p.id, f.fan_number LIMIT 1
+    ''').fetchone()
+    # Every 97th customer, so repeated refreshes queue different ones
+    customer_ids = [r[0] for r in conn.execute('SELECT id FROM Customers ORDER BY id')][::97]
+    conn.close()
+    enquiry_number, fan_number = row['enquiry_number'], row['fan_number']
+    specifications = json.loads(row['specifications'] or '{}')
+    motor = json.loads(row['motor'] or '{}')
+    calculator_form = dict(specifications, Fan_Size=specifications.get('Fan Size'),
+                           motor_brand=motor.get('brand', ''), motor_kw=motor.get('kw', ''),
+                           pole=motor.get('pole', ''), efficiency=motor.get('efficiency', ''),
+                           motor_discount=motor.get('discount', 0))
+    fan_payload = {'specifications': specifications, 'motor': motor}
+    register = os.path.join(dataset_dir, 'register.xlsx')
+    queued = []
+
+    def excel_export():
+        project = _nonempty(database.get_project(enquiry_number))
+        buffer = io.BytesIO()
+        ExcelService().generate_project_excel(project).save(buffer)
+        return buffer
+
+    def merge_refresh():
+        # Queue one customer, as a new or renamed customer would
+        customer_id = customer_ids[len(queued) % len(customer_ids)]
+        queued.append(customer_id)
+        conn = get_db_connection()
+        conn.execute('INSERT OR IGNORE INTO MergeCandidateQueue (customer_id) VALUES (?)', (customer_id,))
+        conn.commit()
+        conn.close()
+        return database.get_suggested_merges()
+
+    return {
+        'calculate_fan': lambda: _check(client.post('/calculate_fan', json=calculator_form)),
+        'api_save_fan': lambda: _check(client.put(f'/api/projects/{enquiry_number}/fans/{fan_number}', json=fan_payload)),
+        'get_project': lambda: _nonempty(database.get_project(enquiry_number)),
+        'get_dashboard_stats': lambda: _nonempty(database.get_dashboard_stats()),
+        'get_combined_enquiry_data': lambda: _nonempty(database.get_combined_enquiry_data()),
+        'get_all_customers_with_metrics': lambda: _nonempty(database.get_all_customers_with_metrics()),
+        'get_suggested_merges': merge_refresh,
+        'import_orders_from_excel': lambda: _succeeded(database.import_orders_from_excel(register)),
+        'import_enquiries_from_excel': lambda: _succeeded(database.import_enquiries_from_excel(register)),
+        'excel_service': excel_export,
+    }
+
+
+BENCHMARKS = ('calculate_fan', 'api_save_fan', 'get_project', 'get_dashboard_stats', 'get_combined_enquiry_data',
+              'get_all_customers_with_metrics', 'get_suggested_merges', 'import_orders_from_excel',
+              'import_enquiries_from_excel', 'excel_service')
+
+
+def time_case(func, repeat, budget):
+    """First call, then up to repeat more within budget seconds (at least one)."""
+    started = time.perf_counter()
+    func()
+    first = time.perf_counter() - started
+    runs = []
+    deadline = time.perf_counter() + budget
+    while len(runs) < repeat and (not runs or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - started)
+    return {
+        'first': first,
+        'runs': len(runs),
+        'min': min(runs),
+        'median': statistics.median(runs),
+        'mean': statistics.fmean(runs),
+        'max': max(runs),
+        'stdev': statistics.stdev(runs) if len(runs) > 1 else 0.0
+    }
+
+
+def start_app(dataset_dir):
+    """The app on the dataset in dataset_dir, as the process's only database. Returns (app, seconds)."""
+    os.chdir(dataset_dir)
+    os.environ.pop('DB_PATH', None)
+    os.environ.pop('RENDER', None)
+    from app import create_app
+
+    started = time.perf_counter()
+    app = create_app()
+    return app, time.perf_counter() - started
+
+
+def run_dataset(dataset_dir, names, repeat, budget):
+    """Run in a fresh process on a scratch dataset copy; returns the per-benchmark timings."""
+    import logging
+    app, startup = start_app(dataset_dir)
+    logging.getLogger().setLevel(logging.ERROR)
+
+    cases = build_cases(app, dataset_dir)
+    results = {}
+    for name in names:
+        try:
+            results[name] = time_case(cases[name], repeat, budget)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+        print(f"  {name:<32} " + (f"{results[name]['median'] * 1000:10.1f} ms"
+                                  if 'median' in results[name] else f"ERROR {results[name]['error']}"),
+              file=sys.stderr)
+    return {'startup': startup, 'benchmarks': results}
+
+
+def ensure_dataset(scale, seed, regenerate=False):
+    """Generate (if needed) and migrate the dataset for scale and seed. Returns (directory, rows)."""
+    from synthetic import generate
+    directory = os.path.join(DATA_DIR, f"scale-{scale:g}-seed-{seed}")
+    manifest = os.path.join(directory, 'dataset.json')
+    if regenerate or not os.path.exists(manifest):
+        print(f"Generating scale {scale:g} dataset in {directory}", file=sys.stderr)
+        generate(directory, scale, seed)
+    with open(manifest) as f:
+        dataset = json.load(f)
+    if not dataset.get('prepared'):
+        # App startup migrates the copy (rollups, data versions, ...) once, not on every run
+        print(f"Migrating scale {scale:g} dataset", file=sys.stderr)
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--prepare', directory],
+                       stdout=subprocess.DEVNULL, check=True)
+        dataset['prepared'] = True
+        with open(manifest, 'w') as f:
+            json.dump(dataset, f, indent=2)
+    return directory, dataset['rows']
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True, timeout=30).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment():
+    return {
+        'commit': _git('rev-parse', 'HEAD'),
+        'dirty': bool(_git('status', '--porcelain', '--untracked-files=no')),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': socket.gethostname(),
+        'cpus': os.cpu_count()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS, help='Run just these benchmarks')
+    parser.add_argument('--repeat', type=int, default=10, help='Timed runs after the first call')
+    parser.add_argument('--budget', type=float, default=20, help='Seconds of repeats per benchmark')
+    parser.add_argument('--regenerate', action='store_true', help='Rebuild the datasets')
+    parser.add_argument('--out', help='Report path (default benchmarks/results/<time>.json)')
+    parser.add_argument('--dataset', help=argparse.SUPPRESS)
+    parser.add_argument('--prepare', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    names = args.only or list(BENCHMARKS)
+
+    if args.prepare:
+        start_app(args.prepare)
+        return
+
+    if args.dataset:
+        # Child process for one scale: timings as JSON on stdout, anything the app prints goes to stderr
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        json.dump(run_dataset(args.dataset, names, args.repeat, args.budget), stdout)
+        return
+
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'seed': args.seed,
+              'repeat': args.repeat, 'budget': args.budget, 'environment': environment(), 'scales': {}}
+    for scale in args.scales:
+        directory, rows = ensure_dataset(scale, args.seed, args.regenerate)
+        print(f"Scale {scale:g}: " + ', '.join(f"{table} {count}" for table, count in rows.items()), file=sys.stderr)
+        scratch = tempfile.mkdtemp(prefix='tcf-bench-')
+        try:
+            shutil.copytree(directory, scratch, dirs_exist_ok=True)
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--dataset', scratch, '--repeat', str(args.repeat),
+                 '--budget', str(args.budget), '--only', *names],
+                stdout=subprocess.PIPE, check=True, text=True)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        report['scales'][f"{scale:g}"] = dict(json.loads(child.stdout), rows=rows)
+
+    out = args.out or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%dT%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {out}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
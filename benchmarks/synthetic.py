@@ -0,0 +1,343 @@
+"""Seeded synthetic datasets for the benchmark suite.
+
+A dataset is a copy of the source database (catalog, prices, users and
+settings untouched) whose Customers, EnquiryRegister, Orders, Projects and
+Fans are replaced by generated rows, scale times as many as the source
+has. Categorical columns (year, month, region, engineer, sector, status)
+and the fan specifications are resampled from the source rows, so the
+value distributions match; names, references and amounts are made up.
+The same scale and seed always give the same rows.
+
+    python benchmarks/synthetic.py --scale 10 --out benchmarks/data/scale-10
+
+The dataset directory holds data/fan_pricing.db (the app's layout, so the
+runner can chdir into it) and register.xlsx with the order and enquiry
+sheets the Excel importers read. About one customer in ten is a variant of
+another, with its merge suggestion already stored.
+"""
+import os
+import sys
+import json
+import random
+import sqlite3
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import ORDER_COLUMN_MAP, ENQUIRY_COLUMN_MAP, ORDERS_SHEET, ENQUIRIES_SHEET, ENQUIRY_MONTHS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DB = os.path.join(ROOT, 'data', 'fan_pricing.db')
+
+# Tables replaced by generated rows, children first
+GENERATED_TABLES = ('Fans', 'Projects', 'Orders', 'EnquiryRegister', 'CustomerYearBindings', 'CustomerAliases', 'Customers')
+
+# Real customer names are mostly distinctive brands ("Kerone", "Tenova Technologies"); names
+# built only from a few common words would make every pair look alike to the matcher
+_SYLLABLES = ('ka', 'ro', 'ne', 'te', 'no', 'va', 'am', 'ba', 'tech', 'ri', 'su', 'mi', 'lo', 'dri', 'vi', 'sha',
+              'ran', 'gem', 'ar', 'en', 'zo', 'pol', 'kar', 'thi', 'ven', 'mag', 'nu', 'del', 'ta', 'ser', 'ox',
+              'ly', 'dev', 'pra', 'kri', 'ma', 'yu', 'ind', 'sol', 'tro', 'fa', 'gi', 'hel', 'bo', 'ci', 'us',
+              'ra', 'jo', 'wel', 'tan')
+_CORES = ('Thermal', 'Air', 'Aero', 'Climate', 'Cooling', 'Power', 'Steel', 'Process', 'Enviro', 'Energy',
+          'Pharma', 'Foods', 'Infra', 'Projects', 'Fabricators', 'Systems', 'Controls', 'Textiles', 'Cement', 'Paper')
+_TRADES = ('Engineering', 'Engineers', 'Technologies', 'Industries', 'Solutions', 'Enterprises', 'Services',
+           'Equipments', 'Contractors', 'Consultants', 'Works', 'Group')
+_SUFFIXES = ('Pvt Ltd', 'Private Limited', 'Ltd', 'LLP', 'Co.', '')
+_LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+_MONTH_NUMBERS = {name: number for number, name in ENQUIRY_MONTHS.items()}
+_SHORT_MONTHS = {name[:3]: number for name, number in _MONTH_NUMBERS.items()}
+
+
+def _company_name(rng):
+    brand = ''.join(rng.choice(_SYLLABLES) for _ in range(rng.choice((2, 2, 3)))).title()
+    shape = rng.random()
+    if shape < 0.35:
+        return brand
+    if shape < 0.75:
+        return f"{brand} {rng.choice(_TRADES)} {rng.choice(_SUFFIXES)}".strip()
+    return f"{brand} {rng.choice(_CORES)} {rng.choice(_TRADES)} {rng.choice(_SUFFIXES)}".strip()
+
+
+def _near_duplicate(name, rng):
+    """A plausible misspelling or variant of name, the kind the matcher should merge."""
+    chars = list(name)
+    pos = rng.randrange(len(chars))
+    edit = rng.choice(('drop', 'swap', 'replace', 'suffix'))
+    if edit == 'drop' and len(chars) > 4:
+        del chars[pos]
+    elif edit == 'swap' and pos < len(chars) - 1:
+        chars[pos], chars[pos + 1] = chars[pos + 1], chars[pos]
+    elif edit == 'replace':
+        chars[pos] = rng.choice(_LETTERS)
+    else:
+        return f"{name} ({rng.choice(('Unit 2', 'Chennai', 'Pune', 'Plant', 'Div'))})"
+    return ''.join(chars)
+
+
+def _scaled(count, scale):
+    return max(1, round(count * scale))
+
+
+def _rows(conn, table):
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in conn.execute(f'SELECT * FROM "{table}"')]
+    finally:
+        conn.row_factory = None
+
+
+def _skewed(rng, items):
+    """A few customers get most of the business, as in the real registers."""
+    return items[int(len(items) * rng.random() ** 2.5)]
+
+
+def _month_number(month):
+    month = str(month or '').strip()
+    return _MONTH_NUMBERS.get(month) or _SHORT_MONTHS.get(month[:3].title()) or '01'
+
+
+def _year(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 2024
+
+
+def generate_customers(rng, templates, count):
+    """Customers, plus the (variant id, original id) pairs of the near-duplicates among them."""
+    customers, names, variants = [], set(), []
+    while len(customers) < count:
+        # About one in ten is a variant of an existing customer, for the merge suggestions
+        original = None
+        if customers and rng.random() < 0.1:
+            original = rng.choice(customers)
+            name = _near_duplicate(original['primary_name'], rng)
+        else:
+            name = _company_name(rng)
+        if name in names:
+            name = f"{name} {len(customers)}"
+        names.add(name)
+        template = rng.choice(templates)
+        customers.append({'id': len(customers) + 1, 'primary_name': name, 'region': template['region'],
+                          'last_visit_date': None, 'created_at': template['created_at']})
+        if original is not None:
+            variants.append((customers[-1]['id'], original['id']))
+    return customers, variants
+
+
+def store_merge_candidates(cursor, customers, variants):
+    """Suggestions for the generated near-duplicates, as a live database already has them.
+
+    Building them from scratch compares every customer once, which takes hours
+    at 100x; the benchmarks measure the incremental refresh instead.
+    """
+    from services.customer_matcher import clean_company_name, similarity_score
+    from services.merge_candidates import ensure_merge_candidate_schema, MIN_SCORE, MAX_SCORE
+    ensure_merge_candidate_schema(cursor)
+    cursor.execute('DELETE FROM MergeCandidateQueue')
+    names = {c['id']: clean_company_name(c['primary_name']) for c in customers}
+    pairs = []
+    for variant_id, original_id in variants:
+        primary_id, secondary_id = max(variant_id, original_id), min(variant_id, original_id)
+        score = similarity_score(names[primary_id], names[secondary_id])
+        if MIN_SCORE <= score < MAX_SCORE:
+            pairs.append((primary_id, secondary_id, score))
+    cursor.executemany('INSERT OR IGNORE INTO MergeCandidates (primary_id, secondary_id, score) VALUES (?, ?, ?)', pairs)
+
+
+def generate_aliases(rng, customers, count):
+    aliases, names = [], set()
+    for customer in customers:
+        aliases.append({'customer_id': customer['id'], 'alias_name': customer['primary_name']})
+        names.add(customer['primary_name'])
+    while len(aliases) < count:
+        customer = rng.choice(customers)
+        alias = _near_duplicate(customer['primary_name'], rng)
+        if alias not in names:
+            names.add(alias)
+            aliases.append({'customer_id': customer['id'], 'alias_name': alias})
+    return aliases
+
+
+def generate_bindings(rng, templates, customers, count):
+    bindings, seen = [], set()
+    attempts = 0
+    while len(bindings) < count and attempts < count * 10:
+        attempts += 1
+        template = rng.choice(templates)
+        customer = rng.choice(customers)
+        key = (customer['id'], template['year'])
+        if key not in seen:
+            seen.add(key)
+            bindings.append({'customer_id': customer['id'], 'year': template['year'],
+                             'region': template['region'], 'sales_engineer': template['sales_engineer']})
+    return bindings
+
+
+def generate_enquiries(rng, templates, customers, count):
+    enquiries, sequence = [], {}
+    for _ in range(count):
+        template = rng.choice(templates)
+        year, month = _year(template['year']), _month_number(template['month'])
+        prefix = f"EQ{year % 100:02d}{month}"
+        sequence[prefix] = sequence.get(prefix, 0) + 1
+        customer = _skewed(rng, customers)
+        enquiries.append({
+            'enquiry_number': f"{prefix}{sequence[prefix]:04d}", 'year': str(year),
+            'month': ENQUIRY_MONTHS[month], 'sales_engineer': template['sales_engineer'],
+            'customer_name': customer['primary_name'], 'region': template['region'],
+            'customer_id': customer['id'], 'source': 'excel',
+            'created_at': f"{year}-{month}-{rng.randint(1, 28):02d} {rng.randint(8, 19):02d}:00:00"
+        })
+    return enquiries
+
+
+def generate_orders(rng, templates, customers, count):
+    orders, sequence = [], {}
+    for _ in range(count):
+        template = rng.choice(templates)
+        year = _year(template['year'])
+        sequence[year] = sequence.get(year, 0) + 1
+        customer = _skewed(rng, customers)
+        base = float(template['order_value'] or 0) or 100000.0
+        order_value = round(base * rng.lognormvariate(0, 0.35), -2)
+        cost_ratio = float(template['our_cost'] or 0) / base if template['our_cost'] else rng.uniform(0.6, 0.85)
+        our_cost = round(order_value * min(max(cost_ratio, 0.3), 1.2))
+        contribution = order_value - our_cost
+        orders.append({
+            'job_ref': f"J{year % 100:02d}-{sequence[year]:04d}", 'year': f"{year}.0",
+            'customer_name': customer['primary_name'], 'sales_engineer': template['sales_engineer'],
+            'region': template['region'], 'order_value': order_value, 'our_cost': our_cost,
+            'warranty': template['warranty'], 'contribution_value': contribution,
+            'contribution_percentage': round(contribution / order_value * 100, 2) if order_value else 0,
+            'qty': template['qty'], 'month': template['month'], 'rep': template['rep'],
+            'type_of_customer': template['type_of_customer'], 'sector': template['sector'],
+            'po_number': f"PO/{year}/{sequence[year]:05d}", 'end_user': None, 'remarks': None,
+            'customer_id': customer['id'], 'source': 'excel'
+        })
+    return orders
+
+
+def generate_projects(rng, templates, enquiries, count):
+    projects = []
+    for enquiry in rng.sample(enquiries, min(count, len(enquiries))):
+        template = rng.choice(templates)
+        created = f"{enquiry['year']}-{_month_number(enquiry['month'])}-{rng.randint(1, 28):02d} {rng.randint(8, 19):02d}:00:00"
+        projects.append({
+            'id': len(projects) + 1, 'enquiry_number': enquiry['enquiry_number'],
+            'customer_name': enquiry['customer_name'], 'customer_id': enquiry['customer_id'],
+            'total_fans': 0, 'created_at': created, 'updated_at': created,
+            'sales_engineer': enquiry['sales_engineer'], 'status': template['status'] or 'Live',
+            'probability': template['probability'] if template['probability'] is not None else 50,
+            'remarks': '', 'month': enquiry['month'], 'source': 'manual', 'lost_reason': template['lost_reason']
+        })
+    return projects
+
+
+def generate_fans(rng, templates, projects, count):
+    fans, numbers = [], {}
+    for _ in range(count):
+        template = rng.choice(templates)
+        project = rng.choice(projects)
+        numbers[project['id']] = numbers.get(project['id'], 0) + 1
+        fans.append({
+            'project_id': project['id'], 'fan_number': numbers[project['id']], 'status': template['status'],
+            'specifications': template['specifications'], 'weights': template['weights'],
+            'costs': template['costs'], 'motor': template['motor'],
+            'created_at': project['created_at'], 'updated_at': project['created_at']
+        })
+    return fans
+
+
+def _insert(conn, table, rows):
+    if not rows:
+        return
+    columns = list(rows[0])
+    conn.executemany(
+        f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({", ".join(":" + c for c in columns)})', rows)
+
+
+def write_register(path, orders, enquiries):
+    """The order and enquiry sheets in the layout read_orders_sheet()/read_enquiries_sheet() expect."""
+    import pandas as pd
+    order_headers = {column: header for header, column in ORDER_COLUMN_MAP.items()}
+    enquiry_headers = {column: header for header, column in ENQUIRY_COLUMN_MAP.items()}
+    with pd.ExcelWriter(path, engine='openpyxl') as writer:
+        pd.DataFrame(orders, columns=list(order_headers)).rename(columns=order_headers) \
+            .to_excel(writer, sheet_name=ORDERS_SHEET, index=False)
+        pd.DataFrame(enquiries, columns=list(enquiry_headers)).rename(columns=enquiry_headers) \
+            .to_excel(writer, sheet_name=ENQUIRIES_SHEET, index=False)
+
+
+def generate(out_dir, scale, seed=0, source=SOURCE_DB, register=True):
+    """Build a dataset in out_dir. Returns the generated row counts by table."""
+    data_dir = os.path.join(out_dir, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, 'fan_pricing.db')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    # Only read; a plain connection (not mode=ro) so the source's WAL files are cleaned up on close
+    src = sqlite3.connect(source)
+    conn = sqlite3.connect(path)
+    try:
+        src.backup(conn)
+        templates = {table: _rows(src, table) for table in GENERATED_TABLES}
+    finally:
+        src.close()
+
+    rng = random.Random(seed)
+    counts = {table: _scaled(len(rows), scale) for table, rows in templates.items()}
+    customers, variants = generate_customers(rng, templates['Customers'], counts['Customers'])
+    aliases = generate_aliases(rng, customers, max(counts['CustomerAliases'], len(customers)))
+    bindings = generate_bindings(rng, templates['CustomerYearBindings'], customers, counts['CustomerYearBindings'])
+    enquiries = generate_enquiries(rng, templates['EnquiryRegister'], customers, counts['EnquiryRegister'])
+    orders = generate_orders(rng, templates['Orders'], customers, counts['Orders'])
+    projects = generate_projects(rng, templates['Projects'], enquiries, counts['Projects'])
+    fans = generate_fans(rng, templates['Fans'], projects, counts['Fans'])
+
+    generated = {'Customers': customers, 'CustomerAliases': aliases, 'CustomerYearBindings': bindings,
+                 'EnquiryRegister': enquiries, 'Orders': orders, 'Projects': projects, 'Fans': fans}
+    try:
+        with conn:
+            for table in GENERATED_TABLES:
+                conn.execute(f'DELETE FROM "{table}"')
+            conn.execute('DELETE FROM sqlite_sequence WHERE name IN (%s)' % ','.join('?' * len(GENERATED_TABLES)),
+                         GENERATED_TABLES)
+            for table in reversed(GENERATED_TABLES):
+                _insert(conn, table, generated[table])
+            # Project totals as the fan calculator would have saved them
+            conn.execute('''
+                UPDATE Projects SET
+                    total_fans = (SELECT COUNT(*) FROM Fans f WHERE f.project_id = Projects.id),
+                    total_weight = COALESCE((SELECT SUM(json_extract(f.weights, '$.total_weight')) FROM Fans f WHERE f.project_id = Projects.id), 0),
+                    total_cost = COALESCE((SELECT SUM(json_extract(f.costs, '$.total_cost')) FROM Fans f WHERE f.project_id = Projects.id), 0),
+                    total_selling_price = COALESCE((SELECT SUM(json_extract(f.costs, '$.total_selling_price')) FROM Fans f WHERE f.project_id = Projects.id), 0)
+            ''')
+            store_merge_candidates(conn.cursor(), customers, variants)
+        conn.execute('VACUUM')
+    finally:
+        conn.close()
+
+    if register:
+        write_register(os.path.join(out_dir, 'register.xlsx'), orders, enquiries)
+    rows = {table: len(generated[table]) for table in GENERATED_TABLES}
+    with open(os.path.join(out_dir, 'dataset.json'), 'w') as f:
+        json.dump({'scale': scale, 'seed': seed, 'rows': rows}, f, indent=2)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--source', default=SOURCE_DB)
+    args = parser.parse_args()
+    rows = generate(args.out, args.scale, args.seed, args.source)
+    print(', '.join(f"{table} {count}" for table, count in rows.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import logging
+from services.logging_config import log_payload
 
 logger = logging.getLogger(__name__)
 
@@ -16,7 +17,7 @@ def calculate_fan_weight(cursor, fan_data, selected_accessories):
     try:
         # Skip DB lookup for custom materials
         if fan_data.get('material') == 'others':
-            logger.info("Skipping DB fan weights for custom material entry")
+            logger.debug("Skipping DB fan weights for custom material entry")
             return 0, 0, 0, 0, None, {}
             
         cursor.execute('''
@@ -54,7 +55,7 @@ def calculate_fan_weight(cursor, fan_data, selected_accessories):
                     accessory_weight = float(fan_weight_dict[accessory])
                     total_weight += accessory_weight
                     accessory_details[accessory] = accessory_weight
-                    logger.info(f"Found weight for {accessory}: {accessory_weight} kg")
+                    logger.debug("Found weight for %s: %s kg", accessory, accessory_weight)
                 except (ValueError, TypeError):
                     logger.warning(f"Invalid weight value for {accessory}")
                     accessory_details[accessory] = None
@@ -70,7 +71,7 @@ def calculate_fan_weight(cursor, fan_data, selected_accessories):
                     custom_weight = float(weight)
                     total_weight += custom_weight
                     accessory_details[name] = custom_weight
-                    logger.info(f"Added custom accessory: {name} = {custom_weight} kg")
+                    logger.debug("Added custom accessory: %s = %s kg", name, custom_weight)
                 except (ValueError, TypeError):
                     logger.warning(f"Invalid custom accessory weight for {name}")
                     accessory_details[name] = None
@@ -86,15 +87,16 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
     try:
         vendor = fan_data.get('vendor', 'TCF Factory')
         material = fan_data.get('material', 'ms')
-        logger.info(f"Calculating fabrication cost for vendor: {vendor}, material: {material}")
+        logger.debug("Calculating fabrication cost for vendor: %s, material: %s", vendor, material)
         
         # Handle custom materials ('others' type)
         if material == 'others':
-            logger.info("Processing custom materials calculation")
+            logger.debug("Processing custom materials calculation")
             
             # Debug logging for custom material values
-            for i in range(5):
-                logger.info(f"Material {i} from frontend: name={fan_data.get(f'material_name_{i}')}, weight={fan_data.get(f'material_weight_{i}')}, rate={fan_data.get(f'material_rate_{i}')}")
+            for i in range(5 if logger.isEnabledFor(logging.DEBUG) else 0):
+                logger.debug("Material %d from frontend: name=%s, weight=%s, rate=%s", i, fan_data.get(f'material_name_{i}'),
+                             fan_data.get(f'material_weight_{i}'), fan_data.get(f'material_rate_{i}'))
             
             fabrication_cost = 0
             total_weight = 0
@@ -124,15 +126,16 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
                                 'rate': material_rate,
                                 'cost': component_cost
                             }
-                            logger.info(f"Added {material_name}: weight={material_weight}, rate={material_rate}, cost={component_cost}")
+                            logger.debug("Added %s: weight=%s, rate=%s, cost=%s", material_name, material_weight, material_rate, component_cost)
                         else:
-                            logger.warning(f"Invalid weight or rate for custom material {i}: weight={material_weight}, rate={material_rate}")
+                            logger.warning("Invalid weight or rate for custom material %d: weight=%s, rate=%s", i, material_weight, material_rate)
                     except (ValueError, TypeError) as e:
-                        logger.warning(f"Error processing custom material {i}: {str(e)}")
+                        logger.warning("Error processing custom material %d: %s", i, e)
                 else:
-                    logger.warning(f"Missing weight or rate for custom material {i}")
+                    # Unused slots are normal; the form always has five
+                    logger.debug("Missing weight or rate for custom material %d", i)
             
-            logger.info(f"Total fabrication cost for custom materials: {fabrication_cost}")
+            logger.debug("Total fabrication cost for custom materials: %s", fabrication_cost)
             # For custom materials, rate isn't a single value, so we can return None or 0
             return fabrication_cost, total_weight, custom_weights, 0.0, None
         
@@ -144,7 +147,7 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
         
         # Check if custom vendor_rate is provided
         custom_vendor_rate = fan_data.get('vendor_rate')
-        logger.info(f"DEBUG: custom_vendor_rate input: {custom_vendor_rate} (type: {type(custom_vendor_rate)})")
+        logger.debug("custom_vendor_rate input: %r", custom_vendor_rate)
         rate_source = "db"
         
         if custom_vendor_rate is not None:
@@ -152,7 +155,7 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
                 # Use the custom vendor rate
                 base_rate = float(custom_vendor_rate)
                 if base_rate > 0:
-                    logger.info(f"Using custom vendor rate: {base_rate} per kg")
+                    logger.debug("Using custom vendor rate: %s per kg", base_rate)
                     ms_price = base_rate
                     ss_multiplier = 2.5
                     ss304_price = base_rate * ss_multiplier
@@ -160,7 +163,7 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
                     aluminium_price = base_rate * 4.0 # Dynamic estimate for Aluminium if custom rate
                     rate_source = "custom"
                 else: 
-                     logger.info(f"Custom vendor rate is {base_rate}, falling back to DB lookup")
+                     logger.debug("Custom vendor rate is %s, falling back to DB lookup", base_rate)
                      custom_vendor_rate = None
             except (ValueError, TypeError) as e:
                 logger.warning(f"Error using custom vendor rate ({custom_vendor_rate}): {str(e)}. Falling back to database lookup.")
@@ -168,7 +171,7 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
         
         # If no custom rate (or invalid), use DB lookup
         if custom_vendor_rate is None:
-            logger.info(f"Looking up rate for vendor: {vendor}, weight: {total_weight}")
+            logger.debug("Looking up rate for vendor: %s, weight: %s", vendor, total_weight)
             # Correct schema: WeightStart, WeightEnd, MSPrice, SS304Price, SS316Price, AluminiumPrice
             cursor.execute('''
                 SELECT MSPrice, SS304Price, SS316Price, AluminiumPrice FROM VendorWeightDetails 
@@ -192,7 +195,7 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
             ss304_price = float(price_row[1])
             ss316_price = float(price_row[2]) if price_row[2] is not None else 800.0
             aluminium_price = float(price_row[3]) if price_row[3] is not None else 1000.0
-            logger.debug(f"Vendor prices - MS: {ms_price}, SS304: {ss304_price}, SS316: {ss316_price}, Aluminium: {aluminium_price}")
+            logger.debug("Vendor prices - MS: %s, SS304: %s, SS316: %s, Aluminium: %s", ms_price, ss304_price, ss316_price, aluminium_price)
 
         # Calculate fabrication cost based on material and determined prices
         fabrication_cost = 0
@@ -275,8 +278,8 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
              else:
                  rate_used = 0.0
         
-        logger.info(f"Fabrication cost calculated ({rate_source}): {fabrication_cost}")
-        logger.info(f"DEBUG: Final rate_used: {rate_used}, ms_price: {ms_price}, ss304_price: {ss304_price}, source: {rate_source}")
+        logger.debug("Fabrication cost calculated (%s): %s", rate_source, fabrication_cost)
+        logger.debug("Final rate_used: %s, ms_price: %s, ss304_price: %s, source: %s", rate_used, ms_price, ss304_price, rate_source)
         return fabrication_cost, total_weight, custom_accessory_costs, rate_used, None
         
     except Exception as e:
@@ -288,7 +291,7 @@ def calculate_fabrication_cost(cursor, fan_data, total_weight):
 
 def calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_diameter):
     """Calculate costs for bought out components."""
-    logger.info(f"Calculating bought out components with data: {fan_data}")
+    log_payload(logger, "Calculating bought out components with data: %s", fan_data)
     
     try:
         # Initialize values
@@ -347,7 +350,7 @@ def calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_dia
             try:
                 # Convert to float and ensure proper format
                 drive_pack_kw = float(drive_pack_kw)
-                logger.info(f"Looking up drive pack cost for {drive_pack_kw} kW")
+                logger.debug("Looking up drive pack cost for %s kW", drive_pack_kw)
                 
                 # Query the DrivePackLookup table
                 cursor.execute('SELECT "Drive Pack" FROM DrivePackLookup WHERE "Motor kW" = ?', (drive_pack_kw,))
@@ -355,13 +358,13 @@ def calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_dia
                 
                 if result:
                     drive_pack_price = float(result[0])
-                    logger.info(f"Found drive pack price: ₹{drive_pack_price} for {drive_pack_kw} kW")
+                    logger.debug("Found drive pack price: ₹%s for %s kW", drive_pack_price, drive_pack_kw)
                 else:
                     logger.warning(f"No drive pack cost found for kW: {drive_pack_kw}")
                     # Log available options for debugging
                     cursor.execute('SELECT "Motor kW" FROM DrivePackLookup ORDER BY "Motor kW"')
                     available_kw = [row[0] for row in cursor.fetchall()]
-                    logger.info(f"Available kW options: {available_kw}")
+                    logger.info("Available kW options: %s", available_kw)
             except Exception as e:
                 logger.error(f"Error looking up drive pack cost: {e}")
                 drive_pack_price = 0
@@ -404,8 +407,9 @@ def calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_dia
         
         # Calculate total bought out cost using the discounted motor price
         total_cost = vibration_isolators_price + bearing_price + drive_pack_price + discounted_motor_price
-        logger.info(f"Total bought out cost calculated: {total_cost}")
-        logger.info(f"Individual component prices: VI={vibration_isolators_price}, B={bearing_price}, DP={drive_pack_price}, M_List={motor_list_price}, M_Discounted={discounted_motor_price}")
+        logger.debug("Total bought out cost calculated: %s", total_cost)
+        logger.debug("Individual component prices: VI=%s, B=%s, DP=%s, M_List=%s, M_Discounted=%s", vibration_isolators_price,
+                     bearing_price, drive_pack_price, motor_list_price, discounted_motor_price)
         
         return {
             'total_cost': total_cost,
@@ -424,6 +428,174 @@ def calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_dia
             'details': str(e)
         }
 
+def _parse_manual_input(val, type_func):
+    """Convert a manual override from the form, or None when it is blank or invalid."""
+    if val is not None and str(val).strip():
+        try:
+            return type_func(val)
+        except (ValueError, TypeError):
+            return None
+    return None
+
+def price_fan(cursor, data):
+    """Price one calculator form (the JSON body of /calculate_fan).
+
+    Returns (response fields, None), or (None, error fields) when the form
+    cannot be priced; the route answers the latter with 400.
+    """
+    fan_data = {
+        'Fan Model': data.get('Fan Model') or data.get('Fan_Model') or data.get('fan_model'),
+        'Fan Size': data['Fan_Size'],
+        'Class': data['Class'],
+        'Arrangement': data['Arrangement'],
+        'vendor': data.get('vendor', 'TCF Factory'),
+        'vendor_rate': data.get('vendor_rate'),
+        'air_flow': data.get('air_flow'),
+        'static_pressure': data.get('static_pressure'),
+        'material': data.get('material', 'ms'),
+        'vibration_isolators': data.get('vibration_isolators', 'not_required'),
+        'fabrication_margin': float(data.get('fabrication_margin', 25) or 25),
+        'bought_out_margin': float(data.get('bought_out_margin', 25) or 25),
+        'ms_percentage': data.get('ms_percentage'),
+        'motor_brand': data.get('motor_brand', ''),
+        'motor_kw': data.get('motor_kw', ''),
+        'pole': data.get('pole', ''),
+        'efficiency': data.get('efficiency', ''),
+        'motor_discount': float(data.get('motor_discount', 0) or 0),
+        'drive_pack': data.get('drive_pack'),
+        'customAccessories': data.get('customAccessories', {}),
+        'optional_items': data.get('optional_items', {})
+    }
+    
+    # Get selected accessories
+    selected_accessories = []
+    if 'accessories' in data:
+        if isinstance(data['accessories'], dict):
+            selected_accessories = [key for key, value in data['accessories'].items() if value]
+        elif isinstance(data['accessories'], list):
+            selected_accessories = data['accessories']
+    
+    # Add custom material data if present
+    if fan_data['material'] == 'others':
+        for i in range(5):
+            weight_key = f'material_weight_{i}'
+            name_key = f'material_name_{i}'
+            rate_key = f'material_rate_{i}'
+            if weight_key in data and data[weight_key] and str(data[weight_key]).strip():
+                fan_data[weight_key] = float(data[weight_key])
+            if name_key in data:
+                fan_data[name_key] = data[name_key]
+            if rate_key in data and data[rate_key] and str(data[rate_key]).strip():
+                fan_data[rate_key] = float(data[rate_key])
+    
+    # Always allow manual override for shaft/isolators from frontend
+    # These might be sent as empty strings, so filter them
+    manual_isolators = _parse_manual_input(data.get('no_of_isolators'), int)
+    manual_shaft = _parse_manual_input(data.get('shaft_diameter'), float)
+    
+    # Get fan weight data
+    bare_fan_weight, db_no_of_isolators, db_shaft_diameter, total_weight, fan_error, accessory_details = calculate_fan_weight(
+        cursor, fan_data, selected_accessories
+    )
+
+    # Check for missing accessory weights
+    missing_accessories = [name for name, weight in accessory_details.items() if weight is None]
+    if missing_accessories:
+        logger.warning(f"Missing weights for accessories: {missing_accessories}")
+        return None, {
+            'message': f"Weight data missing for: {', '.join(missing_accessories)}.",
+            'error_type': 'missing_weights',
+            'missing_accessories': missing_accessories
+        }
+    
+    # Logic for Isolators and Shaft Diameter:
+    # 1. Use manual input if provided
+    # 2. Else use DB value
+    # 3. Else fail if required (calculate_bought_out_components handles validation)
+    no_of_isolators = manual_isolators if manual_isolators is not None else db_no_of_isolators
+    shaft_diameter = manual_shaft if manual_shaft is not None else db_shaft_diameter
+    
+    if fan_error:
+        # If specific error (like bare fan weight missing), return it
+        logger.error(f"Error in fan weight calculation: {fan_error}")
+        return None, {'message': fan_error}
+    
+    # Calculate fabrication cost
+    fabrication_cost, total_weight, custom_weights, rate_used, fab_error = calculate_fabrication_cost(cursor, fan_data, total_weight)
+    if fab_error:
+        logger.error(f"Error in fabrication cost calculation: {fab_error}")
+        return None, {'message': fab_error}
+
+    # Calculate bought out components cost
+    bought_out_result, error = calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_diameter)
+    if error:
+        logger.error(f"Error in bought out components calculation: {error}")
+        return None, {'message': error}
+    
+    # Add optional items to bought out cost
+    bought_out_cost = bought_out_result['total_cost']
+    optional_items_cost = 0
+    optional_items_detail = {}
+    for item_name, item_price in fan_data['optional_items'].items():
+        if item_price and str(item_price).strip() and float(item_price) > 0:
+            optional_items_cost += float(item_price)
+            optional_items_detail[item_name] = float(item_price)
+    bought_out_cost += optional_items_cost
+    
+    # Calculate total costs and margins (do not add optional_items_cost again)
+    fabrication_selling_price = fabrication_cost / (1 - fan_data['fabrication_margin'] / 100)
+    bought_out_selling_price = bought_out_cost / (1 - fan_data['bought_out_margin'] / 100)
+    total_selling_price = fabrication_selling_price + bought_out_selling_price
+    
+    # Calculate total job margin on raw costs (fab + BO including optionals already in BO)
+    total_raw_cost = fabrication_cost + bought_out_cost
+    if total_raw_cost > 0:
+        total_job_margin = (1 - (total_raw_cost / total_selling_price)) * 100
+    else:
+        total_job_margin = 0
+    
+    # Standard accessories and custom accessories weights
+    standard_accessory_weight = sum(weight for name, weight in accessory_details.items()
+                                    if name in ACCESSORY_NAME_MAP.values())
+    custom_accessory_weight = sum(weight for name, weight in accessory_details.items()
+                                  if name not in ACCESSORY_NAME_MAP.values())
+    
+    return {
+        'bare_fan_weight': bare_fan_weight,
+        'accessory_weights': standard_accessory_weight + custom_accessory_weight,
+        'total_weight': total_weight,
+        'weights': {
+            'total_weight': total_weight,
+            'bare_fan_weight': bare_fan_weight,
+            'accessory_weight_details': accessory_details,
+            'custom_weights': custom_weights,
+            'shaft_diameter': shaft_diameter,
+            'no_of_isolators': no_of_isolators
+        },
+        'fabrication_cost': fabrication_cost,
+        'bought_out_cost': bought_out_cost,
+        'optional_items_cost': optional_items_cost,
+        'optional_items_detail': optional_items_detail,
+        'total_raw_cost': total_raw_cost,
+        'fabrication_selling_price': fabrication_selling_price,
+        'bought_out_selling_price': bought_out_selling_price,
+        'total_selling_price': total_selling_price,
+        'total_job_margin': total_job_margin,
+        'custom_accessories': {
+            'weights': {name: weight for name, weight in accessory_details.items()
+                        if name not in ACCESSORY_NAME_MAP.values()}
+        },
+        'vibration_isolators_price': bought_out_result['vibration_isolators_price'],
+        'bearing_price': bought_out_result['bearing_price'],
+        'drive_pack_price': bought_out_result['drive_pack_price'],
+        'motor_list_price': bought_out_result['motor_list_price'],
+        'discounted_motor_price': bought_out_result['discounted_motor_price'],
+        'motor_discount': bought_out_result['motor_discount'],
+        'no_of_isolators': no_of_isolators,
+        'shaft_diameter': shaft_diameter,
+        'vendor_rate': rate_used
+    }, None
+
 def calculate_fan_price(data, db_connection):
     """Calculate the total fan price based on input data."""
     cursor = db_connection.cursor()
@@ -4,6 +4,9 @@ import os
 import json
 import datetime
 import re
+import copy
+import time
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -42,21 +45,33 @@ def get_db_connection():
             shutil.copy('fan_pricing.db', db_path)
             logger.info(f"Copied database to {db_path}")
         
-        conn = sqlite3.connect(db_path, timeout=30.0)
+        # Statements are timed per request for /metrics (services.metrics)
+        from services.metrics import InstrumentedConnection, record_db_connect, untracked_sql
+        from services.query_trace import attach as attach_query_trace
+        started = time.perf_counter()
+        conn = sqlite3.connect(db_path, timeout=30.0, factory=InstrumentedConnection)
         conn.row_factory = sqlite3.Row
+        attach_query_trace(conn)
         
-        # Enable WAL mode for better concurrency
-        conn.execute("PRAGMA journal_mode=WAL")
-        conn.execute("PRAGMA synchronous=NORMAL")
-        conn.execute("PRAGMA cache_size=10000")
-        conn.execute("PRAGMA temp_store=MEMORY")
+        # Enable WAL mode for better concurrency (counted as connect time, not request SQL)
+        with untracked_sql():
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=10000")
+            conn.execute("PRAGMA temp_store=MEMORY")
+        record_db_connect(time.perf_counter() - started)
         
-        logger.info(f"Connected to database at: {db_path}")
+        logger.debug("Connected to database at: %s", db_path)
         return conn
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {str(e)}")
         raise
 
+def _invalidate_project_artifacts(enquiry_number):
+    """Drop cached quote PDFs / Excel exports after a project changes."""
+    from services.artifact_cache import invalidate_project_artifacts
+    invalidate_project_artifacts(enquiry_number)
+
 def _safe_json_load(json_string):
     """Safely load JSON string, returning empty dict if parsing fails."""
     if not json_string:
@@ -67,6 +82,194 @@ def _safe_json_load(json_string):
         logger.warning(f"Failed to parse JSON: {json_string}, error: {str(e)}")
         return {}
 
+# Tables whose changes bump each DataVersions entry. Caches key on these
+# counters so every worker notices a change with one cheap read.
+DATA_VERSION_GROUPS = {
+    'catalog': ['FanWeights', 'VendorWeightDetails', 'BearingLookup', 'DrivePackLookup', 'MotorPrices'],
+    'sales': ['Orders', 'EnquiryRegister', 'Projects']
+}
+
+def _ensure_data_versions(cursor):
+    """Create the DataVersions counters and the triggers that maintain them."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS DataVersions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    existing = {row[0] for row in cursor.fetchall()}
+    for group, tables in DATA_VERSION_GROUPS.items():
+        cursor.execute("INSERT OR IGNORE INTO DataVersions (name, version) VALUES (?, 0)", (group,))
+        for table in tables:
+            if table not in existing:
+                continue
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_dv_{group}_{table}_{event.lower()}
+                    AFTER {event} ON "{table}"
+                    BEGIN
+                        UPDATE DataVersions SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                        WHERE name = '{group}';
+                    END
+                ''')
+
+# Tables get_customer_360 reads, with the column naming the customer
+CUSTOMER_VERSION_SOURCES = {
+    'Customers': 'id',
+    'CustomerAliases': 'customer_id',
+    'CustomerYearBindings': 'customer_id',
+    'Orders': 'customer_id',
+    'EnquiryRegister': 'customer_id'
+}
+
+def _ensure_resource_versions(cursor):
+    """Per-project and per-customer change counters for the read APIs' ETags.
+
+    Projects.version goes up whenever the project row or one of its fans
+    changes (a fan write also bumps the 'sales' DataVersion through the
+    Projects row). CustomerVersions counts changes to every row the
+    customer 360 view reads; customers never changed have no row (version 0).
+    """
+    if not _table_has_column(cursor, 'Projects', 'version'):
+        cursor.execute("ALTER TABLE Projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_project_version_update AFTER UPDATE ON Projects
+        WHEN NEW.version = OLD.version
+        BEGIN UPDATE Projects SET version = version + 1 WHERE id = NEW.id; END
+    ''')
+    bump_project = "UPDATE Projects SET version = version + 1 WHERE id = {pid};"
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_project_version_fan_insert AFTER INSERT ON Fans
+        BEGIN {bump_project.format(pid='NEW.project_id')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_project_version_fan_update AFTER UPDATE ON Fans
+        BEGIN {bump_project.format(pid='OLD.project_id')} {bump_project.format(pid='NEW.project_id')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_project_version_fan_delete AFTER DELETE ON Fans
+        BEGIN {bump_project.format(pid='OLD.project_id')} END
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS CustomerVersions (
+            customer_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # No OR IGNORE here: a trigger inherits the conflict policy of the statement that
+    # fired it, and apply_orders / apply_enquiries fire these from an upsert
+    bump_customer = '''
+        INSERT INTO CustomerVersions (customer_id) SELECT {cid} WHERE {cid} IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM CustomerVersions WHERE customer_id = {cid});
+        UPDATE CustomerVersions SET version = version + 1 WHERE customer_id = {cid};
+    '''
+    for table, column in CUSTOMER_VERSION_SOURCES.items():
+        if not _table_has_column(cursor, table, column):
+            continue
+        for event, rows in (('INSERT', ('NEW',)), ('UPDATE', ('OLD', 'NEW')), ('DELETE', ('OLD',))):
+            body = ''.join(bump_customer.format(cid=f'{row}.{column}') for row in rows)
+            name = f'trg_customer_version_{table}_{event.lower()}'
+            # Recreated every time so existing databases pick up changes to the body
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'''
+                CREATE TRIGGER {name}
+                AFTER {event} ON "{table}"
+                BEGIN {body} END
+            ''')
+
+# Selling price of one fan as the dashboard counts it; tolerate missing or malformed costs JSON
+_FAN_SELLING_PRICE_SQL = "CASE WHEN json_valid(costs) THEN json_extract(costs, '$.total_selling_price') END"
+
+def _ensure_project_totals(cursor):
+    """Keep Projects.total_value / priced_fan_count in step with the fans' costs.
+
+    total_value is the sum of total_selling_price over the project's fans and
+    priced_fan_count the number of fans that have one, so dashboard totals are
+    plain column aggregates instead of JSON parsed per fan on every load.
+    """
+    added = False
+    for column, definition in (('total_value', 'REAL NOT NULL DEFAULT 0'), ('priced_fan_count', 'INTEGER NOT NULL DEFAULT 0')):
+        if not _table_has_column(cursor, 'Projects', column):
+            cursor.execute(f"ALTER TABLE Projects ADD COLUMN {column} {definition}")
+            added = True
+    
+    recompute = f'''
+        UPDATE Projects SET
+            total_value = (SELECT COALESCE(SUM(CAST({_FAN_SELLING_PRICE_SQL} AS REAL)), 0) FROM Fans WHERE project_id = {{pid}}),
+            priced_fan_count = (SELECT COUNT({_FAN_SELLING_PRICE_SQL}) FROM Fans WHERE project_id = {{pid}})
+        WHERE id = {{pid}};
+    '''
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_project_totals_fan_insert AFTER INSERT ON Fans
+        BEGIN {recompute.format(pid='NEW.project_id')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_project_totals_fan_update AFTER UPDATE OF costs, project_id ON Fans
+        BEGIN {recompute.format(pid='OLD.project_id')} {recompute.format(pid='NEW.project_id')} END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_project_totals_fan_delete AFTER DELETE ON Fans
+        BEGIN {recompute.format(pid='OLD.project_id')} END
+    ''')
+    if added:
+        cursor.execute(f'''
+            UPDATE Projects SET
+                total_value = (SELECT COALESCE(SUM(CAST({_FAN_SELLING_PRICE_SQL} AS REAL)), 0) FROM Fans WHERE Fans.project_id = Projects.id),
+                priced_fan_count = (SELECT COUNT({_FAN_SELLING_PRICE_SQL}) FROM Fans WHERE Fans.project_id = Projects.id)
+        ''')
+        logger.info("Backfilled project totals from fan costs")
+    
+    # Dashboard filters, each ordered by recency for the recent-projects list
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_projects_updated_at ON Projects(updated_at)')
+    for column in ('status', 'sales_engineer', 'month'):
+        if _table_has_column(cursor, 'Projects', column):
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_projects_{column} ON Projects({column}, updated_at)')
+
+def get_data_version(name, cursor=None):
+    """Current counter of a DataVersions group (0 if it is not tracked yet)."""
+    own_conn = None
+    if cursor is None:
+        own_conn = get_db_connection()
+        cursor = own_conn.cursor()
+    try:
+        cursor.execute("SELECT version FROM DataVersions WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        if own_conn is not None:
+            own_conn.close()
+
+def get_project_version(enquiry_number):
+    """'<project id>.<version>' for the project's ETag, or None if it does not exist."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute("SELECT id, version FROM Projects WHERE enquiry_number = ?", (enquiry_number,)).fetchone()
+        return f"{row[0]}.{row[1]}" if row else None
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+def get_customer_version(customer_id):
+    """'<customer id>.<version>' for the customer 360 ETag, or None if the customer does not exist."""
+    conn = get_db_connection()
+    try:
+        row = conn.execute('''
+            SELECT c.id, COALESCE(v.version, 0) FROM Customers c
+            LEFT JOIN CustomerVersions v ON v.customer_id = c.id
+            WHERE c.id = ?
+        ''', (customer_id,)).fetchone()
+        return f"{row[0]}.{row[1]}" if row else None
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
 def get_unique_values(cursor, table, column):
     """Get unique values from a specific column in a table."""
     try:
@@ -76,12 +279,25 @@ def get_unique_values(cursor, table, column):
         logger.error(f"Error getting unique values from {table}.{column}: {str(e)}")
         raise
 
+_dropdown_cache = {'version': None, 'options': None}
+_dropdown_cache_lock = threading.Lock()
+
 def load_dropdown_options():
-    """Load all dropdown options from the database."""
+    """Load all dropdown options from the database.
+
+    The result is cached per process and reused until the catalog data version
+    changes, e.g. when a new motor price list is published.
+    """
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
         
+        version = get_data_version('catalog', cursor)
+        with _dropdown_cache_lock:
+            if _dropdown_cache['options'] is not None and _dropdown_cache['version'] == version:
+                conn.close()
+                return copy.deepcopy(_dropdown_cache['options'])
+        
         options = {
             'fan_models': get_unique_values(cursor, 'FanWeights', 'Fan Model'),
             'fan_sizes': get_unique_values(cursor, 'FanWeights', 'Fan Size'),
@@ -97,7 +313,10 @@ def load_dropdown_options():
         }
         
         conn.close()
-        return options
+        with _dropdown_cache_lock:
+            _dropdown_cache['version'] = version
+            _dropdown_cache['options'] = options
+        return copy.deepcopy(options)
     except Exception as e:
         logger.error(f"Error loading dropdown options: {str(e)}")
         raise
@@ -463,10 +682,41 @@ def migrate_to_unified_schema():
         if 'source' not in enquiry_reg_columns:
             cursor.execute("ALTER TABLE EnquiryRegister ADD COLUMN source TEXT DEFAULT 'excel'")
         
+        # Customer linking joins on the raw name and looks customers up by id
+        for table in ('EnquiryRegister', 'Orders', 'Projects'):
+            if _table_has_column(cursor, table, 'customer_id'):
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table.lower()}_customer_name ON {table}(customer_name)')
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table.lower()}_customer_id ON {table}(customer_id)')
+        
         # Skip ProjectFans migration for now to avoid errors
         # TODO: Fix ProjectFans migration later
         logger.info("Skipping ProjectFans migration to avoid errors")
         
+        # Versioned motor price lists (replaces the MotorPrices_backup_* copies)
+        from services.price_lists import ensure_price_list_schema, migrate_legacy_backups
+        ensure_price_list_schema(cursor)
+        migrate_legacy_backups(cursor)
+        
+        # Monthly rollup cube for the orders/enquiries dashboards
+        from services.rollups import ensure_rollup_schema
+        ensure_rollup_schema(cursor)
+        
+        # Shared result cache (dashboard insights)
+        from services.result_cache import ensure_cache_schema
+        ensure_cache_schema(cursor)
+        
+        # Per-customer order intervals for the churn alert
+        from services.order_cadence import ensure_order_cadence_schema
+        ensure_order_cadence_schema(cursor)
+        
+        # Stored merge suggestions for the merge center
+        from services.merge_candidates import ensure_merge_candidate_schema
+        ensure_merge_candidate_schema(cursor)
+        
+        _ensure_project_totals(cursor)
+        _ensure_data_versions(cursor)
+        _ensure_resource_versions(cursor)
+
         conn.commit()
         conn.close()
         return True
@@ -541,6 +791,7 @@ def create_or_update_project(enquiry_number, customer_name, total_fans, sales_en
         
         conn.commit()
         conn.close()
+        _invalidate_project_artifacts(enquiry_number)
         return project_id
         
     except Exception as e:
@@ -550,7 +801,7 @@ def create_or_update_project(enquiry_number, customer_name, total_fans, sales_en
 def get_project(enquiry_number):
     """Get project by enquiry number."""
     try:
-        logger.info(f"Getting project for enquiry: {enquiry_number}")
+        logger.debug("Getting project for enquiry: %s", enquiry_number)
         conn = get_db_connection()
         cursor = conn.cursor()
         
@@ -558,7 +809,7 @@ def get_project(enquiry_number):
         project = cursor.fetchone()
         
         if project:
-            logger.info(f"Found project: {project['enquiry_number']}, ID: {project['id']}")
+            logger.debug("Found project: %s, ID: %s", project['enquiry_number'], project['id'])
             # Get fans for this project
             cursor.execute('''
                 SELECT fan_number, status, specifications, weights, costs, motor, updated_at
@@ -568,34 +819,10 @@ def get_project(enquiry_number):
             ''', (project['id'],))
             
             fans = cursor.fetchall()
-            logger.info(f"Found {len(fans)} fans for project {enquiry_number}")
+            logger.debug("Found %d fans for project %s", len(fans), enquiry_number)
             
             conn.close()
-            return {
-                'id': project['id'],
-                'enquiry_number': project['enquiry_number'],
-                'customer_name': project['customer_name'],
-                'total_fans': project['total_fans'],
-                'sales_engineer': project['sales_engineer'],
-                'status': project['status'] if 'status' in project.keys() else 'Live',
-                'probability': project['probability'] if 'probability' in project.keys() else 50,
-                'remarks': project['remarks'] if 'remarks' in project.keys() else '',
-                'month': project['month'] if 'month' in project.keys() else None,
-                'created_at': project['created_at'] if 'created_at' in project.keys() else None,
-                'updated_at': project['updated_at'] if 'updated_at' in project.keys() else None,
-                'fans': [
-                    {
-                        'fan_number': fan['fan_number'],
-                        'status': fan['status'],
-                        'specifications': _safe_json_load(fan['specifications']),
-                        'weights': _safe_json_load(fan['weights']),
-                        'costs': _safe_json_load(fan['costs']),
-                        'motor': _safe_json_load(fan['motor']),
-                        'updated_at': fan['updated_at']
-                    }
-                    for fan in fans
-                ]
-            }
+            return _build_project_dict(project, fans)
         
         conn.close()
         return None
@@ -604,6 +831,72 @@ def get_project(enquiry_number):
         logger.error(f"Error getting project: {str(e)}")
         raise
 
+def _build_project_dict(project, fans):
+    """Shape a Projects row and its Fans rows the way get_project returns them."""
+    return {
+        'id': project['id'],
+        'enquiry_number': project['enquiry_number'],
+        'customer_name': project['customer_name'],
+        'total_fans': project['total_fans'],
+        'sales_engineer': project['sales_engineer'],
+        'status': project['status'] if 'status' in project.keys() else 'Live',
+        'probability': project['probability'] if 'probability' in project.keys() else 50,
+        'remarks': project['remarks'] if 'remarks' in project.keys() else '',
+        'month': project['month'] if 'month' in project.keys() else None,
+        'created_at': project['created_at'] if 'created_at' in project.keys() else None,
+        'updated_at': project['updated_at'] if 'updated_at' in project.keys() else None,
+        'fans': [
+            {
+                'fan_number': fan['fan_number'],
+                'status': fan['status'],
+                'specifications': _safe_json_load(fan['specifications']),
+                'weights': _safe_json_load(fan['weights']),
+                'costs': _safe_json_load(fan['costs']),
+                'motor': _safe_json_load(fan['motor']),
+                'updated_at': fan['updated_at']
+            }
+            for fan in fans
+        ]
+    }
+
+def get_projects_with_fans(sales_engineer=None, status=None, month=None):
+    """Load every matching project with its fans in two queries (used by bulk exports)."""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        where = "WHERE 1=1"
+        params = []
+        if sales_engineer:
+            where += " AND sales_engineer = ?"
+            params.append(sales_engineer)
+        if status:
+            where += " AND status = ?"
+            params.append(status)
+        if month:
+            where += " AND month = ?"
+            params.append(month)
+        
+        cursor.execute(f"SELECT * FROM Projects {where} ORDER BY enquiry_number", params)
+        projects = cursor.fetchall()
+        
+        cursor.execute(f'''
+            SELECT project_id, fan_number, status, specifications, weights, costs, motor, updated_at
+            FROM Fans
+            WHERE status != 'removed' AND project_id IN (SELECT id FROM Projects {where})
+            ORDER BY project_id, fan_number
+        ''', params)
+        fans_by_project = {}
+        for fan in cursor.fetchall():
+            fans_by_project.setdefault(fan['project_id'], []).append(fan)
+        
+        conn.close()
+        return [_build_project_dict(p, fans_by_project.get(p['id'], [])) for p in projects]
+        
+    except Exception as e:
+        logger.error(f"Error loading projects for export: {str(e)}")
+        raise
+
 def search_projects(query=None, limit=50):
     """Search projects by enquiry number or customer name."""
     try:
@@ -747,7 +1040,7 @@ def save_fan(enquiry_number, fan_number, specifications, weights=None, costs=Non
                     project_id,
                     fan_number
                 ))
-                logger.info(f"Updated existing fan {fan_number} for project {enquiry_number}")
+                logger.info("Updated existing fan %s for project %s", fan_number, enquiry_number)
             else:
                 # Create new fan
                 cursor.execute('''
@@ -762,10 +1055,11 @@ def save_fan(enquiry_number, fan_number, specifications, weights=None, costs=Non
                     json.dumps(costs) if costs else None,
                     json.dumps(motor) if motor else None
                 ))
-                logger.info(f"Created new fan {fan_number} for project {enquiry_number}")
+                logger.info("Created new fan %s for project %s", fan_number, enquiry_number)
             
             conn.commit()
-            return True
+        _invalidate_project_artifacts(enquiry_number)
+        return True
             
     except Exception as e:
         logger.error(f"Error saving fan: {str(e)}")
@@ -795,7 +1089,11 @@ def init_db():
         return False
 
 def get_dashboard_stats(sales_engineer=None, status=None, month=None, search=None):
-    """Calculate and return dashboard statistics, with optional filtering."""
+    """Calculate and return dashboard statistics, with optional filtering.
+
+    Totals come from one GROUP BY over the maintained Projects.total_value
+    column; the recent-project list is a separate indexed query with LIMIT.
+    """
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -804,97 +1102,101 @@ def get_dashboard_stats(sales_engineer=None, status=None, month=None, search=Non
         has_remarks = _table_has_column(cursor, 'Projects', 'remarks')
         has_month = _table_has_column(cursor, 'Projects', 'month')
         
-        cols = "p.id, p.enquiry_number, p.customer_name, p.sales_engineer, p.status, p.probability, p.updated_at, p.created_at, f.costs"
-        if has_remarks:
-            cols += ", p.remarks"
-        if has_month:
-            cols += ", p.month"
-            
-        # Build query dynamically based on filters
-        query = f'''
-        SELECT {cols}
-        FROM Projects p
-        LEFT JOIN Fans f ON p.id = f.project_id
-        WHERE p.status != 'removed'
-        '''
-        
+        # Build filters dynamically
+        where = "WHERE p.status != 'removed'"
         params = []
         if sales_engineer:
-            query += " AND p.sales_engineer = ?"
+            where += " AND p.sales_engineer = ?"
             params.append(sales_engineer)
         if status:
-            query += " AND p.status = ?"
+            where += " AND p.status = ?"
             params.append(status)
         if month:
-            query += " AND p.month = ?"
+            where += " AND p.month = ?"
             params.append(month)
         if search:
-            query += " AND (p.enquiry_number LIKE ? OR p.customer_name LIKE ?)"
+            where += " AND (p.enquiry_number LIKE ? OR p.customer_name LIKE ?)"
             params.extend([f'%{search}%', f'%{search}%'])
-            
-        cursor.execute(query, params)
-        
-        rows = cursor.fetchall()
         
-        # Process rows into project summaries
-        projects_dict = {}
-        for row in rows:
-            p_id = int(row['id'])
-            if p_id not in projects_dict:
-                projects_dict[p_id] = {
-                    'enquiry_number': str(row['enquiry_number']),
-                    'customer_name': str(row['customer_name']),
-                    'sales_engineer': str(row['sales_engineer']),
-                    'status': str(row['status']) if row['status'] else 'Live',
-                    'probability': int(row['probability']) if row['probability'] is not None else 50,
-                    'remarks': str(row['remarks']) if 'remarks' in row.keys() and row['remarks'] is not None else '',
-                    'month': str(row['month']) if 'month' in row.keys() and row['month'] is not None else '',
-                    'updated_at': str(row['updated_at']) if 'updated_at' in row.keys() else str(row['created_at']),
-                    'total_value': 0.0,
-                    'fan_count': 0
-                }
-            
-            # extract cost
-            costs_json = _safe_json_load(row['costs'])
-            if costs_json and 'total_selling_price' in costs_json:
-                projects_dict[p_id]['total_value'] += float(costs_json['total_selling_price'])
-                projects_dict[p_id]['fan_count'] += 1
-                
-        # Now aggregate stats
-        all_projects = list(projects_dict.values())
-        all_projects.sort(key=lambda x: str(x['updated_at']), reverse=True)
+        # A blank status counts as Live, a missing probability as 50
+        cursor.execute(f'''
+            SELECT p.sales_engineer,
+                   CASE WHEN p.status = '' THEN 'Live' ELSE p.status END AS status,
+                   COUNT(*) AS projects,
+                   SUM(p.total_value) AS total_value,
+                   SUM(CAST(COALESCE(p.probability, 50) AS INTEGER)) AS probability
+            FROM Projects p
+            {where}
+            GROUP BY 1, 2
+        ''', params)
+        groups = cursor.fetchall()
         
         stats = {
-            'total_live_value': sum(float(p['total_value']) for p in all_projects if p['status'] == 'Live'),
-            'total_ordered_value': sum(float(p['total_value']) for p in all_projects if p['status'] == 'Ordered'),
-            'active_enquiries': sum(1 for p in all_projects if p['status'] == 'Live'),
+            'total_live_value': 0.0,
+            'total_ordered_value': 0.0,
+            'active_enquiries': 0,
             'avg_conversion': 0.0,
             
             # Sales Engineer breakdown
             'engineers': {},
             
             # List of all recent projects
-            'recent_projects': all_projects[:100] # Cap for UI performance
+            'recent_projects': []
         }
         
-        # Calculate Average Conversion across active
-        live_projects = [p for p in all_projects if p['status'] == 'Live']
-        if live_projects:
-            stats['avg_conversion'] = float(sum(int(p['probability']) for p in live_projects)) / len(live_projects)
+        live_probability = 0
+        for row in groups:
+            if row['status'] == 'Live':
+                stats['total_live_value'] += row['total_value']
+                stats['active_enquiries'] += row['projects']
+                live_probability += row['probability']
+            elif row['status'] == 'Ordered':
+                stats['total_ordered_value'] += row['total_value']
             
-        # Group by Sales Engineer
-        for p in all_projects:
-            se = str(p['sales_engineer'])
+            # Group by Sales Engineer
+            se = str(row['sales_engineer'])
             if not se: continue
             
             if se not in stats['engineers']:
                 stats['engineers'][se] = {'live_enquiries': 0, 'live_value': 0.0, 'ordered_value': 0.0}
             
-            if p['status'] == 'Live':
-                stats['engineers'][se]['live_enquiries'] += 1
-                stats['engineers'][se]['live_value'] += float(p['total_value'])
-            elif p['status'] == 'Ordered':
-                stats['engineers'][se]['ordered_value'] += float(p['total_value'])
+            if row['status'] == 'Live':
+                stats['engineers'][se]['live_enquiries'] += row['projects']
+                stats['engineers'][se]['live_value'] += row['total_value']
+            elif row['status'] == 'Ordered':
+                stats['engineers'][se]['ordered_value'] += row['total_value']
+        
+        # Calculate Average Conversion across active
+        if stats['active_enquiries']:
+            stats['avg_conversion'] = float(live_probability) / stats['active_enquiries']
+        
+        cols = "p.enquiry_number, p.customer_name, p.sales_engineer, p.status, p.probability, p.updated_at, p.total_value, p.priced_fan_count"
+        if has_remarks:
+            cols += ", p.remarks"
+        if has_month:
+            cols += ", p.month"
+        
+        cursor.execute(f'''
+            SELECT {cols}
+            FROM Projects p
+            {where}
+            ORDER BY p.updated_at DESC, p.id
+            LIMIT 100
+        ''', params)  # Cap for UI performance
+        
+        for row in cursor.fetchall():
+            stats['recent_projects'].append({
+                'enquiry_number': str(row['enquiry_number']),
+                'customer_name': str(row['customer_name']),
+                'sales_engineer': str(row['sales_engineer']),
+                'status': str(row['status']) if row['status'] else 'Live',
+                'probability': int(row['probability']) if row['probability'] is not None else 50,
+                'remarks': str(row['remarks']) if has_remarks and row['remarks'] is not None else '',
+                'month': str(row['month']) if has_month and row['month'] is not None else '',
+                'updated_at': str(row['updated_at']),
+                'total_value': float(row['total_value']),
+                'fan_count': int(row['priced_fan_count'])
+            })
                 
         conn.close()
         return stats
@@ -935,141 +1237,163 @@ def update_project_status(enquiry_number, status, probability, remarks=None, los
         success = cursor.rowcount > 0
         conn.commit()
         conn.close()
+        if success:
+            _invalidate_project_artifacts(enquiry_number)
         return success
     except Exception as e:
         logger.error(f"Error updating project status: {str(e)}")
         raise 
 
+ORDER_COLUMN_MAP = {
+    'JOB REF': 'job_ref',
+    'YEAR': 'year',
+    'Customer Name': 'customer_name',
+    'Sales Engineer': 'sales_engineer',
+    'Region': 'region',
+    'Order Value, INR': 'order_value',
+    'Our Cost, INR': 'our_cost',
+    'Warranty': 'warranty',
+    'Contribution Value, INR': 'contribution_value',
+    'Contribution Value, %': 'contribution_percentage',
+    'QTY': 'qty',
+    'Month': 'month',
+    'REP': 'rep',
+    'TYPE OF CUSTOMER': 'type_of_customer',
+    'SECTOR': 'sector',
+    'CUSTOMER PO NUMBER': 'po_number',
+    'END USER': 'end_user',
+    'REMARKS': 'remarks'
+}
+ORDER_NUMERIC_COLUMNS = ['order_value', 'our_cost', 'contribution_value', 'contribution_percentage', 'qty']
+ORDERS_SHEET = "Order Register - From 2019"
+
+ENQUIRY_COLUMN_MAP = {'ENQ NO': 'enquiry_number', 'YEAR': 'year', 'SALES ENGINEER': 'sales_engineer', 'CUSTOMER NAME': 'customer_name', 'Region': 'region'}
+ENQUIRIES_SHEET = 'Enquiry Register - From 2019'
+ENQUIRY_MONTHS = {'01':'January','02':'February','03':'March','04':'April','05':'May','06':'June','07':'July','08':'August','09':'September','10':'October','11':'November','12':'December'}
+
+def _map_sheet_columns(df, column_map):
+    """Select and rename the expected columns, matching headers case-insensitively."""
+    df.columns = [str(c).strip() for c in df.columns]
+    actual_cols = df.columns.tolist()
+    final_map = {}
+    for expected_col, db_col in column_map.items():
+        # Find the closest match (ignoring case and extra spaces)
+        match = next((c for c in actual_cols if str(c).lower().strip() == expected_col.lower().strip()), None)
+        if match:
+            final_map[match] = db_col
+    return df[list(final_map.keys())].rename(columns=final_map)
+
+def read_orders_sheet(file):
+    """Read and clean the order register sheet.
+
+    Returns the cleaned frame (index = Excel row - 2) and the raw mapped frame the
+    upload preview uses to report dropped rows, or (None, None) without a JOB REF column.
+    """
+    import pandas as pd
+    
+    raw = _map_sheet_columns(pd.read_excel(file, sheet_name=ORDERS_SHEET), ORDER_COLUMN_MAP)
+    if 'job_ref' not in raw.columns:
+        return None, None
+    
+    # Clean data: drop rows without JOB REF
+    df = raw.dropna(subset=['job_ref']).copy()
+    df['job_ref'] = df['job_ref'].astype(str).str.strip()
+    df = df[(df['job_ref'] != '') & (df['job_ref'] != 'nan')]
+    
+    # Drop duplicates, keeping the LAST occurrence (which usually represents the most recent update)
+    df = df.drop_duplicates(subset=['job_ref'], keep='last')
+    
+    # Convert numerical columns
+    for col in ORDER_NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df, raw
+
+def apply_orders(df) -> int:
+    """Sync Orders with a cleaned order register frame. Returns the number of rows written."""
+    import numpy as np
+    
+    # Replace NaN with None for SQLite
+    df = df.astype(object).where(df.notna(), None)
+    for col in ORDER_COLUMN_MAP.values():
+        if col not in df.columns:
+            df[col] = None
+    records = df.to_dict('records')
+    
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    
+    # Keep track of job refs in Excel
+    excel_job_refs = df['job_ref'].tolist()
+    
+    # Delete orders that are no longer in the Excel file
+    if excel_job_refs:
+        # We delete any order originating from excel that is not in the current excel file
+        # SQLite IN clause limits at 999 parameters typically, so we delete in batches
+        batch_size = 900
+        
+        # First get all excel source orders
+        cursor.execute("SELECT job_ref FROM Orders WHERE source = 'excel'")
+        existing_excel_orders = {row[0] for row in cursor.fetchall()}
+        
+        # Find which ones to delete
+        excel_job_refs_set = set(excel_job_refs)
+        refs_to_delete = list(existing_excel_orders - excel_job_refs_set)
+        
+        for i in range(0, len(refs_to_delete), batch_size):
+            batch = refs_to_delete[i:i + batch_size]
+            placeholders = ','.join(['?'] * len(batch))
+            cursor.execute(f"DELETE FROM Orders WHERE job_ref IN ({placeholders}) AND source = 'excel'", batch)
+            logger.info(f"Deleted {len(batch)} old orders not in current Excel.")
+    
+    # Use UPSERT (INSERT ON CONFLICT DO UPDATE)
+    # This preserves manual entries/edits (since the primary unique key is job_ref)
+    cursor.executemany('''
+        INSERT INTO Orders (
+            job_ref, year, customer_name, sales_engineer, region, 
+            order_value, our_cost, warranty, contribution_value, 
+            contribution_percentage, qty, month, rep, type_of_customer, 
+            sector, po_number, end_user, remarks, source
+        ) VALUES (
+            :job_ref, :year, :customer_name, :sales_engineer, :region,
+            :order_value, :our_cost, :warranty, :contribution_value,
+            :contribution_percentage, :qty, :month, :rep, :type_of_customer,
+            :sector, :po_number, :end_user, :remarks, 'excel'
+        ) ON CONFLICT(job_ref) DO UPDATE SET
+            year=excluded.year,
+            customer_name=excluded.customer_name,
+            sales_engineer=excluded.sales_engineer,
+            region=excluded.region,
+            order_value=excluded.order_value,
+            our_cost=excluded.our_cost,
+            warranty=excluded.warranty,
+            contribution_value=excluded.contribution_value,
+            contribution_percentage=excluded.contribution_percentage,
+            qty=excluded.qty,
+            month=excluded.month,
+            rep=excluded.rep,
+            type_of_customer=excluded.type_of_customer,
+            sector=excluded.sector,
+            po_number=excluded.po_number,
+            end_user=excluded.end_user,
+            remarks=excluded.remarks
+    ''', records)
+    
+    from services.order_cadence import refresh_order_cadence
+    refresh_order_cadence(cursor)
+    
+    conn.commit()
+    conn.close()
+    return len(records)
+
 def import_orders_from_excel(file) -> bool:
     """Import orders from the uploaded Excel file using pandas."""
     try:
-        import pandas as pd
-        import numpy as np
-        
         logger.info("Starting order import from Excel")
-        # Read the "Order Register - From 2019" sheet
-        df = pd.read_excel(file, sheet_name="Order Register - From 2019")
-        
-        # Clean column names first
-        df.columns = [str(c).strip() for c in df.columns]
-        
-        # Mapping Excel columns to DB columns
-        col_map = {
-            'JOB REF': 'job_ref',
-            'YEAR': 'year',
-            'Customer Name': 'customer_name',
-            'Sales Engineer': 'sales_engineer',
-            'Region': 'region',
-            'Order Value, INR': 'order_value',
-            'Our Cost, INR': 'our_cost',
-            'Warranty': 'warranty',
-            'Contribution Value, INR': 'contribution_value',
-            'Contribution Value, %': 'contribution_percentage',
-            'QTY': 'qty',
-            'Month': 'month',
-            'REP': 'rep',
-            'TYPE OF CUSTOMER': 'type_of_customer',
-            'SECTOR': 'sector',
-            'CUSTOMER PO NUMBER': 'po_number',
-            'END USER': 'end_user',
-            'REMARKS': 'remarks'
-        }
-        
-        # Case insensitive mapping fallback
-        actual_cols = df.columns.tolist()
-        final_map = {}
-        for expected_col, db_col in col_map.items():
-            # Find the closest match (ignoring case and extra spaces)
-            match = next((c for c in actual_cols if str(c).lower().strip() == expected_col.lower().strip()), None)
-            if match:
-                final_map[match] = db_col
-        
-        # Select and rename columns
-        df = df[list(final_map.keys())].rename(columns=final_map)
-        
-        # Clean data: drop rows without JOB REF
-        if 'job_ref' not in df.columns: return False
-        df = df.dropna(subset=['job_ref'])
-        df['job_ref'] = df['job_ref'].astype(str).str.strip()
-        df = df[df['job_ref'] != '']
-        df = df[df['job_ref'] != 'nan']
-        
-        # Drop duplicates, keeping the LAST occurrence (which usually represents the most recent update)
-        df = df.drop_duplicates(subset=['job_ref'], keep='last')
-        
-        # Convert numerical columns
-        num_cols = ['order_value', 'our_cost', 'contribution_value', 'contribution_percentage', 'qty']
-        for col in num_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-            
-        # Replace NaN with None for SQLite
-        df = df.replace({np.nan: None})
-        
-        records = df.to_dict('records')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Keep track of job refs in Excel
-        excel_job_refs = df['job_ref'].tolist()
-        
-        # Delete orders that are no longer in the Excel file
-        if excel_job_refs:
-            # We delete any order originating from excel that is not in the current excel file
-            # SQLite IN clause limits at 999 parameters typically, so we delete in batches
-            batch_size = 900
-            
-            # First get all excel source orders
-            cursor.execute("SELECT job_ref FROM Orders WHERE source = 'excel'")
-            existing_excel_orders = {row[0] for row in cursor.fetchall()}
-            
-            # Find which ones to delete
-            excel_job_refs_set = set(excel_job_refs)
-            refs_to_delete = list(existing_excel_orders - excel_job_refs_set)
-            
-            for i in range(0, len(refs_to_delete), batch_size):
-                batch = refs_to_delete[i:i + batch_size]
-                placeholders = ','.join(['?'] * len(batch))
-                cursor.execute(f"DELETE FROM Orders WHERE job_ref IN ({placeholders}) AND source = 'excel'", batch)
-                logger.info(f"Deleted {len(batch)} old orders not in current Excel.")
-        
-        # Use UPSERT (INSERT ON CONFLICT DO UPDATE)
-        # This preserves manual entries/edits (since the primary unique key is job_ref)
-        cursor.executemany('''
-            INSERT INTO Orders (
-                job_ref, year, customer_name, sales_engineer, region, 
-                order_value, our_cost, warranty, contribution_value, 
-                contribution_percentage, qty, month, rep, type_of_customer, 
-                sector, po_number, end_user, remarks, source
-            ) VALUES (
-                :job_ref, :year, :customer_name, :sales_engineer, :region,
-                :order_value, :our_cost, :warranty, :contribution_value,
-                :contribution_percentage, :qty, :month, :rep, :type_of_customer,
-                :sector, :po_number, :end_user, :remarks, 'excel'
-            ) ON CONFLICT(job_ref) DO UPDATE SET
-                year=excluded.year,
-                customer_name=excluded.customer_name,
-                sales_engineer=excluded.sales_engineer,
-                region=excluded.region,
-                order_value=excluded.order_value,
-                our_cost=excluded.our_cost,
-                warranty=excluded.warranty,
-                contribution_value=excluded.contribution_value,
-                contribution_percentage=excluded.contribution_percentage,
-                qty=excluded.qty,
-                month=excluded.month,
-                rep=excluded.rep,
-                type_of_customer=excluded.type_of_customer,
-                sector=excluded.sector,
-                po_number=excluded.po_number,
-                end_user=excluded.end_user,
-                remarks=excluded.remarks
-        ''', records)
-        
-        conn.commit()
-        conn.close()
-        logger.info(f"Successfully imported {len(records)} orders")
+        df, _ = read_orders_sheet(file)
+        if df is None: return False
+        count = apply_orders(df)
+        logger.info(f"Successfully imported {count} orders")
         return True
         
     except Exception as e:
@@ -1095,67 +1419,69 @@ def get_orders():
         logger.error(f"Error retrieving orders: {str(e)}")
         return []
 
+def read_enquiries_sheet(file):
+    """Read and clean the enquiry register sheet; see read_orders_sheet()."""
+    import pandas as pd
+    
+    raw = _map_sheet_columns(pd.read_excel(file, sheet_name=ENQUIRIES_SHEET), ENQUIRY_COLUMN_MAP)
+    if 'enquiry_number' not in raw.columns:
+        return None, None
+    df = raw.dropna(subset=['enquiry_number']).copy()
+    df['enquiry_number'] = df['enquiry_number'].astype(str).str.strip()
+    df = df.drop_duplicates(subset=['enquiry_number'], keep='last')
+    
+    # Month comes from the EQyyMM prefix of the enquiry number
+    enq = df['enquiry_number']
+    month = enq.str[4:6].map(ENQUIRY_MONTHS).fillna('Unknown')
+    df['month'] = month.where(enq.str.startswith('EQ') & (enq.str.len() >= 6), 'Unknown')
+    return df, raw
+
+def apply_enquiries(df) -> int:
+    """Sync EnquiryRegister with a cleaned enquiry register frame. Returns the rows written."""
+    df = df.astype(object).where(df.notna(), None)
+    for col in list(ENQUIRY_COLUMN_MAP.values()) + ['month']:
+        if col not in df.columns:
+            df[col] = None
+    recs = df.to_dict('records')
+    conn = get_db_connection(); cursor = conn.cursor()
+    
+    # Clear out enquiries that are no longer in Excel
+    excel_enq_numbers = df['enquiry_number'].tolist()
+    if excel_enq_numbers:
+        batch_size = 900
+        cursor.execute("SELECT enquiry_number FROM EnquiryRegister WHERE source = 'excel'")
+        existing_excel_enqs = {row[0] for row in cursor.fetchall()}
+        
+        excel_enq_set = set(excel_enq_numbers)
+        enqs_to_delete = list(existing_excel_enqs - excel_enq_set)
+        
+        for i in range(0, len(enqs_to_delete), batch_size):
+            batch = enqs_to_delete[i:i + batch_size]
+            placeholders = ','.join(['?'] * len(batch))
+            cursor.execute(f"DELETE FROM EnquiryRegister WHERE enquiry_number IN ({placeholders}) AND source = 'excel'", batch)
+            logger.info(f"Deleted {len(batch)} old enquiries not in current Excel.")
+    
+    cursor.executemany('''
+        INSERT INTO EnquiryRegister (
+            enquiry_number, year, month, sales_engineer, customer_name, region, source
+        ) VALUES (
+            :enquiry_number, :year, :month, :sales_engineer, :customer_name, :region, "excel"
+        ) ON CONFLICT(enquiry_number) DO UPDATE SET
+            year=excluded.year,
+            month=excluded.month,
+            sales_engineer=excluded.sales_engineer,
+            customer_name=excluded.customer_name,
+            region=excluded.region
+    ''', recs)
+    conn.commit(); conn.close()
+    return len(recs)
+
 def import_enquiries_from_excel(file) -> bool:
     """Import enquiry register from Excel."""
     try:
-        import pandas as pd
-        import numpy as np
-        df = pd.read_excel(file, sheet_name='Enquiry Register - From 2019')
-        df.columns = [str(c).strip() for c in df.columns]
-        mapping = {'ENQ NO': 'enquiry_number', 'YEAR': 'year', 'SALES ENGINEER': 'sales_engineer', 'CUSTOMER NAME': 'customer_name', 'Region': 'region'}
-        
-        # Case insensitive mapping fallback
-        actual_cols = df.columns.tolist()
-        final_map = {}
-        for expected_col, db_col in mapping.items():
-            match = next((c for c in actual_cols if str(c).lower().strip() == expected_col.lower().strip()), None)
-            if match:
-                final_map[match] = db_col
-                
-        df = df[list(final_map.keys())].rename(columns=final_map)
-        if 'enquiry_number' not in df.columns: return False
-        df = df.dropna(subset=['enquiry_number'])
-        df['enquiry_number'] = df['enquiry_number'].astype(str).str.strip()
-        df = df.drop_duplicates(subset=['enquiry_number'], keep='last')
-        def get_m(enq):
-            if len(enq) >= 6 and enq.startswith('EQ'):
-                m = {'01':'January','02':'February','03':'March','04':'April','05':'May','06':'June','07':'July','08':'August','09':'September','10':'October','11':'November','12':'December'}
-                return m.get(enq[4:6], 'Unknown')
-            return 'Unknown'
-        df['month'] = df['enquiry_number'].apply(get_m)
-        df = df.replace({np.nan: None})
-        recs = df.to_dict('records')
-        conn = get_db_connection(); cursor = conn.cursor()
-        
-        # Clear out enquiries that are no longer in Excel
-        excel_enq_numbers = df['enquiry_number'].tolist()
-        if excel_enq_numbers:
-            batch_size = 900
-            cursor.execute("SELECT enquiry_number FROM EnquiryRegister WHERE source = 'excel'")
-            existing_excel_enqs = {row[0] for row in cursor.fetchall()}
-            
-            excel_enq_set = set(excel_enq_numbers)
-            enqs_to_delete = list(existing_excel_enqs - excel_enq_set)
-            
-            for i in range(0, len(enqs_to_delete), batch_size):
-                batch = enqs_to_delete[i:i + batch_size]
-                placeholders = ','.join(['?'] * len(batch))
-                cursor.execute(f"DELETE FROM EnquiryRegister WHERE enquiry_number IN ({placeholders}) AND source = 'excel'", batch)
-                logger.info(f"Deleted {len(batch)} old enquiries not in current Excel.")
-        
-        cursor.executemany('''
-            INSERT INTO EnquiryRegister (
-                enquiry_number, year, month, sales_engineer, customer_name, region, source
-            ) VALUES (
-                :enquiry_number, :year, :month, :sales_engineer, :customer_name, :region, "excel"
-            ) ON CONFLICT(enquiry_number) DO UPDATE SET
-                year=excluded.year,
-                month=excluded.month,
-                sales_engineer=excluded.sales_engineer,
-                customer_name=excluded.customer_name,
-                region=excluded.region
-        ''', recs)
-        conn.commit(); conn.close()
+        df, _ = read_enquiries_sheet(file)
+        if df is None: return False
+        apply_enquiries(df)
         return True
     except Exception as e:
         logger.error(f"Error importing enquiries: {e}")
@@ -1198,9 +1524,9 @@ def bulk_import_from_excel(file) -> dict:
             
         # Run ML engine to link customers and remove duplicates
         try:
-            from scripts.run_customer_matcher import deduplicate_and_link_customers
-            deduplicate_and_link_customers()
-            results["messages"].append("Successfully linked and deduplicated customers using ML engine.")
+            from scripts.run_customer_matcher import deduplicate_and_link_customers, format_stage_counts
+            stages = deduplicate_and_link_customers()
+            results["messages"].append(f"Successfully linked and deduplicated customers using ML engine ({format_stage_counts(stages)}).")
         except Exception as e:
             logger.error(f"Error running ML Customer matching: {str(e)}")
             results["messages"].append(f"Customer deduplication error: {str(e)}")
@@ -1231,8 +1557,23 @@ def get_combined_enquiry_data(sales_engineer=None, month=None, region=None, cust
     except Exception as e:
         logger.error(f"Error: {e}"); return []
 
+AI_INSIGHTS_TTL = int(os.environ.get('AI_INSIGHTS_TTL', 3600))
+
 def get_ai_insights():
-    """Generate rule-based AI insights from historical data."""
+    """Dashboard insights, served from CacheEntries and refreshed in the background once stale."""
+    try:
+        from services.result_cache import get_or_compute
+        return get_or_compute('ai_insights', compute_ai_insights, AI_INSIGHTS_TTL)
+    except Exception as e:
+        logger.error(f"Error generating AI insights: {str(e)}")
+        return []
+
+def compute_ai_insights():
+    """Generate rule-based AI insights from historical data.
+
+    Returns (insights, meta) where meta['timings_ms'] is the time each insight type took.
+    """
+    timings = {}
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -1240,6 +1581,7 @@ def get_ai_insights():
         insights = []
         
         # 1. Lead Prioritization (Hot Leads)
+        section_start = time.perf_counter()
         cursor.execute('''
             SELECT enquiry_number, customer_name, probability 
             FROM Projects 
@@ -1258,7 +1600,10 @@ def get_ai_insights():
                 'color': '#10b981'
             })
 
+        timings['hot_lead'] = round((time.perf_counter() - section_start) * 1000, 2)
+        
         # 2. Stale Alerts (Enquiries)
+        section_start = time.perf_counter()
         has_updated_at = _table_has_column(cursor, 'Projects', 'updated_at')
         if has_updated_at:
             cursor.execute('''
@@ -1277,42 +1622,19 @@ def get_ai_insights():
                     'color': '#f59e0b'
                 })
 
+        timings['stale'] = round((time.perf_counter() - section_start) * 1000, 2)
+        
         # 2.b. Predictive Churn (Customer Stale Alerts)
+        section_start = time.perf_counter()
         try:
-            from datetime import datetime
-            cursor.execute("SELECT customer_name, month FROM Orders WHERE customer_name IS NOT NULL AND month IS NOT NULL")
-            all_orders = cursor.fetchall()
+            from services.order_cadence import refresh_order_cadence, get_churn_risks
+            cursor.execute("SELECT 1 FROM OrderCadenceQueue LIMIT 1")
+            if cursor.fetchone():
+                refresh_order_cadence(cursor)
+                conn.commit()
             
-            customer_dates = {}
-            for row in all_orders:
-                c_name = row['customer_name'].strip().upper()
-                month_str = row['month'].strip() # format: "Jan-26"
-                try:
-                    dt = datetime.strptime(month_str, '%b-%y')
-                    if c_name not in customer_dates:
-                        customer_dates[c_name] = []
-                    customer_dates[c_name].append(dt)
-                except ValueError:
-                    pass
-
-            churn_risks = []
-            now = datetime.now()
-            for c_name, dates in customer_dates.items():
-                if len(dates) >= 3:
-                    dates.sort()
-                    # Calculate average days between orders
-                    intervals = [(dates[i] - dates[i-1]).days for i in range(1, len(dates))]
-                    avg_interval = sum(intervals) / len(intervals) if intervals else 0
-                    
-                    if avg_interval > 0:
-                        days_since_last = (now - dates[-1]).days
-                        # If it's been 1.5x longer than their usual order interval
-                        if days_since_last > (avg_interval * 1.5) and days_since_last > 45:
-                            churn_risks.append((c_name, days_since_last))
-
-            # Pick top 2 churn risks 
-            churn_risks.sort(key=lambda x: x[1], reverse=True)
-            for c_name, days in churn_risks[:2]:
+            # Customers ordering less often than their usual interval (CustomerOrderCadence)
+            for c_name, days in get_churn_risks(cursor, limit=2):
                 insights.append({
                     'type': 'churn_risk',
                     'title': 'Predictive Churn Alert',
@@ -1323,24 +1645,31 @@ def get_ai_insights():
         except Exception as e:
             logger.error(f"Error calculating predictive churn: {str(e)}")
 
+        timings['churn_risk'] = round((time.perf_counter() - section_start) * 1000, 2)
+        
         # 3. Revenue Forecasting
-        cursor.execute('''
-            SELECT SUM((SELECT SUM(CAST(json_extract(f.costs, "$.total_selling_price") AS REAL)) 
-                        FROM Fans f WHERE f.project_id = p.id) * p.probability / 100.0) as forecast
-            FROM Projects p
-            WHERE p.status = 'Live'
-        ''')
-        forecast = cursor.fetchone()['forecast'] or 0
-        if forecast > 0:
-            insights.append({
-                'type': 'forecast',
-                'title': 'Revenue Forecast',
-                'text': f"High confidence of hitting ₹{(forecast/10000000):.2f}Cr in orders based on current 'Live' pipeline.",
-                'icon': 'insights',
-                'color': '#3b82f6'
-            })
+        section_start = time.perf_counter()
+        try:
+            # Monte Carlo over the Live pipeline (services.forecast)
+            from services.forecast import get_revenue_forecast
+            forecast = get_revenue_forecast()
+            if forecast['total']['p50'] > 0:
+                total = forecast['total']
+                insights.append({
+                    'type': 'forecast',
+                    'title': 'Revenue Forecast',
+                    'text': f"The 'Live' pipeline should convert to about ₹{(total['p50']/10000000):.2f}Cr in orders "
+                            f"(₹{(total['p10']/10000000):.2f}Cr to ₹{(total['p90']/10000000):.2f}Cr in 8 of 10 simulations).",
+                    'icon': 'insights',
+                    'color': '#3b82f6'
+                })
+        except Exception as e:
+            logger.error(f"Error forecasting revenue: {str(e)}")
 
+        timings['forecast'] = round((time.perf_counter() - section_start) * 1000, 2)
+        
         # 4. Market Intelligence (Region Trends)
+        section_start = time.perf_counter()
         cursor.execute('''
             SELECT region, COUNT(*) as count 
             FROM Orders 
@@ -1359,7 +1688,10 @@ def get_ai_insights():
                 'color': '#8b5cf6'
             })
 
+        timings['market'] = round((time.perf_counter() - section_start) * 1000, 2)
+        
         # 5. Team Performance
+        section_start = time.perf_counter()
         cursor.execute("SELECT COUNT(*) as count FROM Orders WHERE month = strftime('%m', 'now')")
         this_month_orders = cursor.fetchone()['count'] or 0
         insights.append({
@@ -1370,12 +1702,16 @@ def get_ai_insights():
             'color': '#6366f1'
         })
         
+        timings['team'] = round((time.perf_counter() - section_start) * 1000, 2)
+        
         conn.close()
-        return insights
+        logger.info(f"Computed AI insights in {sum(timings.values()):.1f}ms: {timings}")
+        return insights, {'timings_ms': timings}
         
     except Exception as e:
+        # Raise so a failed run is never cached
         logger.error(f"Error generating AI insights: {str(e)}")
-        return []
+        raise
 
 def derive_enquiry_date(enq_num):
     if not enq_num or not isinstance(enq_num, str):
@@ -1630,56 +1966,39 @@ def update_customer_visit(customer_id, visit_date):
         return False
 
 def get_suggested_merges():
-    """Find pairs of customers with highly similar names to suggest merges."""
+    """Top stored merge suggestions, refreshing any customers changed since the last call."""
     try:
-        from services.customer_matcher import similarity_score, clean_company_name
+        from services.merge_candidates import refresh_merge_candidates, get_merge_candidates
         conn = get_db_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT id, primary_name FROM Customers ORDER BY id DESC")
-        customers = cursor.fetchall()
-        
-        # Pre-clean names to save time in the O(N^2) loop
-        cleaned_customers = []
-        for c in customers:
-            cleaned_customers.append({
-                'id': c['id'],
-                'primary_name': c['primary_name'],
-                'cleaned_name': clean_company_name(c['primary_name'])
-            })
+        cursor.execute("SELECT 1 FROM MergeCandidateQueue LIMIT 1")
+        if cursor.fetchone():
+            cursor.execute("BEGIN IMMEDIATE")
+            refresh_merge_candidates(cursor)
+            conn.commit()
         
-        suggestions = []
-        # O(N^2) but fine for a small dataset.
-        for i in range(len(cleaned_customers)):
-            name1 = cleaned_customers[i]['cleaned_name']
-            if len(name1) < 3: continue
-            
-            for j in range(i + 1, len(cleaned_customers)):
-                name2 = cleaned_customers[j]['cleaned_name']
-                if len(name2) < 3: continue
-                
-                score = similarity_score(name1, name2)
-                if 0.85 <= score < 0.99: # Highly similar but not identical
-                    suggestions.append({
-                        'primary_customer': {
-                            'id': cleaned_customers[i]['id'],
-                            'primary_name': cleaned_customers[i]['primary_name']
-                        },
-                        'secondary_customer': {
-                            'id': cleaned_customers[j]['id'],
-                            'primary_name': cleaned_customers[j]['primary_name']
-                        },
-                        'score': score
-                    })
-                    
+        suggestions = get_merge_candidates(cursor, limit=20)
         conn.close()
-        # Sort by highest score first
-        suggestions.sort(key=lambda x: x['score'], reverse=True)
-        return suggestions[:20] # Return top 20 suggestions
+        return suggestions
     except Exception as e:
         logger.error(f"Error getting suggested merges: {str(e)}")
         return []
 
+def dismiss_suggested_merge(primary_id, secondary_id):
+    """Stop suggesting a pair of customers as duplicates."""
+    try:
+        from services.merge_candidates import dismiss_merge_candidate
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        dismissed = dismiss_merge_candidate(cursor, int(primary_id), int(secondary_id))
+        conn.commit()
+        conn.close()
+        return dismissed
+    except Exception as e:
+        logger.error(f"Error dismissing merge suggestion: {str(e)}")
+        return False
+
 def merge_customers(primary_id, secondary_id):
     """Merge secondary customer into primary, reassigning all related records."""
     try:
@@ -1825,6 +2144,9 @@ def add_manual_order(data):
             data.get('qty', 1)
         ))
         
+        from services.order_cadence import refresh_order_cadence
+        refresh_order_cadence(cursor)
+        
         conn.commit()
         conn.close()
         return True, "Order saved successfully"
@@ -28,33 +28,22 @@ def upload_motor_prices():
             return "No selected file", 400
         if file:
             try:
-                from import_motor_prices_excel import import_motor_prices_from_excel
+                from services.upload_validation import stage_motor_prices
                 # Reset file pointer just in case
                 file.stream.seek(0)
-                success = import_motor_prices_from_excel(file)
+                version_id, report = stage_motor_prices(file, created_by=session.get('username'), source=file.filename)
                 
-                if success:
-                    return f"""
-                    <html>
-                    <head>
-                        <title>Success - TCF Database Admin</title>
-                        <style>
-                            body {{ font-family: Arial, sans-serif; margin: 40px; text-align: center; }}
-                            .success {{ color: green; font-size: 24px; margin-bottom: 20px; }}
-                            .links a {{ display: inline-block; margin: 0 10px; padding: 10px 20px; background: #4CAF50; color: white; text-decoration: none; border-radius: 4px; }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="success">✅ Motor Prices Updated Successfully!</div>
-                        <div class="links">
-                            <a href="/db-admin/view-table/unified/MotorPrices">View Updated Table</a>
-                            <a href="/">Back to Main App</a>
-                        </div>
-                    </body>
-                    </html>
-                    """
+                if version_id:
+                    actions = f"""
+                    <form method="post" action="/db-admin/price-lists/{version_id}/publish" style="display:inline;">
+                        <button type="submit">Publish Price List</button>
+                    </form>
+                    <form method="post" action="/db-admin/price-lists/{version_id}/discard" style="display:inline;">
+                        <button type="submit" class="secondary">Discard</button>
+                    </form>"""
                 else:
-                    return "Import failed. Check server logs for details.", 500
+                    actions = '<a href="/db-admin/upload-motor-prices">Fix the file and upload again</a>'
+                return _render_upload_preview('Motor Price Upload Preview', [report], [], actions)
             except Exception as e:
                 logger.error(f"Upload error: {e}")
                 return f"Error: {str(e)}", 500
@@ -81,18 +70,401 @@ def upload_motor_prices():
                 <b>Brand, Motor kW, Pole, Efficiency, Price</b>
             </div>
             <input type="file" name="file" accept=".xlsx,.xls">
-            <button type="submit">Upload and Update Database</button>
+            <button type="submit">Upload and Preview Changes</button>
         </form>
         <p><a href="/db-admin">Back to Admin Panel</a></p>
     </body>
     </html>
     """
 
+def _render_issue(issue, css_class):
+    detail = ""
+    if issue.get('rows'):
+        more = " ..." if issue.get('count', 0) > len(issue['rows']) else ""
+        detail = f"<div class='detail'>Excel rows: {', '.join(map(str, issue['rows']))}{more}</div>"
+    elif issue.get('keys'):
+        detail = "<div class='detail'>" + "<br>".join(html.escape(str(k)) for k in issue['keys']) + "</div>"
+    count = f" ({issue['count']})" if issue.get('count') else ""
+    return f"<li class='{css_class}'>{html.escape(issue['message'])}{count}{detail}</li>"
+
+def _render_upload_preview(title, reports, messages, actions):
+    """HTML diff/validation summary shown before an upload is applied."""
+    sections = ""
+    for report in reports:
+        diff = report['diff']
+        issues = "".join(_render_issue(i, 'error') for i in report['errors'])
+        issues += "".join(_render_issue(i, 'warning') for i in report['warnings'])
+        
+        change_rows = ""
+        for sample in diff['changes']:
+            for col, change in sample['changes'].items():
+                pct = f" ({change['pct']:+.1f}%)" if 'pct' in change else ""
+                change_rows += (f"<tr><td>{html.escape(sample['key'])}</td><td>{html.escape(col)}</td>"
+                                f"<td>{html.escape(str(change['old']))}</td><td>{html.escape(str(change['new']))}{pct}</td></tr>")
+        price_change = report.get('price_change')
+        price_note = (f"<p>Average change {price_change['mean_pct']:+.1f}%, largest increase {price_change['max_increase_pct']:+.1f}%, "
+                      f"largest decrease {price_change['max_decrease_pct']:+.1f}%</p>") if price_change and diff['changed'] else ""
+        
+        sections += f"""
+        <h2>{html.escape(report['dataset'].replace('_', ' ').title())}</h2>
+        <p>{report['valid_rows']} of {report['rows']} rows valid &middot; validated in {report['elapsed_ms']} ms</p>
+        <table class="summary">
+            <tr><th>Added</th><th>Removed</th><th>Changed</th><th>Unchanged</th></tr>
+            <tr><td>{diff['added']}</td><td>{diff['removed']}</td><td>{diff['changed']}</td><td>{diff['unchanged']}</td></tr>
+        </table>
+        {price_note}
+        <ul class="issues">{issues}</ul>
+        {"<h3>Changes (first 50)</h3><table><tr><th>Key</th><th>Field</th><th>Current</th><th>New</th></tr>" + change_rows + "</table>" if change_rows else ""}
+        {"<h3>Added</h3><div class='detail'>" + html.escape(', '.join(diff['added_keys'])) + "</div>" if diff['added_keys'] else ""}
+        {"<h3>Removed</h3><div class='detail'>" + html.escape(', '.join(diff['removed_keys'])) + "</div>" if diff['removed_keys'] else ""}
+        """
+    
+    notes = "".join(f"<li class='warning'>{html.escape(m)}</li>" for m in messages)
+    return f"""
+    <html>
+    <head>
+        <title>{title} - TCF Database Admin</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 40px; }}
+            table {{ border-collapse: collapse; margin: 10px 0; }}
+            th, td {{ border: 1px solid #ddd; padding: 6px 10px; text-align: left; }}
+            th {{ background-color: #f2f2f2; }}
+            .error {{ color: #b91c1c; }}
+            .warning {{ color: #b45309; }}
+            .detail {{ color: #666; font-size: 0.85em; margin: 4px 0 8px 0; }}
+            .actions {{ margin-top: 30px; }}
+            button {{ background-color: #4CAF50; color: white; border: none; padding: 10px 20px; cursor: pointer; border-radius: 4px; margin-right: 10px; }}
+            button.secondary {{ background-color: #9ca3af; }}
+        </style>
+    </head>
+    <body>
+        <h1>{title}</h1>
+        <p>Nothing has been changed yet. Review the differences below, then apply or discard the upload.</p>
+        <ul>{notes}</ul>
+        {sections}
+        <div class="actions">{actions}</div>
+        <p><a href="/db-admin">Back to Admin Panel</a></p>
+    </body>
+    </html>
+    """
+
+def _stage_and_preview(stream, title, datasets=('orders', 'enquiries'), link_customers=True):
+    from services.upload_validation import stage_master_data
+    token, reports, messages = stage_master_data(stream, datasets=datasets)
+    if token and not any(r['errors'] for r in reports):
+        actions = f"""
+        <form method="post" action="/db-admin/uploads/{token}/confirm" style="display:inline;">
+            <input type="hidden" name="link_customers" value="{1 if link_customers else 0}">
+            <button type="submit">Apply Changes</button>
+        </form>
+        <form method="post" action="/db-admin/uploads/{token}/discard" style="display:inline;">
+            <button type="submit" class="secondary">Discard</button>
+        </form>"""
+    else:
+        if token:
+            from services.upload_validation import discard_staged_upload
+            discard_staged_upload(token)
+        actions = '<a href="/db-admin">Fix the file and upload again</a>'
+    return _render_upload_preview(title, reports, messages, actions)
+
+@db_admin_bp.route('/uploads/<token>/confirm', methods=['POST'])
+def confirm_upload(token):
+    """Apply a previewed order/enquiry upload."""
+    from services.upload_validation import commit_staged_upload
+    try:
+        messages = commit_staged_upload(token, link_customers=request.form.get('link_customers') == '1')
+    except ValueError as e:
+        return f"Error: {str(e)}", 400
+    except Exception as e:
+        logger.error(f"Error applying upload {token}: {e}")
+        return f"Error: {str(e)}", 500
+    
+    msg_html = "<ul>" + "".join([f"<li>{html.escape(m)}</li>" for m in messages]) + "</ul>"
+    return f"""
+    <html>
+    <head><title>Import Results</title><style>body{{font-family:sans-serif;margin:40px;}} .msg{{margin:20px 0;}}</style></head>
+    <body>
+        <h1 style='color:green'>Import Results</h1>
+        <div class='msg'>{msg_html}</div>
+        <p><a href='/db-admin'>Back to Admin</a> | <a href='/orders'>Orders</a> | <a href='/enquiry-register'>Enquiry Register</a></p>
+    </body>
+    </html>
+    """
+
+@db_admin_bp.route('/uploads/<token>/discard', methods=['POST'])
+def discard_upload(token):
+    from services.upload_validation import discard_staged_upload
+    try:
+        discard_staged_upload(token)
+    except ValueError as e:
+        return f"Error: {str(e)}", 400
+    return redirect('/db-admin')
+
+@db_admin_bp.route('/price-lists/<int:version_id>/discard', methods=['POST'])
+def discard_price_list_version(version_id):
+    from services.price_lists import discard_price_list
+    discard_price_list(version_id)
+    return redirect('/db-admin/price-lists')
+
+@db_admin_bp.route('/price-lists')
+def price_lists():
+    """List motor price list versions with their publication history."""
+    from services.price_lists import list_price_list_versions
+    try:
+        versions = list_price_list_versions()
+    except Exception as e:
+        logger.error(f"Error listing price lists: {e}")
+        return f"Error: {str(e)}", 500
+
+    rows = ""
+    for v in versions:
+        action = "<b>Live</b>" if v['is_current'] else f"""
+            <form method="post" action="/db-admin/price-lists/{v['id']}/publish" style="margin:0;"
+                  onsubmit="return confirm('Make version {v['id']} the live motor price list?');">
+                <button type="submit">{'Roll back to this' if v['status'] == 'published' else 'Publish'}</button>
+            </form>"""
+        rows += f"""
+            <tr>
+                <td>{v['id']}</td>
+                <td>{html.escape(v['status'])}</td>
+                <td>{v['row_count']}</td>
+                <td>{html.escape(str(v['source'] or ''))}</td>
+                <td>{html.escape(str(v['created_by'] or ''))}</td>
+                <td>{html.escape(str(v['created_at'] or ''))}</td>
+                <td>{html.escape(str(v['published'] or '-'))}</td>
+                <td>{action}</td>
+            </tr>"""
+
+    return f"""
+    <html>
+    <head>
+        <title>Motor Price Lists - TCF Database Admin</title>
+        <style>
+            body {{ font-family: Arial, sans-serif; margin: 40px; }}
+            table {{ border-collapse: collapse; width: 100%; }}
+            th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+            th {{ background-color: #f2f2f2; }}
+            button {{ background-color: #4CAF50; color: white; border: none; padding: 5px 10px; cursor: pointer; border-radius: 4px; }}
+        </style>
+    </head>
+    <body>
+        <h1>Motor Price List Versions</h1>
+        <p><a href="/db-admin/upload-motor-prices">Upload New Price List</a> | <a href="/db-admin">Back to Admin Panel</a></p>
+        <table>
+            <tr><th>Version</th><th>Status</th><th>Rows</th><th>Source</th><th>Uploaded By</th><th>Uploaded At</th><th>Effective From</th><th></th></tr>
+            {rows}
+        </table>
+    </body>
+    </html>
+    """
+
+@db_admin_bp.route('/price-lists/<int:version_id>/publish', methods=['POST'])
+def publish_price_list_version(version_id):
+    """Publish a staged price list or roll back to an earlier one."""
+    from services.price_lists import rollback_price_list
+    try:
+        rollback_price_list(version_id, published_by=session.get('username'))
+    except ValueError as e:
+        return f"Error: {str(e)}", 400
+    except Exception as e:
+        logger.error(f"Error publishing price list {version_id}: {e}")
+        return f"Error: {str(e)}", 500
+    return redirect('/db-admin/price-lists')
+
+_PROFILE_STYLE = """
+        <style>
+            body { font-family: Arial, sans-serif; margin: 40px; }
+            table { border-collapse: collapse; width: 100%; }
+            th, td { border: 1px solid #ddd; padding: 6px 8px; text-align: left; }
+            td.num { text-align: right; font-family: monospace; }
+            th { background-color: #f2f2f2; }
+            button { background-color: #4CAF50; color: white; border: none; padding: 5px 10px; cursor: pointer; border-radius: 4px; }
+        </style>"""
+
+@db_admin_bp.route('/profiles')
+def profiles():
+    """List stored request profiles; pick two to compare."""
+    from services.profiling import list_profiles
+    try:
+        stored = list_profiles()
+    except Exception as e:
+        logger.error(f"Error listing profiles: {e}")
+        return f"Error: {str(e)}", 500
+
+    rows = ""
+    for p in stored:
+        name = html.escape(p['name'])
+        rows += f"""
+            <tr>
+                <td><input type="radio" name="a" value="{name}"> <input type="radio" name="b" value="{name}"></td>
+                <td>{p['time'].strftime('%Y-%m-%d %H:%M:%S')}</td>
+                <td>{html.escape(p['endpoint'])}</td>
+                <td class="num">{p['elapsed_ms']}</td>
+                <td><a href="/db-admin/profiles/{name}">Top functions</a> | <a href="/db-admin/profiles/{name}/download">Download</a></td>
+            </tr>"""
+
+    return f"""
+    <html>
+    <head><title>Request Profiles - TCF Database Admin</title>{_PROFILE_STYLE}</head>
+    <body>
+        <h1>Request Profiles</h1>
+        <p>Add <code>?_profile=1</code> or an <code>X-Profile: 1</code> header to any request while logged in as admin to profile it.
+           PROFILE_SAMPLE_RATE samples other requests. Downloads open with <code>python -m pstats</code> or snakeviz.</p>
+        <p><a href="/db-admin">Back to Admin Panel</a></p>
+        <form method="get" action="/db-admin/profiles/compare">
+            <table>
+                <tr><th>A / B</th><th>Time</th><th>Endpoint</th><th>ms</th><th></th></tr>
+                {rows or '<tr><td colspan="5">No profiles yet.</td></tr>'}
+            </table>
+            <p><button type="submit">Compare A with B</button></p>
+        </form>
+    </body>
+    </html>
+    """
+
+@db_admin_bp.route('/profiles/compare')
+def compare_profile_pair():
+    """Function timings of two profiles side by side, biggest changes first."""
+    from services.profiling import compare_profiles
+    sort = request.args.get('sort', 'cumtime')
+    try:
+        rows, total_a, total_b = compare_profiles(request.args.get('a'), request.args.get('b'), sort=sort)
+    except ValueError as e:
+        return f"Error: {str(e)}", 400
+
+    body = "".join(f"""
+            <tr>
+                <td>{html.escape(r['function'])}</td>
+                <td class="num">{r['a']['calls']}</td><td class="num">{r['a'][sort]:.4f}</td>
+                <td class="num">{r['b']['calls']}</td><td class="num">{r['b'][sort]:.4f}</td>
+                <td class="num">{r['delta']:+.4f}</td>
+            </tr>""" for r in rows)
+    return f"""
+    <html>
+    <head><title>Compare Profiles - TCF Database Admin</title>{_PROFILE_STYLE}</head>
+    <body>
+        <h1>Compare Profiles ({html.escape(sort)})</h1>
+        <p>A: {html.escape(request.args.get('a'))} ({total_a:.3f}s)<br>B: {html.escape(request.args.get('b'))} ({total_b:.3f}s)</p>
+        <p><a href="/db-admin/profiles">Back to Profiles</a></p>
+        <table>
+            <tr><th>Function</th><th>A calls</th><th>A {html.escape(sort)}</th><th>B calls</th><th>B {html.escape(sort)}</th><th>B - A</th></tr>
+            {body}
+        </table>
+    </body>
+    </html>
+    """
+
+@db_admin_bp.route('/profiles/<name>')
+def view_profile(name):
+    """Most expensive functions of one profile."""
+    from services.profiling import top_functions
+    sort = request.args.get('sort', 'cumtime')
+    try:
+        functions, total = top_functions(name, sort=sort)
+    except ValueError as e:
+        return f"Error: {str(e)}", 404
+
+    body = "".join(f"""
+            <tr>
+                <td>{html.escape(f['function'])}</td>
+                <td class="num">{f['calls']}</td><td class="num">{f['tottime']:.4f}</td><td class="num">{f['cumtime']:.4f}</td>
+            </tr>""" for f in functions)
+    return f"""
+    <html>
+    <head><title>{html.escape(name)} - TCF Database Admin</title>{_PROFILE_STYLE}</head>
+    <body>
+        <h1>{html.escape(name)}</h1>
+        <p>Total {total:.3f}s. Sort by <a href="?sort=cumtime">cumtime</a> | <a href="?sort=tottime">tottime</a> | <a href="?sort=calls">calls</a></p>
+        <p><a href="/db-admin/profiles/{html.escape(name)}/download">Download</a> | <a href="/db-admin/profiles">Back to Profiles</a></p>
+        <table>
+            <tr><th>Function</th><th>Calls</th><th>tottime (s)</th><th>cumtime (s)</th></tr>
+            {body}
+        </table>
+    </body>
+    </html>
+    """
+
+@db_admin_bp.route('/profiles/<name>/download')
+def download_profile(name):
+    from flask import send_file
+    from services.profiling import profile_path
+    try:
+        return send_file(profile_path(name), as_attachment=True, download_name=name, mimetype='application/octet-stream')
+    except ValueError as e:
+        return f"Error: {str(e)}", 404
+
+def _mib(value):
+    return f"{value / (1024 * 1024):,.1f}"
+
+@db_admin_bp.route('/memory')
+def memory():
+    """This worker's RSS, per-endpoint allocation figures and top allocation sites."""
+    from datetime import datetime
+    from services.memory_tracking import memory_report
+    try:
+        report = memory_report()
+    except Exception as e:
+        logger.error(f"Error building memory report: {e}")
+        return f"Error: {str(e)}", 500
+
+    summary = f"""
+        <p>Worker {report['pid']}: RSS {_mib(report['rss'])} MiB, peak RSS {_mib(report['peak_rss'])} MiB,
+           {report['requests']} requests tracked.</p>"""
+    if not report['enabled']:
+        summary += "<p>Allocation tracking is off. Start the app with <code>MEMORY_TRACKING=1</code> to record it.</p>"
+        sections = ""
+    else:
+        summary += f"<p>Traced now {_mib(report['traced'])} MiB, traced peak {_mib(report['traced_peak'])} MiB.</p>"
+        endpoints = "".join(f"""
+            <tr><td>{html.escape(e['endpoint'])}</td><td class="num">{e['requests']}</td>
+                <td class="num">{_mib(e['avg_peak'])}</td><td class="num">{_mib(e['max_peak'])}</td>
+                <td class="num">{_mib(e['retained'])}</td><td class="num">{_mib(e['rss_growth'])}</td></tr>""" for e in report['endpoints'])
+        top = "".join(f"""
+            <tr><td>{html.escape(s['site'])}</td><td class="num">{_mib(s['size'])}</td><td class="num">{s['count']:,}</td></tr>""" for s in report['top_sites'])
+        growth = "".join(f"""
+            <tr><td>{html.escape(s['site'])}</td><td class="num">{_mib(s['size_diff'])}</td><td class="num">{s['count_diff']:+,}</td>
+                <td class="num">{_mib(s['size'])}</td></tr>""" for s in report['growth_sites'])
+        baseline_at = datetime.fromtimestamp(report['baseline_at']).strftime('%Y-%m-%d %H:%M:%S') if report['baseline_at'] else None
+        sections = f"""
+        <h2>Endpoints (MiB)</h2>
+        <table>
+            <tr><th>Endpoint</th><th>Requests</th><th>Avg peak</th><th>Max peak</th><th>Retained</th><th>RSS growth</th></tr>
+            {endpoints or '<tr><td colspan="6">No requests yet.</td></tr>'}
+        </table>
+        <h2>Largest allocation sites</h2>
+        <table>
+            <tr><th>Site</th><th>MiB</th><th>Blocks</th></tr>
+            {top}
+        </table>
+        <h2>Growth since baseline {f'({baseline_at})' if baseline_at else ''}</h2>
+        <form method="post" action="/db-admin/memory/baseline"><button type="submit">Reset baseline</button></form>
+        <table>
+            <tr><th>Site</th><th>MiB change</th><th>Blocks change</th><th>MiB now</th></tr>
+            {growth or '<tr><td colspan="4">No baseline yet.</td></tr>'}
+        </table>"""
+
+    return f"""
+    <html>
+    <head><title>Memory - TCF Database Admin</title>{_PROFILE_STYLE}</head>
+    <body>
+        <h1>Worker Memory</h1>
+        <p><a href="/db-admin">Back to Admin Panel</a></p>
+        {summary}
+        <p>Figures are for the worker that served this page; /metrics has them for all workers.</p>
+        {sections}
+    </body>
+    </html>
+    """
+
+@db_admin_bp.route('/memory/baseline', methods=['POST'])
+def memory_baseline():
+    from services.memory_tracking import reset_baseline
+    reset_baseline()
+    return redirect('/db-admin/memory')
+
 @db_admin_bp.route('/upload-orders', methods=['GET', 'POST'])
 def upload_orders():
     """Upload new orders master data from Excel."""
-    from database import import_orders_from_excel
-    
     if request.method == 'POST':
         if 'file' not in request.files:
             return "No file part", 400
@@ -103,30 +475,7 @@ def upload_orders():
             try:
                 # Reset file pointer just in case
                 file.stream.seek(0)
-                success = import_orders_from_excel(file)
-                
-                if success:
-                    return f"""
-                    <html>
-                    <head>
-                        <title>Success - TCF Database Admin</title>
-                        <style>
-                            body {{ font-family: Arial, sans-serif; margin: 40px; text-align: center; }}
-                            .success {{ color: green; font-size: 24px; margin-bottom: 20px; }}
-                            .links a {{ display: inline-block; margin: 0 10px; padding: 10px 20px; background: #4CAF50; color: white; text-decoration: none; border-radius: 4px; }}
-                        </style>
-                    </head>
-                    <body>
-                        <div class="success">✅ Order Details Updated Successfully!</div>
-                        <div class="links">
-                            <a href="/orders">View Orders Dashboard</a>
-                            <a href="/">Back to Main App</a>
-                        </div>
-                    </body>
-                    </html>
-                    """
-                else:
-                    return "Import failed. Check server logs for details. Make sure the 'Order Register - From 2019' sheet exists.", 500
+                return _stage_and_preview(file.stream, 'Order Upload Preview', datasets=('orders',), link_customers=False)
             except Exception as e:
                 logger.error(f"Upload error: {e}")
                 return f"Error: {str(e)}", 500
@@ -152,7 +501,7 @@ def upload_orders():
                 Please upload the Master Sales Excel Data Tracker.
             </div>
             <input type="file" name="file" accept=".xlsx,.xls,.xlsm">
-            <button type="submit">Upload and Replace Orders Database</button>
+            <button type="submit">Upload and Preview Changes</button>
         </form>
         <p><a href="/db-admin">Back to Admin Panel</a></p>
     </body>
@@ -162,7 +511,6 @@ def upload_orders():
 @db_admin_bp.route('/upload-master-data', methods=['GET', 'POST'])
 def upload_master_data():
     """Upload both Orders and Enquiries from one master Excel file."""
-    from database import bulk_import_from_excel
     if request.method == 'POST':
         if 'file' not in request.files: return "No file", 400
         file = request.files['file']
@@ -171,21 +519,7 @@ def upload_master_data():
             try:
                 # Use stream to avoid saving file if not needed, but pandas needs a file-like object
                 file.stream.seek(0)
-                res = bulk_import_from_excel(file.stream)
-                
-                status_color = "green" if (res["orders"] or res["enquiries"]) else "red"
-                msg_html = "<ul>" + "".join([f"<li>{m}</li>" for m in res["messages"]]) + "</ul>"
-                
-                return f"""
-                <html>
-                <head><title>Import Results</title><style>body{{font-family:sans-serif;margin:40px;}} .msg{{margin:20px 0;}}</style></head>
-                <body>
-                    <h1 style='color:{status_color}'>Import Results</h1>
-                    <div class='msg'>{msg_html}</div>
-                    <p><a href='/db-admin'>Back to Admin</a> | <a href='/orders'>Orders</a> | <a href='/enquiry-register'>Enquiry Register</a></p>
-                </body>
-                </html>
-                """
+                return _stage_and_preview(file.stream, 'Master Data Upload Preview')
             except Exception as e: return f"Error: {str(e)}", 500
             
     return """
@@ -197,7 +531,7 @@ def upload_master_data():
         <form method="post" enctype="multipart/form-data">
             <input type="file" name="file" accept=".xlsx,.xls,.xlsm" required>
             <br><br>
-            <button type="submit" style="padding:10px 20px; background:#4CAF50; color:white; border:none; border-radius:4px; cursor:pointer;">Upload and Sync Everything</button>
+            <button type="submit" style="padding:10px 20px; background:#4CAF50; color:white; border:none; border-radius:4px; cursor:pointer;">Upload and Preview Changes</button>
         </form>
         <p><a href="/db-admin">Back to Admin Panel</a></p>
     </body>
@@ -266,6 +600,9 @@ def view_db(db_name):
         <div class="back-link">
             <a href="/">← Back to Main App</a>
             <a href="/db-admin/upload-master-data" style="background-color: #f59e0b; margin-left: 10px;">Upload Master Sales Excel</a>
+            <a href="/db-admin/price-lists" style="margin-left: 10px;">Motor Price Lists</a>
+            <a href="/db-admin/profiles" style="margin-left: 10px;">Request Profiles</a>
+            <a href="/db-admin/memory" style="margin-left: 10px;">Memory</a>
         </div>
         
         <div>
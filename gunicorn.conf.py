@@ -1,6 +1,7 @@
 import multiprocessing
 
 # Gunicorn config variables
+# Compare worker/thread counts with benchmarks/load_test.py --configs before changing them
 workers = multiprocessing.cpu_count() * 2 + 1
 worker_class = "gthread"
 threads = 2
@@ -8,4 +9,9 @@ bind = "0.0.0.0:10000"
 timeout = 120
 keepalive = 5
 max_requests = 1000
-max_requests_jitter = 50 
\ No newline at end of file
+max_requests_jitter = 50 
+
+def child_exit(server, worker):
+    # Runs in the master, also for workers SIGKILLed on timeout that never released their slots
+    from services.metrics import registry
+    registry.forget_worker(worker.pid)
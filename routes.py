@@ -1,8 +1,9 @@
-from flask import render_template, request, jsonify, redirect, url_for, session, flash, send_file
+from flask import render_template, request, jsonify, redirect, url_for, session, flash, send_file, current_app
 import logging
 from database import get_db_connection, load_dropdown_options
 from services.excel_service import ExcelService
-from calculations import calculate_fan_weight, calculate_fabrication_cost, calculate_bought_out_components, ACCESSORY_NAME_MAP
+from services.logging_config import log_payload
+from calculations import calculate_fan_weight, calculate_fabrication_cost, calculate_bought_out_components, price_fan, ACCESSORY_NAME_MAP
 import json
 import os
 from datetime import datetime
@@ -17,6 +18,7 @@ from openpyxl.workbook import Workbook
 from openpyxl.styles.borders import Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 from io import BytesIO
+from werkzeug.wsgi import ClosingIterator
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +75,54 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def _send_cached_artifact(project, kind, mimetype, download_name, as_attachment):
+    """Serve a generated file from the artifact cache with ETag/304 support."""
+    from services.artifact_cache import get_artifact_cache, artifact_spec, build_artifact
+    
+    cache = get_artifact_cache()
+    key = cache.key_for(project, kind)
+    
+    if request.if_none_match.contains(key):
+        response = current_app.response_class(status=304)
+    else:
+        ext = artifact_spec(kind)[0]
+        data = cache.get_or_build(project['enquiry_number'], key, ext, lambda: build_artifact(kind, project))
+        response = send_file(
+            BytesIO(data),
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            etag=False
+        )
+    
+    response.set_etag(key)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Bump when the JSON shape of a _conditional_json endpoint changes, so browsers drop their copies
+API_RESPONSE_VERSION = 1
+
+def _conditional_json(kind, version, build):
+    """Serve build() as JSON under a strong ETag derived from version, or 304 if the client has it.
+
+    version must change whenever build()'s result would; it is read before
+    building, so a concurrent write can only make the tag older than the body.
+    With no version the response carries no ETag. Returns None if build()
+    finds nothing.
+    """
+    etag = f"{kind}-{version}-v{API_RESPONSE_VERSION}" if version is not None else None
+    if etag and request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        data = build()
+        if data is None:
+            return None
+        response = jsonify(data)
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 def register_routes(app):
     """Register all routes for the application."""
     
@@ -151,7 +201,7 @@ def register_routes(app):
     def load_enquiry(enquiry_number):
         """Load a specific enquiry and all its fan data from unified database."""
         try:
-            logger.info(f"Loading enquiry: {enquiry_number}")
+            logger.debug("Loading enquiry: %s", enquiry_number)
             
             # Load from unified database using get_project function
             from database import get_project
@@ -164,7 +214,7 @@ def register_routes(app):
                     'message': f'No enquiry found with number {enquiry_number}'
                 }), 404
             
-            logger.info(f"Project loaded successfully: {enquiry_number}, fans: {len(project.get('fans', []))}")
+            logger.debug("Project loaded successfully: %s, fans: %d", enquiry_number, len(project.get('fans', [])))
             
             # Convert project data to the format expected by the frontend
             project_data = {
@@ -187,7 +237,7 @@ def register_routes(app):
                 }
                 fans_data.append(fan_data)
             
-            logger.info(f"Successfully loaded project {enquiry_number} with {len(fans_data)} fans")
+            logger.debug("Successfully loaded project %s with %d fans", enquiry_number, len(fans_data))
             
             return jsonify({
                 'success': True,
@@ -209,212 +259,16 @@ def register_routes(app):
         """Calculate weight and cost based on form data."""
         try:
             data = request.json
-            logger.info("Calculating fan data")
-            logger.info(f"Received data: {data}")
-            
-            fan_data = {
-                'Fan Model': data.get('Fan Model') or data.get('Fan_Model') or data.get('fan_model'),
-                'Fan Size': data['Fan_Size'],
-                'Class': data['Class'],
-                'Arrangement': data['Arrangement'],
-                'Arrangement': data['Arrangement'],
-                'Arrangement': data['Arrangement'],
-                'vendor': data.get('vendor', 'TCF Factory'),
-                'vendor_rate': data.get('vendor_rate'),
-                'air_flow': data.get('air_flow'),
-                'static_pressure': data.get('static_pressure'),
-                'material': data.get('material', 'ms'),
-                'vibration_isolators': data.get('vibration_isolators', 'not_required'),
-                'fabrication_margin': float(data.get('fabrication_margin', 25) or 25),
-                'bought_out_margin': float(data.get('bought_out_margin', 25) or 25),
-                'ms_percentage': data.get('ms_percentage'),
-                'motor_brand': data.get('motor_brand', ''),
-                'motor_kw': data.get('motor_kw', ''),
-                'pole': data.get('pole', ''),
-                'efficiency': data.get('efficiency', ''),
-                'motor_discount': float(data.get('motor_discount', 0) or 0),
-                'drive_pack': data.get('drive_pack'),
-                'customAccessories': data.get('customAccessories', {}),
-                'optional_items': data.get('optional_items', {})
-            }
-            
-            # Get selected accessories
-            selected_accessories = []
-            if 'accessories' in data:
-                if isinstance(data['accessories'], dict):
-                    selected_accessories = [key for key, value in data['accessories'].items() if value]
-                elif isinstance(data['accessories'], list):
-                    selected_accessories = data['accessories']
-            
-            # Add custom material data if present
-            if fan_data['material'] == 'others':
-                for i in range(5):
-                    weight_key = f'material_weight_{i}'
-                    name_key = f'material_name_{i}'
-                    rate_key = f'material_rate_{i}'
-                    if weight_key in data and data[weight_key] and str(data[weight_key]).strip():
-                        fan_data[weight_key] = float(data[weight_key])
-                    if name_key in data:
-                        fan_data[name_key] = data[name_key]
-                    if rate_key in data and data[rate_key] and str(data[rate_key]).strip():
-                        fan_data[rate_key] = float(data[rate_key])
-                no_of_isolators = data.get('no_of_isolators')
-                shaft_diameter = data.get('shaft_diameter')
-            
-            # Always allow manual override for shaft/isolators from frontend
-            # These might be sent as empty strings, so filter them
-            manual_isolators = data.get('no_of_isolators')
-            manual_shaft = data.get('shaft_diameter')
-            
-            # Helper to convert to int/float or None
-            def parse_manual_input(val, type_func):
-                if val is not None and str(val).strip():
-                    try:
-                        return type_func(val)
-                    except (ValueError, TypeError):
-                        return None
-                return None
-
-            manual_isolators = parse_manual_input(manual_isolators, int)
-            manual_shaft = parse_manual_input(manual_shaft, float)
+            log_payload(logger, "Calculating fan data: %s", data)
             
             with get_db_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Get fan weight data
-                bare_fan_weight, db_no_of_isolators, db_shaft_diameter, total_weight, fan_error, accessory_details = calculate_fan_weight(
-                    cursor, fan_data, selected_accessories
-                )
-
-                # Check for missing accessory weights
-                missing_accessories = []
-                for name, weight in accessory_details.items():
-                    if weight is None:
-                        missing_accessories.append(name)
-                
-                if missing_accessories:
-                    logger.warning(f"Missing weights for accessories: {missing_accessories}")
-                    return jsonify({
-                        'success': False, 
-                        'message': f"Weight data missing for: {', '.join(missing_accessories)}.",
-                        'error_type': 'missing_weights',
-                        'missing_accessories': missing_accessories
-                    }), 400
-                
-                # Logic for Isolators and Shaft Diameter:
-                # 1. Use manual input if provided
-                # 2. Else use DB value
-                # 3. Else fail if required (we can let calculation fail or return specific error)
-
-                no_of_isolators = manual_isolators if manual_isolators is not None else db_no_of_isolators
-                shaft_diameter = manual_shaft if manual_shaft is not None else db_shaft_diameter
-                
-                # Update total weight if it was None (should happen if bare fan weight is missing)
-                # calculate_fan_weight returns None for total_weight if bare_fan_weight is None
-                
-                if fan_error:
-                    # If specific error (like bare fan weight missing), return it
-                    logger.error(f"Error in fan weight calculation: {fan_error}")
-                    return jsonify({'success': False, 'message': fan_error}), 400
-
-                # Validate Shaft Diameter if needed for Bought Out (e.g. Bearings)
-                # For Arrangement 4, shaft diameter might not be strictly needed for bearings (embedded), 
-                # but might be needed for other checks.
-                # However, calculate_bought_out_components handles validation.
-                
-                # Calculate fabrication cost
-                fabrication_cost, total_weight, custom_weights, rate_used, fab_error = calculate_fabrication_cost(cursor, fan_data, total_weight)
-                if fab_error:
-                    logger.error(f"Error in fabrication cost calculation: {fab_error}")
-                    return jsonify({'success': False, 'message': fab_error}), 400
-
-                # Calculate bought out components cost
-                bought_out_result, error = calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_diameter)
-                if error:
-                    logger.error(f"Error in bought out components calculation: {error}")
-                    return jsonify({'success': False, 'message': error}), 400
-                
-                # Extract individual component costs
-                bought_out_cost = bought_out_result['total_cost']
-                vibration_isolators_price = bought_out_result['vibration_isolators_price']
-                bearing_price = bought_out_result['bearing_price']
-                drive_pack_price = bought_out_result['drive_pack_price']
-                motor_list_price = bought_out_result['motor_list_price']
-                motor_discount = bought_out_result['motor_discount']
-                discounted_motor_price = bought_out_result['discounted_motor_price']
-                
-                # Add optional items to bought out cost
-                optional_items_cost = 0
-                optional_items_detail = {}
-                
-                if 'optional_items' in fan_data:
-                    for item_name, item_price in fan_data['optional_items'].items():
-                        if item_price and str(item_price).strip() and float(item_price) > 0:
-                            optional_items_cost += float(item_price)
-                            optional_items_detail[item_name] = float(item_price)
-                
-                bought_out_cost += optional_items_cost
-                
-                # Calculate total costs and margins (do not add optional_items_cost again)
-                fabrication_selling_price = fabrication_cost / (1 - fan_data['fabrication_margin'] / 100)
-                bought_out_selling_price = bought_out_cost / (1 - fan_data['bought_out_margin'] / 100)
-                total_selling_price = fabrication_selling_price + bought_out_selling_price
-                
-                # Calculate total job margin on raw costs (fab + BO including optionals already in BO)
-                total_raw_cost = fabrication_cost + bought_out_cost
-                if total_raw_cost > 0:
-                    total_job_margin = (1 - (total_raw_cost / total_selling_price)) * 100
-                else:
-                    total_job_margin = 0
-                
-                # Calculate standard accessories weight
-                standard_accessory_weight = sum(weight for name, weight in accessory_details.items() 
-                                             if name in ACCESSORY_NAME_MAP.values())
-                
-                # Calculate custom accessories weight
-                custom_accessory_weight = sum(weight for name, weight in accessory_details.items() 
-                                           if name not in ACCESSORY_NAME_MAP.values())
-                
-                # Prepare response data
-                response_data = {
-                    'success': True,
-                    'bare_fan_weight': bare_fan_weight,
-                    'accessory_weights': standard_accessory_weight + custom_accessory_weight,
-                    'total_weight': total_weight,
-                    'weights': {
-                        'total_weight': total_weight,
-                        'bare_fan_weight': bare_fan_weight,
-                        'accessory_weight_details': accessory_details,
-                        'custom_weights': custom_weights,
-                        'shaft_diameter': shaft_diameter,
-                        'no_of_isolators': no_of_isolators
-                    },
-                    'fabrication_cost': fabrication_cost,
-                    'bought_out_cost': bought_out_cost,
-                    'optional_items_cost': optional_items_cost,
-                    'optional_items_detail': optional_items_detail,
-                    'total_raw_cost': total_raw_cost,
-                    'fabrication_selling_price': fabrication_selling_price,
-                    'bought_out_selling_price': bought_out_selling_price,
-                    'total_selling_price': total_selling_price,
-                    'total_job_margin': total_job_margin,
-                    'custom_accessories': {
-                        'weights': {name: weight for name, weight in accessory_details.items() 
-                                  if name not in ACCESSORY_NAME_MAP.values()}
-                    },
-                    'vibration_isolators_price': vibration_isolators_price,
-                    'bearing_price': bearing_price,
-                    'drive_pack_price': drive_pack_price,
-                    'motor_list_price': motor_list_price,
-                    'discounted_motor_price': discounted_motor_price,
-                    'motor_discount': motor_discount,
-                    'no_of_isolators': no_of_isolators,
-                    'shaft_diameter': shaft_diameter,
-                    'vendor_rate': rate_used
-                }
-                
-                logger.info(f"Calculation response: {response_data}")
-                return jsonify(response_data)
+                result, error = price_fan(conn.cursor(), data)
+            if error:
+                return jsonify(dict(error, success=False)), 400
+            
+            response_data = dict(success=True, **result)
+            log_payload(logger, "Calculation response: %s", response_data)
+            return jsonify(response_data)
                 
         except Exception as e:
             logger.error(f"Error in calculate_fan: {str(e)}", exc_info=True)
@@ -471,13 +325,13 @@ def register_routes(app):
     def api_get_project(enquiry_number):
         """Get project by enquiry number."""
         try:
-            from database import get_project
-            project = get_project(enquiry_number)
-            
-            if not project:
+            from database import get_project, get_project_version
+            response = _conditional_json('project', get_project_version(enquiry_number), lambda: get_project(enquiry_number))
+
+            if response is None:
                 return jsonify({'error': 'Project not found'}), 404
-            
-            return jsonify(project)
+
+            return response
                 
         except Exception as e:
             logger.error(f"Error getting project: {str(e)}")
@@ -489,25 +343,17 @@ def register_routes(app):
         """Generate and download a PDF quote for the given project."""
         try:
             from database import get_project
-            from services.pdf_generator import generate_quotation_pdf
-            import importlib
-            import os
+            from services.artifact_cache import QUOTE_PDF
             
             project = get_project(enquiry_number)
             if not project:
                 return jsonify({'error': 'Project not found'}), 404
-                
-            pdf_dir = os.path.join(app.root_path, 'static', 'quotes')
-            os.makedirs(pdf_dir, exist_ok=True)
-            pdf_path = os.path.join(pdf_dir, f'Quote_{enquiry_number}.pdf')
-            
-            generate_quotation_pdf(project, project.get('fans', []), pdf_path)
             
-            return send_file(
-                pdf_path,
+            return _send_cached_artifact(
+                project, QUOTE_PDF,
                 mimetype='application/pdf',
-                as_attachment=False,
-                download_name=f'TCF_Quote_{enquiry_number}.pdf'
+                download_name=f'TCF_Quote_{enquiry_number}.pdf',
+                as_attachment=False
             )
         except Exception as e:
             logger.error(f"Error generating PDF quote: {str(e)}")
@@ -527,23 +373,13 @@ def register_routes(app):
             project = get_project(enquiry_number)
             if not project:
                 return jsonify({'error': 'Project not found'}), 404
-                
-            # Generate Excel
-            service = ExcelService()
-            wb = service.generate_project_excel(project)
-            
-            # Save to buffer
-            buffer = BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-            
-            filename = f"TCF_Project_{enquiry_number}.xlsx"
             
-            return send_file(
-                buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            from services.artifact_cache import PROJECT_EXCEL
+            return _send_cached_artifact(
+                project, PROJECT_EXCEL,
+                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                download_name=f"TCF_Project_{enquiry_number}.xlsx",
+                as_attachment=True
             )
             
         except Exception as e:
@@ -552,6 +388,51 @@ def register_routes(app):
             logger.error(traceback.format_exc())
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/exports/bulk', methods=['GET'])
+    @login_required
+    def api_bulk_export():
+        """Stream a ZIP of quotes and Excel workbooks for every project matching the filter."""
+        try:
+            from database import get_projects_with_fans
+            from services.artifact_cache import QUOTE_PDF, PROJECT_EXCEL
+            from services.bulk_export import BulkExport
+
+            sales_engineer = request.args.get('sales_engineer')
+            status = request.args.get('status')
+            month = request.args.get('month')
+
+            kind_map = {'pdf': QUOTE_PDF, 'excel': PROJECT_EXCEL}
+            requested = [k.strip() for k in request.args.get('include', 'pdf,excel').split(',') if k.strip()]
+            unknown = [k for k in requested if k not in kind_map]
+            if unknown or not requested:
+                return jsonify({'error': f"include must be a list of: {', '.join(kind_map)}"}), 400
+
+            projects = get_projects_with_fans(sales_engineer=sales_engineer, status=status, month=month)
+            if not projects:
+                return jsonify({'error': 'No projects match the filter'}), 404
+
+            export = BulkExport.try_start(projects, tuple(kind_map[k] for k in requested))
+            if export is None:
+                response = jsonify({'error': 'Another bulk export is running, please retry shortly'})
+                response.headers['Retry-After'] = '30'
+                return response, 429
+
+            logger.info(f"Bulk export of {len(projects)} projects started by {session.get('username')}")
+            parts = [p for p in (sales_engineer, status, month) if p]
+            filename = '_'.join(['TCF_Export'] + parts + [datetime.now().strftime('%Y%m%d')]) + '.zip'
+            # Release the slot even if the client goes away before the stream starts. The server
+            # closes a direct_passthrough body itself, so Response.call_on_close would never run.
+            body = ClosingIterator(export.stream(), export.close)
+            response = current_app.response_class(body, mimetype='application/zip', direct_passthrough=True)
+            response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        except Exception as e:
+            logger.error(f"Error starting bulk export: {str(e)}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/api/projects/<enquiry_number>/fans/<int:fan_number>', methods=['GET'])
     @login_required
     def api_get_fan(enquiry_number, fan_number):
@@ -574,7 +455,7 @@ def register_routes(app):
     def api_save_fan(enquiry_number, fan_number):
         """Save fan data with calculations."""
         try:
-            logger.info(f"Saving fan data for {enquiry_number}/fan {fan_number}")
+            logger.info("Saving fan data for %s/fan %s", enquiry_number, fan_number)
             data = request.json
             if not data:
                 logger.error("No JSON data received")
@@ -582,11 +463,7 @@ def register_routes(app):
             
             specifications = normalize_keys(data.get('specifications', {}))
             motor = data.get('motor', {})
-            logger.info(f"Specifications keys: {list(specifications.keys())}")
-            logger.info(f"Fan Model in specs: '{specifications.get('Fan Model')}'")
-            logger.info(f"fan_model in specs: '{specifications.get('fan_model')}'")
-            logger.info(f"Specifications: {specifications}")
-            logger.info(f"Motor: {motor}")
+            log_payload(logger, "Specifications: %s, motor: %s", specifications, motor)
             
             # Perform calculations
             with get_db_connection() as conn:
@@ -639,7 +516,8 @@ def register_routes(app):
                         selected_accessories = specifications['accessories']
                 
                 # Calculate weights
-                logger.info(f"Calculating fan weight for model: {fan_data.get('Fan Model')}, size: {fan_data.get('Fan Size')}, class: {fan_data.get('Class')}, arrangement: {fan_data.get('Arrangement')}")
+                logger.debug("Calculating fan weight for model: %s, size: %s, class: %s, arrangement: %s",
+                             fan_data.get('Fan Model'), fan_data.get('Fan Size'), fan_data.get('Class'), fan_data.get('Arrangement'))
                 bare_fan_weight, no_of_isolators, shaft_diameter, total_weight, fan_error, accessory_details = calculate_fan_weight(
                     cursor, fan_data, selected_accessories
                 )
@@ -661,14 +539,15 @@ def register_routes(app):
                     pass
                 
                 # Calculate fabrication cost
-                logger.info(f"Calculating fabrication cost for vendor: {fan_data.get('vendor')}, material: {fan_data.get('material')}, weight: {total_weight}")
+                logger.debug("Calculating fabrication cost for vendor: %s, material: %s, weight: %s",
+                             fan_data.get('vendor'), fan_data.get('material'), total_weight)
                 fabrication_cost, total_weight, custom_weights, rate_used, fab_error = calculate_fabrication_cost(cursor, fan_data, total_weight)
                 if fab_error:
                     logger.error(f"Fabrication cost calculation error: {fab_error}")
                     return jsonify({'error': fab_error}), 400
                 
                 # Calculate bought out components
-                logger.info(f"Calculating bought out components for isolators: {no_of_isolators}, shaft: {shaft_diameter}")
+                logger.debug("Calculating bought out components for isolators: %s, shaft: %s", no_of_isolators, shaft_diameter)
                 bought_out_result, error = calculate_bought_out_components(cursor, fan_data, no_of_isolators, shaft_diameter)
                 if error:
                     logger.error(f"Bought out components calculation error: {error}")
@@ -816,10 +695,9 @@ def register_routes(app):
                             specifications[rate_key] = fan_data[rate_key]
 
                 # Save to database
-                logger.info(f"Saving fan to database: {enquiry_number}/fan {fan_number}")
                 from database import save_fan
                 save_fan(enquiry_number, fan_number, specifications, weights, costs, motor_data, 'draft')
-                logger.info(f"Fan saved successfully to database")
+                logger.debug("Fan saved successfully to database")
                 
             return jsonify({
                 'success': True,
@@ -864,15 +742,20 @@ def register_routes(app):
     @login_required
     def api_options_sizes(fan_model):
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT DISTINCT "Fan Size" FROM FanWeights
-                    WHERE "Fan Model" = ?
-                    ORDER BY CAST("Fan Size" AS FLOAT)
-                ''', (fan_model,))
-                sizes = [str(row[0]) for row in cursor.fetchall()]
-            return jsonify({'sizes': sizes})
+            from database import get_data_version
+
+            def build():
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT DISTINCT "Fan Size" FROM FanWeights
+                        WHERE "Fan Model" = ?
+                        ORDER BY CAST("Fan Size" AS FLOAT)
+                    ''', (fan_model,))
+                    sizes = [str(row[0]) for row in cursor.fetchall()]
+                return {'sizes': sizes}
+
+            return _conditional_json('sizes', get_data_version('catalog'), build)
         except Exception as e:
             logger.error(f"Error getting sizes: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -881,15 +764,20 @@ def register_routes(app):
     @login_required
     def api_options_classes(fan_model, fan_size):
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT DISTINCT "Class" FROM FanWeights
-                    WHERE "Fan Model" = ? AND "Fan Size" = ?
-                    ORDER BY "Class"
-                ''', (fan_model, fan_size))
-                classes = [str(row[0]) for row in cursor.fetchall()]
-            return jsonify({'classes': classes})
+            from database import get_data_version
+
+            def build():
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT DISTINCT "Class" FROM FanWeights
+                        WHERE "Fan Model" = ? AND "Fan Size" = ?
+                        ORDER BY "Class"
+                    ''', (fan_model, fan_size))
+                    classes = [str(row[0]) for row in cursor.fetchall()]
+                return {'classes': classes}
+
+            return _conditional_json('classes', get_data_version('catalog'), build)
         except Exception as e:
             logger.error(f"Error getting classes: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -898,24 +786,60 @@ def register_routes(app):
     @login_required
     def api_options_arrangements(fan_model, fan_size, class_):
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT DISTINCT "Arrangement" FROM FanWeights
-                    WHERE "Fan Model" = ? AND "Fan Size" = ? AND "Class" = ?
-                    ORDER BY CAST("Arrangement" AS TEXT)
-                ''', (fan_model, fan_size, class_))
-                arrangements = [str(row[0]) for row in cursor.fetchall()]
-            return jsonify({'arrangements': arrangements})
+            from database import get_data_version
+
+            def build():
+                with get_db_connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute('''
+                        SELECT DISTINCT "Arrangement" FROM FanWeights
+                        WHERE "Fan Model" = ? AND "Fan Size" = ? AND "Class" = ?
+                        ORDER BY CAST("Arrangement" AS TEXT)
+                    ''', (fan_model, fan_size, class_))
+                    arrangements = [str(row[0]) for row in cursor.fetchall()]
+                return {'arrangements': arrangements}
+
+            return _conditional_json('arrangements', get_data_version('catalog'), build)
         except Exception as e:
             logger.error(f"Error getting arrangements: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+    @app.route('/api/motor-price', methods=['GET'])
+    @login_required
+    def api_motor_price():
+        """Motor list price, optionally as it was when an enquiry was raised (for re-quoting)."""
+        try:
+            from services.price_lists import get_motor_price
+            from database import derive_enquiry_date
+            
+            brand = request.args.get('brand')
+            motor_kw = request.args.get('motor_kw', type=float)
+            pole = request.args.get('pole', type=int)
+            efficiency = request.args.get('efficiency')
+            if not brand or motor_kw is None or pole is None or not efficiency:
+                return jsonify({'error': 'brand, motor_kw, pole and efficiency are required'}), 400
+            
+            as_of = request.args.get('as_of')
+            enquiry_number = request.args.get('enquiry_number')
+            if not as_of and enquiry_number:
+                as_of = derive_enquiry_date(enquiry_number)
+                if not as_of:
+                    return jsonify({'error': f'Cannot derive a date from enquiry {enquiry_number}'}), 400
+            
+            result = get_motor_price(brand, motor_kw, pole, efficiency, as_of=as_of)
+            if not result:
+                return jsonify({'error': 'No price found for this motor'}), 404
+            return jsonify(dict(result, as_of=as_of))
+            
+        except Exception as e:
+            logger.error(f"Error looking up motor price: {str(e)}")
+            return jsonify({'error': str(e)}), 500
+
     @app.route('/api/vendor-rate/<vendor>/<material>/<weight>')
     @login_required
     def api_vendor_rate(vendor, material, weight):
         """Get vendor rate for specific material and weight."""
-        logger.info(f"Vendor rate endpoint called: vendor={vendor}, material={material}, weight={weight}")
+        logger.debug("Vendor rate endpoint called: vendor=%s, material=%s, weight=%s", vendor, material, weight)
         try:
             try:
                 weight = float(weight)
@@ -942,7 +866,7 @@ def register_routes(app):
                     logger.error(f"Error in backend rate calculation: {error}")
                     return jsonify({'success': False, 'message': error.get('error', 'Calculation error')}), 400
                 
-                logger.info(f"Returning calculated rate: {rate_used} for material: {material}")
+                logger.debug("Returning calculated rate: %s for material: %s", rate_used, material)
                 return jsonify({
                     'success': True,
                     'vendor': vendor,
@@ -999,14 +923,14 @@ def register_routes(app):
         try:
             from database import get_project
             
-            logger.info(f"Loading project summary for enquiry: {enquiry_number}")
+            logger.debug("Loading project summary for enquiry: %s", enquiry_number)
             project = get_project(enquiry_number)
             if not project:
                 logger.warning(f"Project not found: {enquiry_number}")
                 flash('Project not found')
                 return redirect(url_for('index'))
             
-            logger.info(f"Project loaded successfully: {enquiry_number}, fans: {len(project.get('fans', []))}")
+            logger.debug("Project loaded successfully: %s, fans: %d", enquiry_number, len(project.get('fans', [])))
             
             # Prepare fans for display with normalized keys and pre-calculated model/size
             for fan in project.get('fans', []):
@@ -1022,14 +946,11 @@ def register_routes(app):
                 fan['costs'] = normalize_keys(fan.get('costs', {}) or {})
                 fan['weights'] = fan.get('weights', {}) or {}
                 fan['motor'] = fan.get('motor', {}) or {}
-                logger.info(f"Fan {fan.get('fan_number')} specifications: {fan.get('specifications', {})}")
-                if fan.get('specifications', {}).get('material') == 'others':
-                    logger.info(f"Fan {fan.get('fan_number')} has material='others', checking for custom materials:")
+                log_payload(logger, "Fan %s specifications: %s", fan.get('fan_number'), specs)
+                if specs.get('material') == 'others' and logger.isEnabledFor(logging.DEBUG):
                     for i in range(5):
-                        name = fan.get('specifications', {}).get(f'material_name_{i}')
-                        weight = fan.get('specifications', {}).get(f'material_weight_{i}')
-                        rate = fan.get('specifications', {}).get(f'material_rate_{i}')
-                        logger.info(f"  Material {i}: name={name}, weight={weight}, rate={rate}")
+                        logger.debug("Fan %s custom material %d: name=%s, weight=%s, rate=%s", fan.get('fan_number'), i,
+                                     specs.get(f'material_name_{i}'), specs.get(f'material_weight_{i}'), specs.get(f'material_rate_{i}'))
             
             return render_template('project_summary.html', project=project)
         
@@ -1055,21 +976,20 @@ def register_routes(app):
     def api_dashboard_stats():
         """API endpoint to get dashboard statistics."""
         try:
-            from database import get_dashboard_stats
-            
+            from database import get_dashboard_stats, get_data_version
+
             # Extract filter parameters
             sales_engineer = request.args.get('sales_engineer')
             status = request.args.get('status')
             month = request.args.get('month')
             search = request.args.get('search')
-            
-            stats = get_dashboard_stats(
-                sales_engineer=sales_engineer, 
-                status=status, 
-                month=month, 
+
+            return _conditional_json('dashboard', get_data_version('sales'), lambda: get_dashboard_stats(
+                sales_engineer=sales_engineer,
+                status=status,
+                month=month,
                 search=search
-            )
-            return jsonify(stats)
+            ))
         except Exception as e:
             logger.error(f"Error fetching dashboard stats: {str(e)}")
             return jsonify({'error': str(e)}), 500
@@ -1085,15 +1005,17 @@ def register_routes(app):
     def api_combined_enquiries():
         """Returns the combined enquiry data from Register + Pricing Tool."""
         try:
-            from database import get_combined_enquiry_data
+            from database import get_combined_enquiry_data, get_data_version
             sales_eng = request.args.get('sales_engineer')
             month = request.args.get('month')
             region = request.args.get('region')
             customer = request.args.get('customer')
             search = request.args.get('search')
-            
-            data = get_combined_enquiry_data(sales_eng, month, region, customer, search)
-            return jsonify({'success': True, 'enquiries': data})
+
+            return _conditional_json('enquiries', get_data_version('sales'), lambda: {
+                'success': True,
+                'enquiries': get_combined_enquiry_data(sales_eng, month, region, customer, search)
+            })
         except Exception as e:
             logger.error(f"Error fetching combined enquiries: {str(e)}")
             return jsonify({'success': False, 'message': str(e)})
@@ -1299,6 +1221,87 @@ def register_routes(app):
             logger.error(f"Error fetching orders data: {str(e)}")
             return jsonify({'success': False, 'message': str(e)})
 
+    @app.route('/api/rollups')
+    @login_required
+    def api_rollups():
+        """Aggregated orders/enquiries from the monthly rollup cube.
+
+        ?dataset=orders|enquiries&group_by=year,region&region=South,West&from=2024-01&to=2024-12
+        Any dimension may be used in group_by or as a comma-separated filter.
+        """
+        try:
+            from database import get_db_connection
+            from services.rollups import query_rollups, PERIOD_DIMENSIONS, DIMENSIONS
+            
+            group_by = [g for g in request.args.get('group_by', '').split(',') if g]
+            filters = {
+                name: request.args[name].split(',')
+                for name in list(PERIOD_DIMENSIONS) + list(DIMENSIONS)
+                if name in request.args
+            }
+            conn = get_db_connection()
+            try:
+                rows = query_rollups(
+                    conn.cursor(),
+                    request.args.get('dataset', 'orders'),
+                    group_by=group_by,
+                    filters=filters,
+                    period_from=request.args.get('from'),
+                    period_to=request.args.get('to')
+                )
+            finally:
+                conn.close()
+            return jsonify({'success': True, 'rows': rows})
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error querying rollups: {str(e)}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    @app.route('/api/pivot')
+    @login_required
+    def api_pivot():
+        """Ad-hoc pivot over this worker's orders/enquiries/projects snapshot.
+
+        ?rows=sector&columns=year&measure=contribution_pct&region=South,West&from=2023-04&to=2024-03
+        Any dimension may also be given as a comma-separated filter.
+        """
+        try:
+            from services.pivot import get_snapshot, pivot, DIMENSIONS
+
+            def split(name):
+                return [v for v in request.args.get(name, '').split(',') if v]
+
+            filters = {name: request.args[name].split(',') for name in DIMENSIONS if name in request.args}
+            version, frames = get_snapshot()
+            result = pivot(
+                frames,
+                rows=split('rows'),
+                columns=split('columns'),
+                measure=request.args.get('measure', 'order_value'),
+                filters=filters,
+                period_from=request.args.get('from'),
+                period_to=request.args.get('to')
+            )
+            return jsonify({'success': True, 'version': version, **result})
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Error building pivot: {str(e)}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+
+    @app.route('/api/forecast')
+    @login_required
+    def api_forecast():
+        """P10/P50/P90 revenue forecast of the Live pipeline, in total, by month and by engineer."""
+        try:
+            from services.forecast import get_revenue_forecast
+            draws = request.args.get('draws', type=int)
+            return jsonify({'success': True, **get_revenue_forecast(draws=draws)})
+        except Exception as e:
+            logger.error(f"Error forecasting revenue: {str(e)}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+
     @app.route('/api/ai_insights')
     @login_required
     def api_ai_insights():
@@ -1346,10 +1349,15 @@ def register_routes(app):
     def api_customer_360(customer_id):
         """Returns the detailed 360 dashboard data for a customer."""
         try:
-            from database import get_customer_360
-            data = get_customer_360(customer_id)
-            if data:
-                return jsonify({'success': True, 'customer': data})
+            from database import get_customer_360, get_customer_version
+
+            def build():
+                data = get_customer_360(customer_id)
+                return {'success': True, 'customer': data} if data else None
+
+            response = _conditional_json('customer', get_customer_version(customer_id), build)
+            if response is not None:
+                return response
             return jsonify({'success': False, 'message': 'Customer not found'}), 404
         except Exception as e:
             logger.error(f"Error fetching customer 360 data: {str(e)}")
@@ -1435,6 +1443,29 @@ def register_routes(app):
             logger.error(f"Error suggesting merges: {str(e)}")
             return jsonify({'success': False, 'error': str(e)}), 500
 
+    @app.route('/api/customer/dismiss_merge', methods=['POST'])
+    @login_required
+    def api_dismiss_merge():
+        """Marks a suggested merge as not a duplicate."""
+        try:
+            if not session.get('is_admin'):
+                return jsonify({'success': False, 'error': 'Admin access required'}), 403
+            
+            data = request.json
+            primary_id = data.get('primary_id')
+            secondary_id = data.get('secondary_id')
+            
+            if not primary_id or not secondary_id:
+                return jsonify({'success': False, 'error': 'Missing primary_id or secondary_id'}), 400
+            
+            from database import dismiss_suggested_merge
+            if dismiss_suggested_merge(primary_id, secondary_id):
+                return jsonify({'success': True})
+            return jsonify({'success': False, 'error': 'Suggestion not found'}), 404
+        except Exception as e:
+            logger.error(f"Error dismissing merge: {str(e)}")
+            return jsonify({'success': False, 'error': str(e)}), 500
+
     @app.route('/api/customer/merge', methods=['POST'])
     @login_required
     def api_merge_customers():
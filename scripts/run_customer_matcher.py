@@ -5,7 +5,10 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database import get_db_connection
-from services.customer_matcher import find_best_match, clean_company_name
+from collections import Counter
+from services.customer_matcher import CustomerMatchIndex, match_names, clean_company_name
+from services.merge_candidates import refresh_merge_candidates
+import sqlite3
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -16,8 +19,76 @@ def get_all_customers(cursor):
     cols = [col[0] for col in cursor.description]
     return [dict(zip(cols, row)) for row in cursor.fetchall()]
 
+LINKED_TABLES = ('EnquiryRegister', 'Orders', 'Projects')
+
+def load_alias_lookup(cursor):
+    """Hash lookups of known spellings: {raw alias: customer id} and {cleaned alias: customer id}.
+
+    A cleaned alias shared by two customers is left out of the second map so
+    it falls through to the fuzzy stages rather than picking one at random.
+    """
+    cursor.execute('''
+        SELECT a.alias_name, a.customer_id FROM CustomerAliases a
+        JOIN Customers c ON c.id = a.customer_id
+    ''')
+    raw_aliases = {}
+    cleaned_aliases = {}
+    for alias_name, customer_id in cursor.fetchall():
+        raw_aliases[alias_name.strip()] = customer_id
+        cleaned = clean_company_name(alias_name)
+        if len(cleaned) >= 3:
+            cleaned_aliases[cleaned] = customer_id if cleaned_aliases.get(cleaned, customer_id) == customer_id else None
+    return raw_aliases, {k: v for k, v in cleaned_aliases.items() if v is not None}
+
+def apply_customer_links(cursor, links):
+    """Set customer_id on every linked table from a {raw name: customer id} mapping.
+
+    The mapping goes into a temp table and each table is updated with one
+    set-based join (served by the customer_name indexes) instead of one
+    UPDATE per name. Rows that already carry the right id are left alone.
+    Returns the number of rows changed per table.
+    """
+    cursor.execute('DROP TABLE IF EXISTS temp.customer_links')
+    cursor.execute('CREATE TEMP TABLE customer_links (raw_name TEXT PRIMARY KEY, customer_id INTEGER NOT NULL)')
+    cursor.executemany('INSERT OR REPLACE INTO temp.customer_links (raw_name, customer_id) VALUES (?, ?)', links.items())
+    
+    updated = {}
+    for table in LINKED_TABLES:
+        if sqlite3.sqlite_version_info >= (3, 33, 0):
+            cursor.execute(f'''
+                UPDATE {table} SET customer_id = l.customer_id
+                FROM temp.customer_links l
+                WHERE {table}.customer_name = l.raw_name
+                  AND {table}.customer_id IS NOT l.customer_id
+            ''')
+        else:
+            cursor.execute(f'''
+                UPDATE {table} SET customer_id = (
+                    SELECT l.customer_id FROM temp.customer_links l WHERE l.raw_name = {table}.customer_name
+                )
+                WHERE customer_name IN (SELECT raw_name FROM temp.customer_links)
+                  AND customer_id IS NOT (
+                    SELECT l.customer_id FROM temp.customer_links l WHERE l.raw_name = {table}.customer_name
+                )
+            ''')
+        updated[table] = cursor.rowcount
+    
+    cursor.execute('DROP TABLE temp.customer_links')
+    return updated
+
+STAGE_LABELS = (('alias', 'known aliases'), ('cleaned_alias', 'cleaned aliases'), ('exact', 'exact names'),
+                ('fuzzy', 'fuzzy matches'), ('primary_name', 'existing names'), ('new', 'new customers'))
+
+def format_stage_counts(stages):
+    return ', '.join(f"{stages.get(key, 0)} {label}" for key, label in STAGE_LABELS)
+
 def deduplicate_and_link_customers():
-    """Scan Enquiries, Orders, and Projects to populate Customers table and link them."""
+    """Scan Enquiries, Orders, and Projects to populate Customers table and link them.
+
+    Names resolve in stages: known aliases (raw, then cleaned), exact cleaned
+    customer names in the index, then fuzzy scoring. Returns how many names
+    each stage settled.
+    """
     logger.info("Starting customer deduplication and linking...")
     
     with get_db_connection() as conn:
@@ -25,39 +96,57 @@ def deduplicate_and_link_customers():
         
         # 1. Collect all distinct customer names from our data sources
         customer_names = set()
+        # Stored spellings (possibly with stray whitespace) of each stripped name
+        stored_names = {}
         
-        cursor.execute("SELECT DISTINCT customer_name FROM EnquiryRegister WHERE customer_name IS NOT NULL")
-        for row in cursor.fetchall():
-            customer_names.add(row[0].strip())
-            
-        cursor.execute("SELECT DISTINCT customer_name FROM Orders WHERE customer_name IS NOT NULL")
-        for row in cursor.fetchall():
-            customer_names.add(row[0].strip())
-            
-        cursor.execute("SELECT DISTINCT customer_name FROM Projects WHERE customer_name IS NOT NULL")
-        for row in cursor.fetchall():
-            customer_names.add(row[0].strip())
+        for table in LINKED_TABLES:
+            cursor.execute(f"SELECT DISTINCT customer_name FROM {table} WHERE customer_name IS NOT NULL")
+            for row in cursor.fetchall():
+                name = row[0].strip()
+                customer_names.add(name)
+                stored_names.setdefault(name, set()).add(row[0])
             
         logger.info(f"Found {len(customer_names)} distinct raw customer names.")
         
         # 2. Process names and insert/link
-        existing_customers = get_all_customers(cursor)
-        
-        # Optimization: Pre-calculate cleaned names for existing customers
-        from services.customer_matcher import clean_company_name
-        for ec in existing_customers:
-            ec['cleaned'] = clean_company_name(ec['primary_name'])
-        
+        links = {}
         batch_size = 50
         names_list = list(customer_names)
+        stages = Counter()
+        
+        # Stage 1: names we have seen before never reach the matcher
+        raw_aliases, cleaned_aliases = load_alias_lookup(cursor)
+        known = {}
+        for raw_name in names_list:
+            if raw_name in raw_aliases:
+                known[raw_name] = raw_aliases[raw_name]
+                stages['alias'] += 1
+            elif raw_name and clean_company_name(raw_name) in cleaned_aliases:
+                known[raw_name] = cleaned_aliases[clean_company_name(raw_name)]
+                stages['cleaned_alias'] += 1
+        
+        # Stages 2 and 3: score the rest against the customers that existed before this run
+        # (exact cleaned names first, then fuzzy); runs over CUSTOMER_MATCHER_WORKERS processes
+        pending = [name for name in names_list if name and name not in known]
+        index_stats = Counter()
+        initial_matches = dict(zip(pending, match_names(pending, get_all_customers(cursor), threshold=0.88, stats=index_stats)))
+        # Customers created below come after the existing ones, so they only win on a strictly higher score
+        created_index = CustomerMatchIndex()
         logger.info(f"Processing {len(names_list)} names in batches of {batch_size}...")
         
         for i in range(0, len(names_list), batch_size):
             batch = names_list[i : i + batch_size]
             for raw_name in batch:
                 if not raw_name: continue
-                    
-                match_id, score = find_best_match(raw_name, existing_customers, threshold=0.88)
+                
+                if raw_name in known:
+                    match_id, score = known[raw_name], 1.0
+                else:
+                    match_id, score = initial_matches[raw_name]
+                    if len(created_index):
+                        created_id, created_score = created_index.find_best_match(raw_name, threshold=0.88)
+                        if created_id and (not match_id or created_score > score):
+                            match_id, score = created_id, created_score
                 
                 if match_id and score >= 0.88:
                     cursor.execute('''
@@ -65,6 +154,8 @@ def deduplicate_and_link_customers():
                         VALUES (?, ?)
                     ''', (match_id, raw_name))
                     assigned_id = match_id
+                    if raw_name not in known:
+                        stages['exact' if score == 1.0 else 'fuzzy'] += 1
                 else:
                     cursor.execute("SELECT id FROM Customers WHERE primary_name = ?", (raw_name,))
                     existing_row = cursor.fetchone()
@@ -72,20 +163,25 @@ def deduplicate_and_link_customers():
                         logger.info(f"Creating new customer profile for: {raw_name}")
                         cursor.execute('INSERT INTO Customers (primary_name) VALUES (?)', (raw_name,))
                         assigned_id = cursor.lastrowid
-                        new_cust = {'id': assigned_id, 'primary_name': raw_name, 'cleaned': clean_company_name(raw_name)}
-                        existing_customers.append(new_cust)
+                        created_index.add(assigned_id, raw_name)
+                        stages['new'] += 1
                         cursor.execute('INSERT OR IGNORE INTO CustomerAliases (customer_id, alias_name) VALUES (?, ?)', (assigned_id, raw_name))
                     else:
                         assigned_id = existing_row[0]
+                        stages['primary_name'] += 1
                 
-                # Link raw names to the assigned customer ID
-                cursor.execute('UPDATE EnquiryRegister SET customer_id = ? WHERE customer_name = ?', (assigned_id, raw_name))
-                cursor.execute('UPDATE Orders SET customer_id = ? WHERE customer_name = ?', (assigned_id, raw_name))
-                cursor.execute('UPDATE Projects SET customer_id = ? WHERE customer_name = ?', (assigned_id, raw_name))
+                # Link raw names to the assigned customer ID (applied below in one pass per table)
+                for stored in stored_names[raw_name]:
+                    links[stored] = assigned_id
             
             # Commit after each batch to avoid holding huge locks and show progress
             conn.commit()
             logger.info(f"Progress: {min(i + batch_size, len(names_list))}/{len(names_list)} names processed.")
+        
+        # 3. Link every source row to its customer
+        updated = apply_customer_links(cursor, links)
+        conn.commit()
+        logger.info(f"Linked customer names: {updated}")
             
         # 4. Rebuild CustomerYearBindings from latest Enquiries and Orders
         logger.info("Rebuilding CustomerYearBindings from Enquiries and Orders...")
@@ -127,9 +223,15 @@ def deduplicate_and_link_customers():
             DELETE FROM CustomerYearBindings
             WHERE customer_id NOT IN (SELECT id FROM Customers)
         ''')
+        
+        # 6. Refresh merge suggestions for customers created or removed above
+        refresh_merge_candidates(cursor)
             
         conn.commit()
+    logger.info(f"Names resolved per stage: {dict(stages)}; "
+                f"{index_stats['lookups']} reached the index, {index_stats['scored']} SequenceMatcher ratios computed")
     logger.info("Customer deduplication complete!")
+    return dict(stages)
 
 if __name__ == "__main__":
     deduplicate_and_link_customers()
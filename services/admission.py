@@ -0,0 +1,187 @@
+import os
+import math
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '1') != '0'
+
+# class -> (concurrent requests per worker process, requests allowed to wait, seconds they wait).
+# A limit of 0 means unlimited. Waiting requests hold a gunicorn thread too, so queues stay short.
+ADMISSION_DEFAULTS = {
+    'interactive': (0, 0, 0),
+    'analytics': (1, 2, 10),
+    'import_export': (1, 1, 5),
+    'admin_sql': (1, 0, 0)
+}
+
+# Endpoints outside this map are interactive (calculator, fan saves, lookups, pages)
+ENDPOINT_CLASSES = {
+    'api_dashboard_stats': 'analytics',
+    'api_combined_enquiries': 'analytics',
+    'api_orders': 'analytics',
+    'api_rollups': 'analytics',
+    'api_pivot': 'analytics',
+    'api_forecast': 'analytics',
+    'api_ai_insights': 'analytics',
+    'api_customers_list': 'analytics',
+    'api_suggest_merges': 'analytics',
+    'api_generate_quote': 'import_export',
+    'api_export_project_excel': 'import_export',
+    'api_bulk_export': 'import_export',
+    'db_admin.upload_motor_prices': 'import_export',
+    'db_admin.upload_orders': 'import_export',
+    'db_admin.upload_master_data': 'import_export',
+    'db_admin.confirm_upload': 'import_export',
+    'db_admin.publish_price_list_version': 'import_export',
+    'db_admin.execute_sql': 'admin_sql',
+    'db_admin.view_db': 'admin_sql',
+    'db_admin.view_table': 'admin_sql'
+}
+
+# Upload endpoints whose GET only renders the form
+_FORM_PAGES = {'db_admin.upload_motor_prices', 'db_admin.upload_orders', 'db_admin.upload_master_data'}
+
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def parse_limits(spec, defaults=ADMISSION_DEFAULTS):
+    """ADMISSION_LIMITS ("analytics=2:4:10,admin_sql=0") over the defaults.
+
+    Each entry is class=limit[:queue[:timeout]]; omitted parts keep the
+    default. Unknown classes and malformed entries are ignored with a warning.
+    """
+    limits = dict(defaults)
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, values = part.partition('=')
+        name = name.strip()
+        try:
+            if name not in limits:
+                raise ValueError(f"unknown class {name!r}")
+            given = [float(v) for v in values.split(':')] if values.strip() else []
+            if not 1 <= len(given) <= 3 or any(v < 0 for v in given):
+                raise ValueError(f"expected limit[:queue[:timeout]], got {values!r}")
+            limit, queue, timeout = given + list(limits[name][len(given):])
+            limits[name] = (int(limit), int(queue), float(timeout))
+        except ValueError as e:
+            logger.warning(f"Ignoring ADMISSION_LIMITS entry {part.strip()!r}: {str(e)}")
+    return limits
+
+
+class Gate:
+    """Concurrency limit for one endpoint class within a worker process."""
+
+    def __init__(self, name, limit, queue, timeout):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """(admitted, reason, seconds waited); reason is 'queue_full' or 'timeout' when refused."""
+        started = time.perf_counter()
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                _gauge('tcf_admission_in_flight', self.name, self.active)
+                return True, None, 0.0
+            if self.waiting >= self.queue:
+                return False, 'queue_full', 0.0
+            self.waiting += 1
+            _gauge('tcf_admission_queue_depth', self.name, self.waiting)
+            try:
+                admitted = self._condition.wait_for(lambda: self.active < self.limit, self.timeout)
+                if admitted:
+                    self.active += 1
+                    _gauge('tcf_admission_in_flight', self.name, self.active)
+            finally:
+                self.waiting -= 1
+                _gauge('tcf_admission_queue_depth', self.name, self.waiting)
+        return admitted, None if admitted else 'timeout', time.perf_counter() - started
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            _gauge('tcf_admission_in_flight', self.name, self.active)
+            self._condition.notify()
+
+    @property
+    def retry_after(self):
+        return max(1, math.ceil(self.timeout))
+
+
+def _gauge(name, endpoint_class, value):
+    # This worker's count; /metrics sums it over the live workers
+    from services.metrics import registry, METRICS_ENABLED
+    if METRICS_ENABLED:
+        registry.set_gauge(name, {'class': endpoint_class}, value)
+
+
+def endpoint_class(endpoint, method):
+    name = ENDPOINT_CLASSES.get(endpoint, 'interactive')
+    if endpoint in _FORM_PAGES and method == 'GET':
+        return 'interactive'
+    return name
+
+
+def init_admission_control(app, limits=None):
+    """Admit requests per endpoint class, answering 429 with Retry-After when a class is saturated."""
+    if not ADMISSION_CONTROL:
+        return
+    from flask import request, jsonify, g
+    from werkzeug.wsgi import ClosingIterator
+    from services.metrics import registry, METRICS_ENABLED
+
+    limits = limits or parse_limits(os.environ.get('ADMISSION_LIMITS', ''))
+    gates = {name: Gate(name, *values) for name, values in limits.items() if values[0] > 0}
+    app.extensions['admission_gates'] = gates
+
+    @app.before_request
+    def _admit():
+        gate = gates.get(endpoint_class(request.endpoint, request.method))
+        if gate is None:
+            return None
+        admitted, reason, waited = gate.acquire()
+        if METRICS_ENABLED:
+            registry.observe('tcf_admission_wait_seconds', {'class': gate.name}, waited, WAIT_BUCKETS)
+        if not admitted:
+            if METRICS_ENABLED:
+                registry.inc('tcf_admission_rejected_total', {'class': gate.name, 'reason': reason})
+            logger.warning(f"Rejected {request.endpoint} ({gate.name}): {reason} after {waited:.1f}s")
+            response = jsonify({'error': 'The server is busy with similar requests, please retry shortly'})
+            response.headers['Retry-After'] = str(gate.retry_after)
+            return response, 429
+        g.admission_gate = gate
+        return None
+
+    @app.after_request
+    def _release_after_response(response):
+        gate = g.pop('admission_gate', None)
+        if gate is None:
+            return response
+        if response.is_streamed:
+            # Streamed bodies (bulk export, send_file) hold the slot until the server closes
+            # them; it closes a direct_passthrough body itself, so call_on_close would not run
+            released = []
+
+            def release_once():
+                if not released:
+                    released.append(True)
+                    gate.release()
+            response.response = ClosingIterator(response.response, release_once)
+        else:
+            gate.release()
+        return response
+
+    @app.teardown_request
+    def _release_on_error(exc):
+        gate = g.pop('admission_gate', None)
+        if gate is not None:
+            gate.release()
@@ -0,0 +1,195 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+from io import BytesIO
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+QUOTE_PDF = 'quote_pdf'
+PROJECT_EXCEL = 'project_excel'
+
+
+def _default_cache_dir():
+    """Keep generated artifacts next to the database so they share the persistent disk."""
+    from database import get_render_db_path
+    return os.path.join(os.path.dirname(get_render_db_path()), 'artifact_cache')
+
+
+class ArtifactCache:
+    """Content-addressed on-disk cache for generated quote PDFs and Excel exports.
+
+    Files are named ``<project tag>_<content key>.<ext>``. The content key is a hash of
+    the project (including its fans), the artifact kind and the template version, so an
+    edited project can never be served a stale file. The project tag lets every artifact
+    of an enquiry be dropped at once when it changes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or os.environ.get('ARTIFACT_CACHE_DIR') or _default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _project_tag(enquiry_number):
+        return hashlib.sha1(str(enquiry_number).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def make_key(project, kind, template_version, extra=None):
+        """Hash everything that influences the rendered artifact."""
+        payload = json.dumps({
+            'kind': kind,
+            'template_version': template_version,
+            'extra': extra,
+            'project': project
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def key_for(self, project, kind):
+        """Cache key of a project artifact, see artifact_spec()."""
+        _, template_version, extra = artifact_spec(kind)
+        return self.make_key(project, kind, template_version, extra)
+
+    def _path(self, enquiry_number, key, ext):
+        return os.path.join(self.cache_dir, f"{self._project_tag(enquiry_number)}_{key}.{ext}")
+
+    def get(self, enquiry_number, key, ext):
+        """Return cached bytes or None. A hit refreshes the file's LRU timestamp."""
+        path = self._path(enquiry_number, key, ext)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return data
+
+    def put(self, enquiry_number, key, ext, data):
+        """Atomically store bytes: write to a unique temp file, then rename into place."""
+        path = self._path(enquiry_number, key, ext)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.tmp-', suffix=f'.{ext}')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+        return path
+
+    def get_or_build(self, enquiry_number, key, ext, builder):
+        """Return cached bytes for the key, calling builder() to produce them on a miss."""
+        data = self.get(enquiry_number, key, ext)
+        if data is not None:
+            logger.debug("Artifact cache hit for %s (%s)", enquiry_number, ext)
+            return data
+        logger.debug("Artifact cache miss for %s (%s)", enquiry_number, ext)
+        data = builder()
+        self.put(enquiry_number, key, ext, data)
+        return data
+
+    def invalidate_project(self, enquiry_number):
+        """Remove every cached artifact of an enquiry. Returns the number of files removed."""
+        prefix = self._project_tag(enquiry_number) + '_'
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed:
+            logger.info(f"Invalidated {removed} cached artifacts for {enquiry_number}")
+        return removed
+
+    def _evict(self):
+        """Drop least recently used files until the cache fits under max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if name.startswith('.tmp-'):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+def artifact_spec(kind):
+    """Return (extension, template version, extra key material) for an artifact kind."""
+    if kind == QUOTE_PDF:
+        from services.pdf_generator import TEMPLATE_VERSION
+        # The quote prints today's date, so a new day means a new artifact
+        return 'pdf', TEMPLATE_VERSION, datetime.now().strftime('%Y-%m-%d')
+    if kind == PROJECT_EXCEL:
+        from services.excel_service import ExcelService
+        return 'xlsx', ExcelService.TEMPLATE_VERSION, None
+    raise ValueError(f"Unknown artifact kind: {kind}")
+
+
+def build_artifact(kind, project):
+    """Render an artifact to bytes. Safe to call from a worker process."""
+    buffer = BytesIO()
+    if kind == QUOTE_PDF:
+        from services.pdf_generator import generate_quotation_pdf
+        generate_quotation_pdf(project, project.get('fans', []), buffer)
+    elif kind == PROJECT_EXCEL:
+        from services.excel_service import ExcelService
+        ExcelService().generate_project_excel(project).save(buffer)
+    else:
+        raise ValueError(f"Unknown artifact kind: {kind}")
+    return buffer.getvalue()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache():
+    """Return the process-wide artifact cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ArtifactCache()
+    return _cache
+
+
+def invalidate_project_artifacts(enquiry_number):
+    """Drop cached quotes/exports of a project; never lets cache trouble fail a write."""
+    try:
+        return get_artifact_cache().invalidate_project(enquiry_number)
+    except Exception as e:
+        logger.warning(f"Could not invalidate cached artifacts for {enquiry_number}: {str(e)}")
+        return 0
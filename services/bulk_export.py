@@ -0,0 +1,196 @@
+import os
+import fcntl
+import zipfile
+import logging
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from services.artifact_cache import (
+    QUOTE_PDF, PROJECT_EXCEL, artifact_spec, build_artifact, get_artifact_cache
+)
+
+logger = logging.getLogger(__name__)
+
+KINDS = (QUOTE_PDF, PROJECT_EXCEL)
+
+
+def _default_workers():
+    # Leave half the cores to the web workers serving interactive traffic
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+# Both limits are per host: gunicorn workers share the slots through lock files, and
+# each running export gets an equal share of the render processes
+MAX_WORKERS = int(os.environ.get('BULK_EXPORT_MAX_WORKERS', 0)) or _default_workers()
+MAX_CONCURRENT_EXPORTS = int(os.environ.get('BULK_EXPORT_MAX_CONCURRENT', 1))
+EXPORT_WORKERS = max(1, MAX_WORKERS // MAX_CONCURRENT_EXPORTS)
+BULK_EXPORT_LOCK_DIR = os.environ.get('BULK_EXPORT_LOCK_DIR')
+
+
+def _lock_dir():
+    from database import get_render_db_path
+    return BULK_EXPORT_LOCK_DIR or os.path.join(os.path.dirname(get_render_db_path()), 'bulk_export_slots')
+
+
+def _acquire_slot():
+    """Lock one of the host's export slot files and return its descriptor, or None if all are taken.
+
+    flock locks belong to the open file, so threads of one worker compete like
+    separate workers do, and the kernel frees the slot of a worker that is killed.
+    """
+    directory = _lock_dir()
+    os.makedirs(directory, exist_ok=True)
+    for slot in range(MAX_CONCURRENT_EXPORTS):
+        fd = os.open(os.path.join(directory, f'slot-{slot}.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            os.close(fd)
+    return None
+
+
+def _init_worker():
+    """Run render workers at a lower priority than the request threads."""
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+class _StreamBuffer:
+    """Write-only, non-seekable sink for ZipFile.
+
+    ZipFile falls back to data descriptors when it cannot seek, which lets each
+    member be sent to the client as soon as it has been written.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _safe_name(value):
+    return ''.join(c if c.isalnum() or c in '-_ ' else '_' for c in str(value)).strip() or 'project'
+
+
+def _folder_names(projects):
+    """One archive folder per project; enquiries that sanitize to the same name get a suffix."""
+    folders = {}
+    seen = {}
+    for project in projects:
+        base = _safe_name(project['enquiry_number'])
+        seen[base] = seen.get(base, 0) + 1
+        folders[id(project)] = base if seen[base] == 1 else f"{base}_{seen[base]}"
+    return folders
+
+
+def _member_name(folder, kind):
+    ext, _, _ = artifact_spec(kind)
+    if kind == QUOTE_PDF:
+        return f"{folder}/Quotation_{folder}.{ext}"
+    return f"{folder}/Project_{folder}_Details.{ext}"
+
+
+class BulkExport:
+    """One running bulk export holding a host-wide slot and its render pool until it is closed."""
+
+    def __init__(self, projects, kinds=KINDS, slot=None):
+        self.projects = projects
+        self.kinds = kinds
+        self._slot = slot
+        self._pool = None
+        self._closed = False
+
+    @classmethod
+    def try_start(cls, projects, kinds=KINDS):
+        """Return a BulkExport, or None when the concurrency cap is reached."""
+        slot = _acquire_slot()
+        if slot is None:
+            return None
+        return cls(projects, kinds, slot)
+
+    def _get_pool(self):
+        """Start this export's render pool on the first artifact missing from the cache.
+
+        Workers are spawned rather than forked so they never inherit open SQLite
+        connections or locks held by the web server's threads.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker
+            )
+            logger.info(f"Started bulk export pool with {EXPORT_WORKERS} workers")
+        return self._pool
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._slot is not None:
+            os.close(self._slot)
+
+    def stream(self):
+        """Yield the ZIP archive in chunks as artifacts finish rendering."""
+        cache = get_artifact_cache()
+        sink = _StreamBuffer()
+        errors = []
+        started = datetime.now()
+        pending = {}
+        folders = _folder_names(self.projects)
+        try:
+            with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for project in self.projects:
+                    for kind in self.kinds:
+                        ext, _, _ = artifact_spec(kind)
+                        key = cache.key_for(project, kind)
+                        data = cache.get(project['enquiry_number'], key, ext)
+                        if data is not None:
+                            archive.writestr(_member_name(folders[id(project)], kind), data)
+                            yield sink.drain()
+                            continue
+                        future = self._get_pool().submit(build_artifact, kind, project)
+                        pending[future] = (project, kind, key, ext)
+
+                for future in as_completed(pending):
+                    project, kind, key, ext = pending[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        logger.error(f"Bulk export failed for {project['enquiry_number']} ({kind}): {str(e)}")
+                        errors.append(f"{_member_name(folders[id(project)], kind)}: {str(e)}")
+                        continue
+                    cache.put(project['enquiry_number'], key, ext, data)
+                    archive.writestr(_member_name(folders[id(project)], kind), data)
+                    yield sink.drain()
+
+                if errors:
+                    archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+            yield sink.drain()
+            logger.info(f"Bulk export of {len(self.projects)} projects finished in "
+                        f"{(datetime.now() - started).total_seconds():.1f}s with {len(errors)} errors")
+        finally:
+            # A client that disconnects early should not keep the pool busy
+            for future in pending:
+                future.cancel()
+            self.close()
@@ -1,8 +1,22 @@
+import os
+import re
 import logging
+import multiprocessing
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from difflib import SequenceMatcher
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE = re.compile(r'\s+')
+
+# Scoring large imports can be spread over processes; 1 keeps it in-process
+MATCHER_WORKERS = int(os.environ.get('CUSTOMER_MATCHER_WORKERS', 1))
+# Below this many names, starting the workers costs more than the scoring
+PARALLEL_MIN_NAMES = int(os.environ.get('CUSTOMER_MATCHER_PARALLEL_MIN_NAMES', 2000))
+
+@lru_cache(maxsize=65536)
 def clean_company_name(name):
     """Normalize company name by removing common suffixes and making lowercase."""
     if not name:
@@ -35,8 +49,7 @@ def clean_company_name(name):
     name = name.replace('.', '').replace(',', '').replace('-', ' ')
     
     # Replace multiple spaces with single space
-    import re
-    name = re.sub(r'\s+', ' ', name).strip()
+    name = _WHITESPACE.sub(' ', name).strip()
     
     return name
 
@@ -75,3 +88,191 @@ def find_best_match(target_name, customer_list, threshold=0.85):
         return best_match, best_score
         
     return None, best_score
+
+
+def _bigrams(text):
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+class CustomerMatchIndex:
+    """Bigram inverted index over cleaned customer names.
+
+    ``find_best_match`` returns the same match as the module-level
+    ``find_best_match`` over the customers in insertion order, without scoring
+    every customer:
+
+    * Exact cleaned names are a dict lookup.
+    * Two names with ``ratio() >= r`` and combined length ``T`` match at least
+      ``r*T/2`` characters in at most ``T - 2M + 1`` blocks, so they share at
+      least ``(1.5*r - 1)*T - 1`` bigrams. Customers below that count cannot
+      reach the threshold and are never scored.
+    * The survivors are pruned with ``real_quick_ratio``/``quick_ratio`` (upper
+      bounds of ``ratio``) before the full ratio, visiting them in insertion
+      order so ties resolve to the same customer as the linear scan.
+
+    ``stats`` counts lookups, exact hits, candidates and full ratio() calls.
+    """
+
+    def __init__(self, customers=()):
+        self._ids = []
+        self._names = []
+        self._matchers = []
+        self._exact = {}
+        self._postings = defaultdict(list)
+        self._by_length = defaultdict(list)
+        self.stats = Counter()
+        for customer in customers:
+            self.add(customer['id'], customer['primary_name'])
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add(self, customer_id, primary_name):
+        """Index a customer; later additions lose ties to earlier ones, as in a list scan."""
+        idx = len(self._ids)
+        cleaned = clean_company_name(primary_name)
+        self._ids.append(customer_id)
+        self._names.append(cleaned)
+        self._matchers.append(None)
+        self._exact.setdefault(cleaned, idx)
+        self._by_length[len(cleaned)].append(idx)
+        for gram, count in _bigrams(cleaned).items():
+            self._postings[gram].append((idx, count))
+
+    def _matcher(self, idx):
+        # seq2 is the customer name, as in similarity_score(target, customer); difflib
+        # caches its index so only set_seq1 changes per lookup
+        matcher = self._matchers[idx]
+        if matcher is None:
+            matcher = self._matchers[idx] = SequenceMatcher(None, '', self._names[idx])
+        return matcher
+
+    def _candidates(self, cleaned_target, threshold):
+        """Indexes of customers that can score >= threshold, in insertion order."""
+        target_len = len(cleaned_target)
+        slope = 1.5 * threshold - 1
+        if slope <= 0:
+            # The bigram bound gives nothing below a 2/3 threshold
+            return range(len(self._ids))
+
+        shared = defaultdict(int)
+        for gram, count in _bigrams(cleaned_target).items():
+            for idx, cust_count in self._postings.get(gram, ()):
+                shared[idx] += min(count, cust_count)
+
+        candidates = [
+            idx for idx, n in shared.items()
+            if n >= slope * (target_len + len(self._names[idx])) - 1 - 1e-9
+        ]
+        # Very short names need no shared bigram at all
+        max_total = int((1 + 1e-9) / slope)
+        for length in range(0, max_total - target_len + 1):
+            candidates.extend(idx for idx in self._by_length.get(length, ()) if idx not in shared)
+        return sorted(candidates)
+
+    def similar_customers(self, target_name, threshold=0.85):
+        """(customer_id, cleaned_name) of every customer whose similarity to
+        target_name can reach threshold. The bounds used are symmetric, so
+        callers may score the pair in either order."""
+        cleaned_target = clean_company_name(target_name)
+        target_len = len(cleaned_target)
+        for idx in self._candidates(cleaned_target, threshold):
+            cust_len = len(self._names[idx])
+            if not target_len + cust_len or 2.0 * min(target_len, cust_len) / (target_len + cust_len) < threshold:
+                continue
+            matcher = self._matcher(idx)
+            matcher.set_seq1(cleaned_target)
+            if matcher.quick_ratio() < threshold:
+                continue
+            yield self._ids[idx], self._names[idx]
+
+    def find_best_match(self, target_name, threshold=0.85):
+        """Same contract as find_best_match(); below the threshold the returned
+        score is the best among the candidates considered."""
+        cleaned_target = clean_company_name(target_name)
+        if len(cleaned_target) < 3:
+            return None, 0.0
+
+        self.stats['lookups'] += 1
+        exact = self._exact.get(cleaned_target)
+        if exact is not None:
+            self.stats['exact'] += 1
+            return self._ids[exact], 1.0
+
+        best_idx = None
+        best_score = 0.0
+        target_len = len(cleaned_target)
+        candidates = self._candidates(cleaned_target, threshold)
+        self.stats['candidates'] += len(candidates)
+        for idx in candidates:
+            cust_len = len(self._names[idx])
+            # real_quick_ratio without building a matcher
+            bound = 2.0 * min(target_len, cust_len) / (target_len + cust_len)
+            if bound < threshold or bound <= best_score:
+                continue
+            matcher = self._matcher(idx)
+            matcher.set_seq1(cleaned_target)
+            bound = matcher.quick_ratio()
+            if bound < threshold or bound <= best_score:
+                continue
+            score = matcher.ratio()
+            self.stats['scored'] += 1
+            if score > best_score:
+                best_score = score
+                best_idx = idx
+
+        if best_idx is not None and best_score >= threshold:
+            return self._ids[best_idx], best_score
+        return None, best_score
+
+
+_worker_index = None
+
+def _init_match_worker(customers):
+    global _worker_index
+    _worker_index = CustomerMatchIndex(customers)
+
+def _match_shard(names, threshold):
+    _worker_index.stats.clear()
+    results = [_worker_index.find_best_match(name, threshold) for name in names]
+    return results, _worker_index.stats
+
+def match_names(names, customers, threshold=0.85, workers=None, min_names=None, stats=None):
+    """Best match of every name against a fixed customer list, in input order.
+
+    Each name is scored independently, so with workers > 1 the names are
+    sorted by cleaned name, cut into contiguous shards (similar names share
+    bigram postings and cleaning caches) and scored in a spawned process pool.
+    Results are put back in input order and equal the in-process ones.
+    Fewer than min_names (default PARALLEL_MIN_NAMES) are scored in-process.
+    The index counters of every shard are added to ``stats`` if given.
+    """
+    names = list(names)
+    workers = workers or MATCHER_WORKERS
+    min_names = PARALLEL_MIN_NAMES if min_names is None else min_names
+    if workers <= 1 or len(names) < min_names:
+        index = CustomerMatchIndex(customers)
+        results = [index.find_best_match(name, threshold) for name in names]
+        if stats is not None:
+            stats.update(index.stats)
+        return results
+
+    order = sorted(range(len(names)), key=lambda i: clean_company_name(names[i]))
+    shard_size = -(-len(order) // (workers * 4))
+    shards = [order[i:i + shard_size] for i in range(0, len(order), shard_size)]
+
+    results = [None] * len(names)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_match_worker,
+        initargs=(list(customers),)
+    ) as pool:
+        futures = [pool.submit(_match_shard, [names[i] for i in shard], threshold) for shard in shards]
+        for shard, future in zip(shards, futures):
+            shard_results, shard_stats = future.result()
+            for i, result in zip(shard, shard_results):
+                results[i] = result
+            if stats is not None:
+                stats.update(shard_stats)
+    logger.info(f"Scored {len(names)} names in {len(shards)} shards over {workers} workers")
+    return results
@@ -3,6 +3,9 @@ from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, Protecti
 from openpyxl.utils import get_column_letter
 
 class ExcelService:
+    # Bump whenever the workbook layout changes so cached exports are regenerated
+    TEMPLATE_VERSION = 1
+
     def __init__(self):
         # Professional Color Scheme (Matching the web UI)
         self.colors = {
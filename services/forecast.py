@@ -0,0 +1,188 @@
+import os
+import logging
+import threading
+from datetime import date
+import numpy as np
+from services.order_cadence import order_period
+
+logger = logging.getLogger(__name__)
+
+FORECAST_DRAWS = int(os.environ.get('FORECAST_DRAWS', 20000))
+MAX_FORECAST_DRAWS = 100000
+# Weight of the project's own probability against the engineer/region history
+FORECAST_PROBABILITY_WEIGHT = float(os.environ.get('FORECAST_PROBABILITY_WEIGHT', 0.5))
+# Enquiries' worth of weight the broader rate gets when shrinking a small group's win rate
+FORECAST_PRIOR_STRENGTH = float(os.environ.get('FORECAST_PRIOR_STRENGTH', 20))
+# Random numbers generated per simulation chunk (draws x projects)
+_CHUNK_CELLS = 2_000_000
+
+_calibration = {'version': None, 'rates': None}
+_calibration_lock = threading.Lock()
+
+
+def _shrunk(wins, trials, prior):
+    return (wins + FORECAST_PRIOR_STRENGTH * prior) / (trials + FORECAST_PRIOR_STRENGTH)
+
+
+def compute_win_rates(cursor):
+    """Historical orders per enquiry by engineer and by (engineer, region).
+
+    Small groups are shrunk toward the engineer's rate, and engineers toward
+    the overall rate, so one lucky order does not read as a 100% win rate.
+    Returns {'overall': r, 'engineer': {se: r}, 'engineer_region': {(se, region): r}}.
+    """
+    counts = {}
+    for table, column in (('Orders', 0), ('EnquiryRegister', 1)):
+        cursor.execute(f'''
+            SELECT COALESCE(TRIM(sales_engineer), ''), COALESCE(TRIM(region), ''), COUNT(*)
+            FROM {table} GROUP BY 1, 2
+        ''')
+        for engineer, region, count in cursor.fetchall():
+            counts.setdefault((engineer, region), [0, 0])[column] += count
+
+    wins = sum(c[0] for c in counts.values())
+    trials = sum(c[1] for c in counts.values())
+    overall = min(wins / trials, 1.0) if trials else 0.0
+
+    by_engineer = {}
+    for (engineer, _), (w, t) in counts.items():
+        totals = by_engineer.setdefault(engineer, [0, 0])
+        totals[0] += w
+        totals[1] += t
+    engineer_rates = {se: min(_shrunk(w, t, overall), 1.0) for se, (w, t) in by_engineer.items()}
+    pair_rates = {key: min(_shrunk(w, t, engineer_rates[key[0]]), 1.0) for key, (w, t) in counts.items()}
+    return {'overall': overall, 'engineer': engineer_rates, 'engineer_region': pair_rates}
+
+
+def get_win_rates():
+    """This worker's calibration, recomputed when the 'sales' data version moves."""
+    from database import get_db_connection, get_data_version
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        version = get_data_version('sales', cursor)
+        with _calibration_lock:
+            if _calibration['rates'] is None or _calibration['version'] != version:
+                _calibration['rates'] = compute_win_rates(cursor)
+                _calibration['version'] = version
+            return _calibration['rates']
+    finally:
+        conn.close()
+
+
+def load_live_projects(cursor):
+    """Live projects with a value, their engineer, region and expected month.
+
+    Region comes from the customer's latest year binding; the engineer is the
+    project's own, else the binding's. Projects without a usable month, or
+    one already past, are expected this month.
+    """
+    cursor.execute('''
+        SELECT p.enquiry_number, p.total_value, COALESCE(p.probability, 50) AS probability,
+               p.month, substr(p.created_at, 1, 4) AS created_year,
+               COALESCE(NULLIF(TRIM(p.sales_engineer), ''), TRIM(b.sales_engineer), '') AS sales_engineer,
+               COALESCE(TRIM(b.region), '') AS region
+        FROM Projects p
+        LEFT JOIN CustomerYearBindings b ON b.id = (
+            SELECT id FROM CustomerYearBindings WHERE customer_id = p.customer_id ORDER BY year DESC LIMIT 1
+        )
+        WHERE COALESCE(NULLIF(p.status, ''), 'Live') = 'Live' AND p.total_value > 0
+    ''')
+    this_month = date.today().replace(day=1)
+    projects = []
+    for row in cursor.fetchall():
+        period = order_period(row[4], row[3])
+        projects.append({
+            'enquiry_number': row[0],
+            'value': float(row[1]),
+            'probability': min(max(float(row[2]), 0.0), 100.0) / 100,
+            'month': max(period, this_month).strftime('%Y-%m') if period else this_month.strftime('%Y-%m'),
+            'sales_engineer': row[5],
+            'region': row[6]
+        })
+    return projects
+
+
+def win_probabilities(projects, rates):
+    """Blend each project's own probability with its engineer/region history."""
+    weight = FORECAST_PROBABILITY_WEIGHT
+    historical = [
+        rates['engineer_region'].get((p['sales_engineer'], p['region']),
+                                     rates['engineer'].get(p['sales_engineer'], rates['overall']))
+        for p in projects
+    ]
+    stated = np.array([p['probability'] for p in projects], dtype=float)
+    return np.clip(weight * stated + (1 - weight) * np.array(historical, dtype=float), 0.0, 1.0)
+
+
+def simulate(values, probabilities, weights, draws, seed=None):
+    """Monte Carlo won revenue.
+
+    Each draw wins every project independently with its probability; weights
+    is a (projects, columns) matrix of how much of a project's value lands in
+    each reported column. Returns a (draws, columns) array.
+    """
+    rng = np.random.default_rng(seed)
+    weights = weights * values[:, None]
+    # Compare in float32 so the random draws are not upcast
+    probabilities = np.asarray(probabilities, dtype=np.float32)
+    results = np.empty((draws, weights.shape[1]))
+    chunk = max(1, _CHUNK_CELLS // max(len(values), 1))
+    for start in range(0, draws, chunk):
+        stop = min(start + chunk, draws)
+        wins = rng.random((stop - start, len(values)), dtype=np.float32) < probabilities
+        results[start:stop] = wins.astype(float) @ weights
+    return results
+
+
+def _summary(samples, expected):
+    p10, p50, p90 = np.percentile(samples, [10, 50, 90], axis=0)
+    return [{'expected': round(float(e), 2), 'p10': round(float(a), 2), 'p50': round(float(b), 2),
+             'p90': round(float(c), 2)} for e, a, b, c in zip(expected, p10, p50, p90)]
+
+
+def forecast_pipeline(projects, rates, draws=None, seed=None):
+    """P10/P50/P90 of won revenue in total, by expected month and by engineer.
+
+    One simulation feeds every breakdown, so the months and engineers are
+    views of the same draws.
+    """
+    draws = min(max(int(draws or FORECAST_DRAWS), 100), MAX_FORECAST_DRAWS)
+    result = {'draws': draws, 'projects': len(projects), 'expected': 0.0,
+              'total': {'p10': 0.0, 'p50': 0.0, 'p90': 0.0}, 'by_month': [], 'by_engineer': []}
+    if not projects:
+        return result
+
+    values = np.array([p['value'] for p in projects], dtype=float)
+    probabilities = win_probabilities(projects, rates)
+    # Columns: the total, then each month, then each engineer
+    breakdowns = {key: sorted({p[key] for p in projects}) for key in ('month', 'sales_engineer')}
+    columns = [('total', None)] + [(key, label) for key, labels in breakdowns.items() for label in labels]
+    column_index = {column: i for i, column in enumerate(columns)}
+    weights = np.zeros((len(projects), len(columns)))
+    weights[:, 0] = 1
+    for row, project in enumerate(projects):
+        for key in breakdowns:
+            weights[row, column_index[(key, project[key])]] = 1
+
+    samples = simulate(values, probabilities, weights, draws, seed)
+    summary = _summary(samples, (values * probabilities) @ weights)
+    counts = weights.sum(axis=0)
+    result['total'] = {k: v for k, v in summary[0].items() if k != 'expected'}
+    result['expected'] = summary[0]['expected']
+    for (key, label), stats, count in zip(columns[1:], summary[1:], counts[1:]):
+        target = result['by_month'] if key == 'month' else result['by_engineer']
+        target.append({key: label, 'projects': int(count), **stats})
+    return result
+
+
+def get_revenue_forecast(draws=None, seed=None):
+    """Forecast the current Live pipeline with cached win-rate calibration."""
+    from database import get_db_connection
+    rates = get_win_rates()
+    conn = get_db_connection()
+    try:
+        projects = load_live_projects(conn.cursor())
+    finally:
+        conn.close()
+    return forecast_pipeline(projects, rates, draws=draws, seed=seed)
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# Per-module overrides, e.g. "calculations=DEBUG,services.query_trace=WARNING"
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Set LOG_ASYNC=0 to write from the logging thread itself (e.g. when debugging a crash)
+LOG_ASYNC = os.environ.get('LOG_ASYNC', '1') != '0'
+# Request/response payloads logged through log_payload(): the sampled fraction,
+# then at most LOG_PAYLOAD_PER_MINUTE per call site
+LOG_PAYLOAD_SAMPLE = float(os.environ.get('LOG_PAYLOAD_SAMPLE', 1.0))
+LOG_PAYLOAD_PER_MINUTE = int(os.environ.get('LOG_PAYLOAD_PER_MINUTE', 30))
+
+_listener = None
+_configured_pid = None
+_lock = threading.Lock()
+
+
+def parse_levels(spec):
+    """'a=DEBUG,b.c=warning' -> {'a': 'DEBUG', 'b.c': 'WARNING'}; malformed entries are ignored."""
+    levels = {}
+    for part in spec.split(','):
+        name, sep, level = part.partition('=')
+        level = level.strip().upper()
+        if sep and name.strip() and isinstance(logging.getLevelName(level), int):
+            levels[name.strip()] = level
+    return levels
+
+
+def configure_logging():
+    """Route all records through a queue to a listener thread and apply the configured levels.
+
+    Replaces the stream handlers logging.basicConfig() installed on the root
+    logger, so request threads only enqueue records and formatting of the
+    final line and the write itself happen off the request. Safe to call
+    more than once; a forked worker gets its own listener.
+    """
+    global _listener, _configured_pid
+    with _lock:
+        if _configured_pid == os.getpid():
+            return
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if type(handler) is logging.StreamHandler or isinstance(handler, QueueHandler):
+                root.removeHandler(handler)
+
+        output = logging.StreamHandler(sys.stderr)
+        output.setFormatter(logging.Formatter(LOG_FORMAT))
+        if LOG_ASYNC:
+            records = queue.SimpleQueue()
+            # The parent's listener thread does not survive a fork, only its object does
+            _listener = QueueListener(records, output, respect_handler_level=True)
+            _listener.start()
+            root.addHandler(QueueHandler(records))
+        else:
+            root.addHandler(output)
+
+        root.setLevel(LOG_LEVEL)
+        for name, level in parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+        _configured_pid = os.getpid()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records (called at exit)."""
+    global _listener
+    with _lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+class _RateLimit:
+    def __init__(self):
+        self.window = 0
+        self.sent = 0
+        self.suppressed = 0
+
+
+_limits = {}
+
+
+def log_payload(logger, msg, *args):
+    """Log a (large) debug payload, sampled and rate limited per call site.
+
+    Nothing is formatted unless logger has DEBUG enabled and the record is
+    kept; the first record after some were dropped says how many.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    if LOG_PAYLOAD_SAMPLE < 1.0 and random.random() >= LOG_PAYLOAD_SAMPLE:
+        return
+    window = int(time.monotonic() // 60)
+    with _lock:
+        limit = _limits.setdefault((logger.name, msg), _RateLimit())
+        if limit.window != window:
+            limit.window, limit.sent = window, 0
+        if limit.sent >= LOG_PAYLOAD_PER_MINUTE:
+            limit.suppressed += 1
+            return
+        limit.sent += 1
+        suppressed, limit.suppressed = limit.suppressed, 0
+    if suppressed:
+        logger.debug(msg + ' (%d similar suppressed)', *args, suppressed)
+    else:
+        logger.debug(msg, *args)
@@ -0,0 +1,143 @@
+import os
+import time
+import logging
+import resource
+import threading
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# Off by default: tracemalloc slows every allocation while it runs
+MEMORY_TRACKING = os.environ.get('MEMORY_TRACKING') == '1'
+# Stack depth kept per allocation; 1 attributes each block to a single line
+MEMORY_TRACKING_FRAMES = int(os.environ.get('MEMORY_TRACKING_FRAMES', 1))
+
+ALLOC_BUCKETS = tuple(2 ** p for p in range(16, 31, 2))   # 64 KiB .. 1 GiB
+RSS_BUCKETS = tuple(m * 1024 * 1024 for m in (64, 128, 192, 256, 384, 512, 768, 1024, 1536, 2048))
+
+# Allocations by the tracker itself and the import machinery are noise on the admin page
+_IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>', '<unknown>')
+
+_request = threading.local()
+_lock = threading.Lock()
+# endpoint -> [requests, peak bytes sum, peak bytes max, retained bytes sum, rss growth sum]
+_endpoint_stats = {}
+_state = {'baseline': None, 'baseline_at': None, 'requests': 0}
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def peak_rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def init_memory_tracking(app):
+    """Trace allocations around every request when MEMORY_TRACKING=1.
+
+    Records each endpoint's peak traced allocation, the bytes it left
+    allocated and the RSS growth, and the worker's RSS after each request.
+    tracemalloc is process-wide, so with several threads per worker,
+    overlapping requests share their peaks.
+    """
+    if not MEMORY_TRACKING:
+        return
+    from flask import request
+
+    tracemalloc.start(MEMORY_TRACKING_FRAMES)
+    logger.info(f"Memory tracking enabled ({MEMORY_TRACKING_FRAMES} frame(s) per allocation)")
+
+    @app.before_request
+    def _start_memory_tracking():
+        tracemalloc.reset_peak()
+        _request.traced = tracemalloc.get_traced_memory()[0]
+        _request.rss = current_rss()
+
+    @app.teardown_request
+    def _record_memory(exc):
+        started = getattr(_request, 'traced', None)
+        if started is None:
+            return
+        _request.traced = None
+        current, peak = tracemalloc.get_traced_memory()
+        rss = current_rss()
+        record_request(request.endpoint or '<unmatched>', peak - started, current - started, rss - _request.rss, rss)
+
+
+def record_request(endpoint, peak, retained, rss_growth, rss):
+    from services.metrics import registry
+    registry.observe('tcf_request_alloc_peak_bytes', {'endpoint': endpoint}, max(peak, 0), ALLOC_BUCKETS)
+    # Counters only go up, so growth and shrinkage are counted apart; net = grown - freed
+    registry.inc('tcf_request_retained_grown_bytes_total', {'endpoint': endpoint}, max(retained, 0))
+    registry.inc('tcf_request_retained_freed_bytes_total', {'endpoint': endpoint}, max(-retained, 0))
+    registry.inc('tcf_request_rss_grown_bytes_total', {'endpoint': endpoint}, max(rss_growth, 0))
+    registry.inc('tcf_request_rss_shrunk_bytes_total', {'endpoint': endpoint}, max(-rss_growth, 0))
+    registry.observe('tcf_worker_rss_bytes', {}, rss, RSS_BUCKETS)
+    with _lock:
+        stats = _endpoint_stats.setdefault(endpoint, [0, 0, 0, 0, 0])
+        stats[0] += 1
+        stats[1] += peak
+        stats[2] = max(stats[2], peak)
+        stats[3] += retained
+        stats[4] += rss_growth
+        _state['requests'] += 1
+
+
+def _statistics(snapshot, baseline=None, limit=30):
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, f) for f in _IGNORED_FILES])
+    if baseline is None:
+        stats = snapshot.statistics('lineno')
+    else:
+        stats = snapshot.compare_to(baseline, 'lineno')
+    rows = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        rows.append({
+            'site': f"{frame.filename}:{frame.lineno}",
+            'size': stat.size,
+            'count': stat.count,
+            'size_diff': getattr(stat, 'size_diff', None),
+            'count_diff': getattr(stat, 'count_diff', None)
+        })
+    return rows
+
+
+def reset_baseline():
+    """Take the snapshot later growth is measured against."""
+    if tracemalloc.is_tracing():
+        with _lock:
+            _state['baseline'] = tracemalloc.take_snapshot()
+            _state['baseline_at'] = time.time()
+
+
+def memory_report(limit=30):
+    """This worker's memory picture for the admin page."""
+    report = {
+        'enabled': tracemalloc.is_tracing(),
+        'pid': os.getpid(),
+        'rss': current_rss(),
+        'peak_rss': peak_rss(),
+        'requests': _state['requests'],
+        'baseline_at': _state['baseline_at']
+    }
+    with _lock:
+        report['endpoints'] = sorted((
+            {'endpoint': endpoint, 'requests': n, 'avg_peak': peak_sum / n, 'max_peak': peak_max,
+             'retained': retained, 'rss_growth': rss_growth}
+            for endpoint, (n, peak_sum, peak_max, retained, rss_growth) in _endpoint_stats.items()
+        ), key=lambda row: row['max_peak'], reverse=True)
+        baseline = _state['baseline']
+    if not report['enabled']:
+        return report
+
+    report['traced'], report['traced_peak'] = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    report['top_sites'] = _statistics(snapshot, limit=limit)
+    report['growth_sites'] = _statistics(snapshot, baseline, limit=limit) if baseline else []
+    return report
@@ -0,0 +1,137 @@
+import logging
+from services.customer_matcher import CustomerMatchIndex, clean_company_name, similarity_score
+
+logger = logging.getLogger(__name__)
+
+# Highly similar but not identical; identical cleaned names are handled by the matcher
+MIN_SCORE = 0.85
+MAX_SCORE = 0.99
+
+
+def ensure_merge_candidate_schema(cursor):
+    """Create the stored merge suggestions and the triggers that keep them current.
+
+    MergeCandidates holds one row per suggested pair, with the higher customer
+    id as primary. Dismissed pairs stay in the table so they are not suggested
+    again. Inserting or renaming a customer queues its id in
+    MergeCandidateQueue for the next refresh; deleting one (merges, orphan
+    cleanup) drops its pairs straight away.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'MergeCandidates'")
+    is_new = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS MergeCandidates (
+            primary_id INTEGER NOT NULL,
+            secondary_id INTEGER NOT NULL,
+            score REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'open',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (primary_id, secondary_id),
+            CHECK (status IN ('open', 'dismissed'))
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_merge_candidates_secondary ON MergeCandidates(secondary_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_merge_candidates_open ON MergeCandidates(status, score DESC)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS MergeCandidateQueue (customer_id INTEGER PRIMARY KEY)')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_merge_candidates_customer_insert
+        AFTER INSERT ON Customers
+        BEGIN
+            INSERT OR IGNORE INTO MergeCandidateQueue (customer_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_merge_candidates_customer_rename
+        AFTER UPDATE OF primary_name ON Customers
+        WHEN OLD.primary_name IS NOT NEW.primary_name
+        BEGIN
+            INSERT OR IGNORE INTO MergeCandidateQueue (customer_id) VALUES (NEW.id);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_merge_candidates_customer_delete
+        AFTER DELETE ON Customers
+        BEGIN
+            DELETE FROM MergeCandidates WHERE primary_id = OLD.id OR secondary_id = OLD.id;
+            DELETE FROM MergeCandidateQueue WHERE customer_id = OLD.id;
+        END
+    ''')
+
+    if is_new:
+        # First run: every existing customer needs comparing once
+        cursor.execute('INSERT OR IGNORE INTO MergeCandidateQueue (customer_id) SELECT id FROM Customers')
+
+
+def refresh_merge_candidates(cursor):
+    """Recompute the open suggestions of every queued customer.
+
+    Only queued customers are compared, and only against the customers the
+    bigram index says can reach MIN_SCORE, so a refresh after a few new names
+    costs a handful of comparisons. Returns the number of customers refreshed.
+    """
+    cursor.execute('SELECT customer_id FROM MergeCandidateQueue')
+    queued = [row[0] for row in cursor.fetchall()]
+    if not queued:
+        return 0
+
+    cursor.execute('SELECT id, primary_name FROM Customers ORDER BY id')
+    customers = [{'id': row[0], 'primary_name': row[1]} for row in cursor.fetchall()]
+    names = {c['id']: clean_company_name(c['primary_name']) for c in customers}
+    index = CustomerMatchIndex(customers)
+
+    for customer_id in queued:
+        cursor.execute("DELETE FROM MergeCandidates WHERE primary_id = ? AND status = 'open'", (customer_id,))
+        cursor.execute("DELETE FROM MergeCandidates WHERE secondary_id = ? AND status = 'open'", (customer_id,))
+
+    pairs = []
+    for customer_id in queued:
+        cleaned = names.get(customer_id)
+        if cleaned is None or len(cleaned) < 3:
+            continue
+        for other_id, other_cleaned in index.similar_customers(cleaned, MIN_SCORE):
+            if other_id == customer_id or len(other_cleaned) < 3:
+                continue
+            primary_id, secondary_id = max(customer_id, other_id), min(customer_id, other_id)
+            # Scored newer-name-first, as the merge center always has
+            score = similarity_score(names[primary_id], names[secondary_id])
+            if MIN_SCORE <= score < MAX_SCORE:
+                pairs.append((primary_id, secondary_id, score))
+
+    # Dismissed pairs win over fresh suggestions for the same customers
+    cursor.executemany('''
+        INSERT OR IGNORE INTO MergeCandidates (primary_id, secondary_id, score)
+        VALUES (?, ?, ?)
+    ''', pairs)
+    cursor.executemany('DELETE FROM MergeCandidateQueue WHERE customer_id = ?', [(c,) for c in queued])
+    logger.info(f"Refreshed merge candidates for {len(queued)} customers ({len(pairs)} pairs)")
+    return len(queued)
+
+
+def get_merge_candidates(cursor, limit=20):
+    """Top open suggestions, best score first."""
+    cursor.execute('''
+        SELECT m.primary_id, p.primary_name AS primary_name, m.secondary_id, s.primary_name AS secondary_name, m.score
+        FROM MergeCandidates m
+        JOIN Customers p ON p.id = m.primary_id
+        JOIN Customers s ON s.id = m.secondary_id
+        WHERE m.status = 'open'
+        ORDER BY m.score DESC, m.primary_id DESC, m.secondary_id DESC
+        LIMIT ?
+    ''', (limit,))
+    return [{
+        'primary_customer': {'id': row[0], 'primary_name': row[1]},
+        'secondary_customer': {'id': row[2], 'primary_name': row[3]},
+        'score': row[4]
+    } for row in cursor.fetchall()]
+
+
+def dismiss_merge_candidate(cursor, primary_id, secondary_id):
+    """Remember that two customers are not duplicates. Returns False if the pair is unknown."""
+    primary_id, secondary_id = max(primary_id, secondary_id), min(primary_id, secondary_id)
+    cursor.execute('''
+        UPDATE MergeCandidates SET status = 'dismissed', updated_at = CURRENT_TIMESTAMP
+        WHERE primary_id = ? AND secondary_id = ?
+    ''', (primary_id, secondary_id))
+    return cursor.rowcount > 0
@@ -0,0 +1,351 @@
+import os
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from services.query_trace import trace_statement, start_request, finish_request
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+# How often each worker adds its pending deltas to the shared metrics file
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+# When set, /metrics requires "Authorization: Bearer <token>"
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+CONNECT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1, 5, 30)
+
+# name -> (type, help)
+METRICS = {
+    'tcf_http_request_duration_seconds': ('histogram', 'Request latency by endpoint and method.'),
+    'tcf_http_requests_total': ('counter', 'Requests by endpoint, method and status code.'),
+    'tcf_http_response_bytes_total': ('counter', 'Response body bytes by endpoint.'),
+    'tcf_sql_statements_per_request': ('histogram', 'SQL statements executed per request by endpoint.'),
+    'tcf_sql_seconds_total': ('counter', 'Time spent executing and fetching SQL by endpoint.'),
+    'tcf_db_connect_seconds': ('histogram', 'Time to check out a database connection, including lock waits on its PRAGMAs.'),
+    'tcf_sql_slow_queries_total': ('counter', 'Statements over SLOW_QUERY_MS by endpoint.'),
+    'tcf_sql_repeated_statements_total': ('counter', 'Statements repeated past N_PLUS_ONE_THRESHOLD in one request, by endpoint.'),
+    'tcf_request_alloc_peak_bytes': ('histogram', 'Peak traced allocation during a request by endpoint (MEMORY_TRACKING=1).'),
+    'tcf_request_retained_grown_bytes_total': ('counter', 'Traced bytes left allocated by requests that grew the heap, by endpoint (MEMORY_TRACKING=1).'),
+    'tcf_request_retained_freed_bytes_total': ('counter', 'Traced bytes freed by requests that shrank the heap, by endpoint (MEMORY_TRACKING=1).'),
+    'tcf_request_rss_grown_bytes_total': ('counter', 'Worker RSS growth across requests that grew it, by endpoint (MEMORY_TRACKING=1).'),
+    'tcf_request_rss_shrunk_bytes_total': ('counter', 'Worker RSS released across requests that shrank it, by endpoint (MEMORY_TRACKING=1).'),
+    'tcf_worker_rss_bytes': ('histogram', 'Worker RSS after each request (MEMORY_TRACKING=1).'),
+    'tcf_admission_in_flight': ('gauge', 'Admitted requests running, by endpoint class, across workers.'),
+    'tcf_admission_queue_depth': ('gauge', 'Requests waiting for admission, by endpoint class, across workers.'),
+    'tcf_admission_wait_seconds': ('histogram', 'Time requests waited for admission by endpoint class.'),
+    'tcf_admission_rejected_total': ('counter', 'Requests refused with 429 by endpoint class and reason (queue_full, timeout).')
+}
+
+
+def _metrics_path():
+    from database import get_render_db_path
+    return os.environ.get('METRICS_DB') or os.path.join(os.path.dirname(get_render_db_path()), 'metrics.db')
+
+
+def _labels(labels):
+    escaped = {k: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for k, v in labels.items()}
+    return ','.join(f'{k}="{v}"' for k, v in sorted(escaped.items()))
+
+
+GAUGES = [name for name, (kind, _) in METRICS.items() if kind == 'gauge']
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsRegistry:
+    """Counters, histograms and gauges of one worker process, aggregated in a SQLite file.
+
+    Updates only touch in-memory dicts; flush() adds the counter and
+    histogram deltas to the shared file every METRICS_FLUSH_SECONDS, so
+    gunicorn workers sum up without coordinating. Histograms are stored as
+    Prometheus series (_bucket per le, _sum, _count). Gauges are stored as
+    each worker's current value under its pid and rendered as the sum over
+    live workers, so a worker that dies mid-request cannot skew them.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._pending = defaultdict(float)
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._schema_ready = False
+        self._flushed_pid = None
+
+    def inc(self, name, labels, value=1):
+        with self._lock:
+            self._pending[(name, _labels(labels), '')] += value
+
+    def observe(self, name, labels, value, buckets):
+        key = _labels(labels)
+        with self._lock:
+            # Every bucket is written, even at zero, so histogram_quantile sees them all
+            for le in buckets:
+                self._pending[(f'{name}_bucket', key, repr(float(le)))] += 1 if value <= le else 0
+            self._pending[(f'{name}_bucket', key, '+Inf')] += 1
+            self._pending[(f'{name}_sum', key, '')] += value
+            self._pending[(f'{name}_count', key, '')] += 1
+
+    def set_gauge(self, name, labels, value):
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path or _metrics_path(), timeout=5.0)
+        if not self._schema_ready:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS Metrics (
+                    name TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    le TEXT NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (name, labels, le)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS Gauges (
+                    name TEXT NOT NULL,
+                    labels TEXT NOT NULL,
+                    pid INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (name, labels, pid)
+                ) WITHOUT ROWID
+            ''')
+            with conn:
+                # Gauges used to be summed +1/-1 deltas here, which a killed worker left unbalanced
+                conn.execute(f"DELETE FROM Metrics WHERE name IN ({','.join('?' * len(GAUGES))})", GAUGES)
+            self._schema_ready = True
+        return conn
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+            gauges, self._gauges = self._gauges, {}
+            self._last_flush = time.monotonic()
+        if not pending and not gauges:
+            return
+        pid = os.getpid()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    if self._flushed_pid != pid:
+                        # Rows left by an earlier process that had this pid
+                        conn.execute('DELETE FROM Gauges WHERE pid = ?', (pid,))
+                    conn.executemany('''
+                        INSERT INTO Metrics (name, labels, le, value) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(name, labels, le) DO UPDATE SET value = value + excluded.value
+                    ''', [(name, labels, le, value) for (name, labels, le), value in pending.items()])
+                    conn.executemany('''
+                        INSERT INTO Gauges (name, labels, pid, value) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(name, labels, pid) DO UPDATE SET value = excluded.value
+                    ''', [(name, labels, pid, value) for (name, labels), value in gauges.items()])
+                self._flushed_pid = pid
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            # Keep the deltas for the next attempt rather than losing them
+            logger.warning(f"Could not flush metrics: {str(e)}")
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] += value
+                for key, value in gauges.items():
+                    self._gauges.setdefault(key, value)
+
+    def forget_worker(self, pid):
+        """Drop a worker's gauges once it has exited (gunicorn child_exit, also after SIGKILL)."""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute('DELETE FROM Gauges WHERE pid = ?', (pid,))
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not drop gauges of worker {pid}: {str(e)}")
+
+    def render(self):
+        """All workers' metrics in Prometheus text format (flushes this worker first)."""
+        self.flush()
+        conn = self._connect()
+        try:
+            dead = [pid for (pid,) in conn.execute('SELECT DISTINCT pid FROM Gauges') if not _pid_alive(pid)]
+            if dead:
+                with conn:
+                    conn.executemany('DELETE FROM Gauges WHERE pid = ?', [(pid,) for pid in dead])
+            rows = conn.execute('''
+                SELECT name, labels, le, value FROM Metrics
+                UNION ALL
+                SELECT name, labels, '', SUM(value) FROM Gauges GROUP BY name, labels
+            ''').fetchall()
+        finally:
+            conn.close()
+
+        series = defaultdict(list)
+        for name, labels, le, value in rows:
+            for base in METRICS:
+                if name == base or name.startswith(base + '_') and name[len(base) + 1:] in ('bucket', 'sum', 'count'):
+                    series[base].append((name, labels, le, value))
+                    break
+
+        suffix_order = {'bucket': 0, 'sum': 1, 'count': 2}
+        lines = []
+        for base, (kind, help_text) in METRICS.items():
+            lines.append(f'# HELP {base} {help_text}')
+            lines.append(f'# TYPE {base} {kind}')
+            for name, labels, le, value in sorted(series[base], key=lambda s: (
+                    s[1], suffix_order.get(s[0].rsplit('_', 1)[-1], 0), float(s[2]) if s[2] else 0.0)):
+                all_labels = ','.join(part for part in (labels, f'le="{le}"' if le else '') if part)
+                lines.append(f'{name}{{{all_labels}}} {value:g}' if all_labels else f'{name} {value:g}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+_request = threading.local()
+
+
+def record_sql(seconds, statements=1):
+    """Charge SQL work to the current request, if any."""
+    stats = getattr(_request, 'stats', None)
+    if stats is not None:
+        stats[0] += statements
+        stats[1] += seconds
+
+
+@contextmanager
+def untracked_sql():
+    """Leave the enclosed statements out of the request's SQL counters and the query trace."""
+    stats = getattr(_request, 'stats', None)
+    _request.stats = None
+    _request.untracked = True
+    try:
+        yield
+    finally:
+        _request.stats = stats
+        _request.untracked = False
+
+
+def record_db_connect(seconds):
+    """Connection checkout time, recorded for connections opened while serving a request."""
+    if METRICS_ENABLED and getattr(_request, 'stats', None) is not None:
+        registry.observe('tcf_db_connect_seconds', {}, seconds, CONNECT_BUCKETS)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that times its statements and fetches for the request metrics.
+
+    Statements also go to services.query_trace for the slow-query log and
+    the per-request N+1 check.
+    """
+
+    def _timed(self, call, args, statements):
+        start = time.perf_counter()
+        try:
+            return call(*args)
+        finally:
+            record_sql(time.perf_counter() - start, statements)
+
+    def _traced(self, call, sql, args, plan_parameters):
+        start = time.perf_counter()
+        try:
+            return call(sql, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_sql(elapsed, 1)
+            if not getattr(_request, 'untracked', False):
+                trace_statement(self.connection, sql, plan_parameters, elapsed)
+
+    def execute(self, sql, parameters=()):
+        return self._traced(super().execute, sql, (parameters,), parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        # Plan with the first row when the rows are already a list
+        first = seq_of_parameters[0] if isinstance(seq_of_parameters, (list, tuple)) and seq_of_parameters else None
+        return self._traced(super().executemany, sql, (seq_of_parameters,), first)
+
+    def executescript(self, sql_script):
+        return self._traced(super().executescript, sql_script, (), None)
+
+    def fetchone(self):
+        return self._timed(super().fetchone, (), 0)
+
+    def fetchmany(self, *args):
+        return self._timed(super().fetchmany, args, 0)
+
+    def fetchall(self):
+        return self._timed(super().fetchall, (), 0)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including the execute() shortcuts, are InstrumentedCursor."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def init_metrics(app):
+    """Instrument every request of app and serve the aggregate at /metrics."""
+    from flask import request, Response, abort
+
+    @app.before_request
+    def _start_request_metrics():
+        _request.started = time.perf_counter()
+        _request.stats = [0, 0.0]
+        start_request(request.endpoint or '<unmatched>')
+
+    @app.after_request
+    def _record_request_metrics(response):
+        stats = getattr(_request, 'stats', None)
+        if stats is None or not METRICS_ENABLED:
+            return response
+        elapsed = time.perf_counter() - _request.started
+        endpoint = request.endpoint or '<unmatched>'
+        labels = {'endpoint': endpoint, 'method': request.method}
+        registry.observe('tcf_http_request_duration_seconds', labels, elapsed, LATENCY_BUCKETS)
+        registry.inc('tcf_http_requests_total', dict(labels, status=response.status_code))
+        registry.inc('tcf_http_response_bytes_total', {'endpoint': endpoint}, response.content_length or 0)
+        registry.observe('tcf_sql_statements_per_request', {'endpoint': endpoint}, stats[0], STATEMENT_BUCKETS)
+        registry.inc('tcf_sql_seconds_total', {'endpoint': endpoint}, stats[1])
+        registry.maybe_flush()
+        return response
+
+    @app.teardown_request
+    def _end_request_metrics(exc):
+        _request.stats = None
+        finish_request()
+
+    @app.route('/metrics')
+    def metrics():
+        if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+            abort(401)
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+    atexit.register(lambda: registry.flush())
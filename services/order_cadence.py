@@ -0,0 +1,159 @@
+import os
+import re
+import logging
+import statistics
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+# A customer is a churn risk once the gap since their last order exceeds
+# mean_interval * CHURN_INTERVAL_MULTIPLIER + stdev_interval * CHURN_STDEV_MARGIN days
+CHURN_INTERVAL_MULTIPLIER = float(os.environ.get('CHURN_INTERVAL_MULTIPLIER', 1.5))
+CHURN_STDEV_MARGIN = float(os.environ.get('CHURN_STDEV_MARGIN', 0))
+CHURN_MIN_ORDERS = int(os.environ.get('CHURN_MIN_ORDERS', 3))
+CHURN_MIN_DAYS = int(os.environ.get('CHURN_MIN_DAYS', 45))
+
+# Orders are grouped by normalized name, as the churn alert always has
+CUSTOMER_KEY_SQL = 'UPPER(TRIM(customer_name))'
+
+_MONTHS = {name: i for i, name in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+
+
+def order_period(year, month):
+    """First day of the month an order was booked in, or None.
+
+    The register stores years as '2024', '2024.0' or '2024-25' and months as
+    'Jul', 'July', '7' or 'Jul-24' (in which case the suffix gives the year).
+    """
+    month = str(month or '').strip().lower()
+    match = re.match(r'^([a-z]{3})[a-z]*[\s\-/]*(\d{2,4})?$', month)
+    if match:
+        month_num = _MONTHS.get(match.group(1))
+        if match.group(2):
+            year = match.group(2) if len(match.group(2)) == 4 else '20' + match.group(2)
+    else:
+        try:
+            month_num = int(float(month))
+        except ValueError:
+            return None
+
+    match = re.match(r'^\s*(\d{4})', str(year or ''))
+    if not month_num or not 1 <= month_num <= 12 or not match:
+        return None
+    return date(int(match.group(1)), month_num, 1)
+
+
+def ensure_order_cadence_schema(cursor):
+    """Create CustomerOrderCadence and the triggers that keep it current.
+
+    One row per customer key with order count, first/last order month and the
+    mean and standard deviation of the gaps between orders in days. Any insert,
+    delete or change of name/period on Orders queues the affected keys in
+    OrderCadenceQueue; refresh_order_cadence recomputes only those.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'CustomerOrderCadence'")
+    is_new = cursor.fetchone() is None
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS CustomerOrderCadence (
+            customer_key TEXT PRIMARY KEY,
+            order_count INTEGER NOT NULL,
+            first_period DATE NOT NULL,
+            last_period DATE NOT NULL,
+            mean_interval_days REAL NOT NULL,
+            stdev_interval_days REAL NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_order_cadence_last_period ON CustomerOrderCadence(last_period)')
+    cursor.execute('CREATE TABLE IF NOT EXISTS OrderCadenceQueue (customer_key TEXT PRIMARY KEY)')
+    cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_orders_customer_key ON Orders({CUSTOMER_KEY_SQL})')
+
+    # No OR IGNORE here: a trigger inherits the conflict policy of the statement that
+    # fired it, and apply_orders fires these from an upsert
+    queue = '''
+        INSERT INTO OrderCadenceQueue (customer_key)
+        SELECT UPPER(TRIM({row}.customer_name)) WHERE {row}.customer_name IS NOT NULL
+        AND NOT EXISTS (SELECT 1 FROM OrderCadenceQueue WHERE customer_key = UPPER(TRIM({row}.customer_name)));
+    '''
+    triggers = {
+        'trg_order_cadence_insert': ('AFTER INSERT', queue.format(row='NEW')),
+        'trg_order_cadence_update': ('AFTER UPDATE OF customer_name, year, month', queue.format(row='OLD') + queue.format(row='NEW')),
+        'trg_order_cadence_delete': ('AFTER DELETE', queue.format(row='OLD'))
+    }
+    for name, (event, body) in triggers.items():
+        # Recreated every time so existing databases pick up changes to the body
+        cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'CREATE TRIGGER {name} {event} ON Orders BEGIN {body} END')
+
+    if is_new:
+        cursor.execute(f'''
+            INSERT OR IGNORE INTO OrderCadenceQueue (customer_key)
+            SELECT DISTINCT {CUSTOMER_KEY_SQL} FROM Orders WHERE customer_name IS NOT NULL
+        ''')
+
+
+def cadence_stats(periods):
+    """(order_count, first, last, mean_interval_days, stdev_interval_days) of a list of order months."""
+    periods = sorted(periods)
+    intervals = [(later - earlier).days for earlier, later in zip(periods, periods[1:])]
+    return (
+        len(periods), periods[0], periods[-1],
+        statistics.fmean(intervals) if intervals else 0.0,
+        statistics.pstdev(intervals) if intervals else 0.0
+    )
+
+
+def refresh_order_cadence(cursor):
+    """Recompute the cadence of every queued customer key. Returns the number refreshed."""
+    cursor.execute('SELECT customer_key FROM OrderCadenceQueue')
+    keys = [row[0] for row in cursor.fetchall()]
+    if not keys:
+        return 0
+
+    periods = {key: [] for key in keys}
+    for i in range(0, len(keys), 900):
+        batch = keys[i:i + 900]
+        placeholders = ','.join(['?'] * len(batch))
+        cursor.execute(f'''
+            SELECT {CUSTOMER_KEY_SQL}, year, month FROM Orders
+            WHERE {CUSTOMER_KEY_SQL} IN ({placeholders})
+        ''', batch)
+        for key, year, month in cursor.fetchall():
+            period = order_period(year, month)
+            if period:
+                periods[key].append(period)
+
+    cursor.executemany('DELETE FROM CustomerOrderCadence WHERE customer_key = ?', [(key,) for key in keys])
+    rows = []
+    for key, key_periods in periods.items():
+        if key_periods:
+            count, first, last, mean, stdev = cadence_stats(key_periods)
+            rows.append((key, count, first.isoformat(), last.isoformat(), mean, stdev))
+    cursor.executemany('''
+        INSERT INTO CustomerOrderCadence
+            (customer_key, order_count, first_period, last_period, mean_interval_days, stdev_interval_days)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows)
+    cursor.executemany('DELETE FROM OrderCadenceQueue WHERE customer_key = ?', [(key,) for key in keys])
+    logger.info(f"Refreshed order cadence for {len(keys)} customers")
+    return len(keys)
+
+
+def get_churn_risks(cursor, limit=2):
+    """Customers overdue against their own ordering rhythm, longest gap first.
+
+    Returns (customer_key, days_since_last_order) tuples.
+    """
+    cursor.execute('''
+        SELECT customer_key, CAST(julianday('now') - julianday(last_period) AS INTEGER) AS days_since
+        FROM CustomerOrderCadence
+        WHERE last_period < date('now', ?)
+          AND order_count >= ?
+          AND mean_interval_days > 0
+          AND CAST(julianday('now') - julianday(last_period) AS INTEGER) > mean_interval_days * ? + stdev_interval_days * ?
+        ORDER BY last_period, customer_key
+        LIMIT ?
+    ''', (f'-{CHURN_MIN_DAYS} days', CHURN_MIN_ORDERS, CHURN_INTERVAL_MULTIPLIER, CHURN_STDEV_MARGIN, limit))
+    return [(row[0], row[1]) for row in cursor.fetchall()]
@@ -6,8 +6,23 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 
+# Bump whenever the quotation layout changes so cached PDFs are regenerated
+TEMPLATE_VERSION = 1
+
+def _as_dict(value):
+    """Fan JSON columns arrive either as raw strings or already decoded by get_project."""
+    if isinstance(value, dict):
+        return value
+    try:
+        return json.loads(value or '{}')
+    except (TypeError, ValueError):
+        return {}
+
 def generate_quotation_pdf(project, fans_data, filepath):
-    """Generates a professional PDF quotation."""
+    """Generates a professional PDF quotation.
+
+    filepath may be a path or a writable file-like object.
+    """
     doc = SimpleDocTemplate(filepath, pagesize=letter,
                             rightMargin=40, leftMargin=40,
                             topMargin=40, bottomMargin=40)
@@ -58,8 +73,8 @@ def generate_quotation_pdf(project, fans_data, filepath):
     
     total_cost = 0
     for idx, fan in enumerate(fans_data):
-        specs = json.loads(fan.get('specifications', '{}'))
-        costs = json.loads(fan.get('costs', '{}'))
+        specs = _as_dict(fan.get('specifications'))
+        costs = _as_dict(fan.get('costs'))
         
         qty = 1 # Assuming 1 per fan entry for now
         unit_price = float(costs.get('total_selling_price', 0))
@@ -0,0 +1,184 @@
+import logging
+import threading
+import pandas as pd
+from services.order_cadence import order_period
+
+logger = logging.getLogger(__name__)
+
+# Dimensions each snapshot frame can be pivoted on
+FRAME_DIMENSIONS = {
+    'orders': ('year', 'month', 'period', 'region', 'sales_engineer', 'sector', 'type_of_customer', 'customer'),
+    'enquiries': ('year', 'month', 'period', 'region', 'sales_engineer', 'customer'),
+    'projects': ('year', 'month', 'period', 'sales_engineer', 'status', 'customer')
+}
+DIMENSIONS = tuple(dict.fromkeys(d for dims in FRAME_DIMENSIONS.values() for d in dims))
+
+# measure -> (numerator, denominator, scale); numerator and denominator are
+# (frame, column) sums, 'records' counting rows. Ratios are taken after
+# summing, so totals stay correct at every level of the pivot.
+MEASURES = {
+    'order_count': (('orders', 'records'), None, 1),
+    'order_value': (('orders', 'order_value'), None, 1),
+    'our_cost': (('orders', 'our_cost'), None, 1),
+    'contribution_value': (('orders', 'contribution_value'), None, 1),
+    'qty': (('orders', 'qty'), None, 1),
+    'contribution_pct': (('orders', 'contribution_value'), ('orders', 'order_value'), 100),
+    'enquiry_count': (('enquiries', 'records'), None, 1),
+    'win_rate': (('orders', 'records'), ('enquiries', 'records'), 100),
+    'project_count': (('projects', 'records'), None, 1),
+    'pipeline_value': (('projects', 'total_value'), None, 1),
+    'weighted_value': (('projects', 'weighted_value'), None, 1)
+}
+
+_QUERIES = {
+    'orders': '''
+        SELECT year, month, region, sales_engineer, sector, type_of_customer, customer_name AS customer,
+               order_value, our_cost, contribution_value, qty
+        FROM Orders
+    ''',
+    'enquiries': '''
+        SELECT year, month, region, sales_engineer, customer_name AS customer
+        FROM EnquiryRegister
+    ''',
+    # Same defaults as the dashboard: a blank status is Live, a missing probability 50
+    'projects': '''
+        SELECT substr(created_at, 1, 4) AS year, substr(created_at, 6, 2) AS month, sales_engineer,
+               COALESCE(NULLIF(status, ''), 'Live') AS status, customer_name AS customer,
+               total_value, total_value * COALESCE(probability, 50) / 100.0 AS weighted_value
+        FROM Projects
+    '''
+}
+
+_snapshot = {'version': None, 'frames': None}
+_snapshot_lock = threading.Lock()
+
+
+def _periods(frame):
+    """Normalize year/month to 'YYYY', 'MM' and 'YYYY-MM' ('' when unknown)."""
+    pairs = {pair: order_period(*pair) for pair in set(zip(frame['year'], frame['month']))}
+    periods = pd.Series([pairs[pair] for pair in zip(frame['year'], frame['month'])], index=frame.index, dtype=object)
+    frame['period'] = periods.map(lambda p: p.strftime('%Y-%m') if p else '')
+    frame['year'] = frame['period'].str[:4]
+    frame['month'] = frame['period'].str[5:]
+
+
+def build_snapshot(conn):
+    """Load Orders, EnquiryRegister and Projects into columnar frames.
+
+    Dimensions become trimmed categoricals ('' for blanks) and measures
+    floats, so a pivot is a masked groupby without touching SQLite.
+    """
+    frames = {}
+    for name, query in _QUERIES.items():
+        frame = pd.read_sql_query(query, conn)
+        _periods(frame)
+        for dim in FRAME_DIMENSIONS[name]:
+            frame[dim] = frame[dim].fillna('').astype(str).str.strip().astype('category')
+        for column in frame.columns.difference(FRAME_DIMENSIONS[name]):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0.0)
+        frame['records'] = 1
+        frames[name] = frame
+    return frames
+
+
+def get_snapshot():
+    """This worker's frames, rebuilt when the 'sales' data version moves."""
+    from database import get_db_connection, get_data_version
+    conn = get_db_connection()
+    try:
+        # Read before the data: a write in between only makes the snapshot
+        # newer than its version, and the next call rebuilds it anyway
+        version = get_data_version('sales', conn.cursor())
+        with _snapshot_lock:
+            if _snapshot['frames'] is None or _snapshot['version'] != version:
+                _snapshot['frames'] = build_snapshot(conn)
+                _snapshot['version'] = version
+                logger.info(f"Built pivot snapshot at sales data version {version}")
+            return version, _snapshot['frames']
+    finally:
+        conn.close()
+
+
+def _select(frame, filters, period_from, period_to):
+    mask = pd.Series(True, index=frame.index)
+    for dim, values in filters.items():
+        mask &= frame[dim].isin(values)
+    if period_from or period_to:
+        # Compare the few distinct periods rather than every row
+        periods = [p for p in frame['period'].cat.categories
+                   if (not period_from or p >= period_from) and (not period_to or p <= period_to)]
+        mask &= frame['period'].isin(periods)
+    return frame.loc[mask]
+
+
+def _sum(selected, source, dims):
+    frame = selected[source[0]]
+    if not dims:
+        return frame[source[1]].sum()
+    return frame.groupby(list(dims), observed=True)[source[1]].sum()
+
+
+def _measure(selected, measure, dims):
+    numerator, denominator, scale = MEASURES[measure]
+    value = _sum(selected, numerator, dims)
+    if denominator is None:
+        return value
+    total = _sum(selected, denominator, dims)
+    if not dims:
+        return value / total * scale if total else None
+    value, total = value.align(total, join='outer')
+    return value.fillna(0) / total.where(total != 0) * scale
+
+
+def _plain(value):
+    if value is None or pd.isna(value):
+        return None
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 4)
+
+
+def _keys(index):
+    return [list(key) if isinstance(key, tuple) else [key] for key in index]
+
+
+def pivot(frames, rows=(), columns=(), measure='order_value', filters=None, period_from=None, period_to=None):
+    """Cross-tab a measure by row and column dimensions.
+
+    Returns row_keys / column_keys (lists of dimension values), values as a
+    row-major matrix with None for empty cells, and the row, column and grand
+    totals. Raises ValueError for unknown names or dimensions a measure's
+    frames do not have.
+    """
+    rows, columns, filters = list(rows), list(columns), dict(filters or {})
+    if measure not in MEASURES:
+        raise ValueError(f"Unknown measure: {measure}")
+    if set(rows) & set(columns):
+        raise ValueError("A dimension cannot be both a row and a column")
+    numerator, denominator, _ = MEASURES[measure]
+    available = set(FRAME_DIMENSIONS[numerator[0]])
+    if denominator:
+        available &= set(FRAME_DIMENSIONS[denominator[0]])
+    unknown = [d for d in rows + columns + list(filters) if d not in available]
+    if unknown:
+        raise ValueError(f"Dimension(s) not available for {measure}: {', '.join(unknown)}")
+
+    selected = {name: _select(frames[name], filters, period_from, period_to)
+                for name in {numerator[0], (denominator or numerator)[0]}}
+    cells = _measure(selected, measure, rows + columns)
+    if not rows and not columns:
+        return {'row_keys': [[]], 'column_keys': [[]], 'values': [[_plain(cells)]],
+                'row_totals': [_plain(cells)], 'column_totals': [_plain(cells)], 'total': _plain(cells)}
+
+    table = cells.unstack(columns) if rows and columns else cells.to_frame().T if columns else cells.to_frame()
+    table = table.sort_index().sort_index(axis=1)
+    row_totals = _measure(selected, measure, rows) if rows else None
+    column_totals = _measure(selected, measure, columns) if columns else None
+    total = _measure(selected, measure, [])
+    return {
+        'row_keys': _keys(table.index) if rows else [[]],
+        'column_keys': _keys(table.columns) if columns else [[]],
+        'values': [[_plain(v) for v in row] for row in table.itertuples(index=False)],
+        'row_totals': [_plain(row_totals.get(k)) for k in table.index] if rows else [_plain(total)],
+        'column_totals': [_plain(column_totals.get(k)) for k in table.columns] if columns else [_plain(total)],
+        'total': _plain(total)
+    }
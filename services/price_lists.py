@@ -0,0 +1,427 @@
+import re
+import hashlib
+import logging
+from datetime import datetime
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ['Brand', 'Motor kW', 'Pole', 'Efficiency', 'Price']
+PRICE_KEY = ['Brand', 'Motor kW', 'Pole', 'Efficiency']
+
+# Header aliases used by the price books we receive
+_BLOCK_COLUMNS = {
+    'kw': ['Motor kW', 'Kw', 'KW', 'kw'],
+    'pole': ['Pole'],
+    'brand': ['Brand'],
+    'eff': ['Efficiency'],
+    'price': ['List Price', 'Price']
+}
+
+
+def ensure_price_list_schema(cursor):
+    """Create the price list version tables.
+
+    PriceListVersions holds one row per distinct uploaded price list; identical
+    uploads reuse the same version. MotorPriceEntries stores the rows of every
+    version, clustered by version. PriceListPublications records when each
+    version went live, which is what point-in-time lookups and rollbacks read.
+    MotorPrices itself stays the live table the calculations query.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS PriceListVersions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            status TEXT NOT NULL DEFAULT 'staged',
+            content_hash TEXT NOT NULL,
+            row_count INTEGER NOT NULL,
+            source TEXT,
+            notes TEXT,
+            created_by TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CHECK (status IN ('staged', 'published', 'discarded'))
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_list_versions_hash ON PriceListVersions(content_hash)')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS MotorPriceEntries (
+            version_id INTEGER NOT NULL,
+            "Brand" TEXT NOT NULL,
+            "Motor kW" REAL NOT NULL,
+            "Pole" INTEGER NOT NULL,
+            "Efficiency" TEXT NOT NULL,
+            "Price" REAL NOT NULL,
+            PRIMARY KEY (version_id, "Brand", "Motor kW", "Pole", "Efficiency"),
+            FOREIGN KEY (version_id) REFERENCES PriceListVersions(id)
+        ) WITHOUT ROWID
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS PriceListPublications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            version_id INTEGER NOT NULL,
+            effective_from TIMESTAMP,
+            published_by TEXT,
+            note TEXT,
+            FOREIGN KEY (version_id) REFERENCES PriceListVersions(id)
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_price_list_publications_effective ON PriceListPublications(effective_from)')
+
+
+def _now():
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _normalize_rows(rows):
+    """Canonical (brand, kW, pole, efficiency, price) tuples, sorted by key."""
+    return sorted(
+        (str(r[0]).strip(), float(r[1]), int(r[2]), str(r[3]).strip(), float(r[4]))
+        for r in rows
+    )
+
+
+def _content_hash(rows):
+    return hashlib.sha256(repr(rows).encode('utf-8')).hexdigest()
+
+
+def parse_motor_price_workbook(excel_file):
+    """Parse a motor price book into (prices, rejected) DataFrames.
+
+    The sheet may hold several side-by-side blocks (``Motor kW``, ``Motor kW.1`` ...).
+    Cleaning is done column-wise; rows that cannot be priced and duplicate keys
+    (first one wins) are returned in ``rejected`` with a reason.
+    """
+    df = pd.read_excel(excel_file, engine='openpyxl')
+    df.columns = df.columns.astype(str).str.strip()
+
+    kw_cols = [c for c in df.columns if any(c.startswith(base) for base in _BLOCK_COLUMNS['kw'])]
+    if not kw_cols:
+        raise ValueError(f"Could not find any 'Motor kW' columns. Available columns: {df.columns.tolist()}")
+
+    def find_col(types, suffix):
+        for t in types:
+            if t + suffix in df.columns:
+                return t + suffix
+        return None
+
+    blocks = []
+    for kw_col in kw_cols:
+        match = re.search(r'(\.\d+)$', kw_col)
+        suffix = match.group(1) if match else ''
+        cols = [kw_col] + [find_col(_BLOCK_COLUMNS[k], suffix) for k in ('pole', 'brand', 'eff', 'price')]
+        if not all(cols):
+            continue
+        block = df[cols].copy()
+        block.columns = ['Motor kW', 'Pole', 'Brand', 'Efficiency', 'Price']
+        block['excel_row'] = block.index + 2
+        blocks.append(block.dropna(subset=['Brand', 'Price', 'Motor kW']))
+
+    if not blocks:
+        raise ValueError("No complete Brand/Motor kW/Pole/Efficiency/Price blocks found")
+
+    raw = pd.concat(blocks, ignore_index=True)
+
+    brand = raw['Brand'].astype(str).str.strip()
+    kw_text = raw['Motor kW'].astype(str).str.strip()
+    header_rows = brand.str.lower().eq('brand') | kw_text.str.lower().str.startswith('motor')
+
+    def to_number(series):
+        return pd.to_numeric(series.astype(str).str.replace(',', '', regex=False).str.strip(), errors='coerce')
+
+    parsed = pd.DataFrame({
+        'Brand': brand,
+        'Motor kW': to_number(raw['Motor kW']),
+        'Pole': pd.to_numeric(raw['Pole'].astype(str).str.strip().str.split('.').str[0], errors='coerce'),
+        'Efficiency': raw['Efficiency'].astype(str).str.strip(),
+        'Price': to_number(raw['Price']),
+        'excel_row': raw['excel_row']
+    })[~header_rows]
+
+    invalid = parsed[['Motor kW', 'Pole', 'Price']].isna().any(axis=1)
+    duplicate = pd.Series(False, index=parsed.index)
+    duplicate[~invalid] = parsed[~invalid].duplicated(subset=PRICE_KEY, keep='first')
+
+    rejected = pd.concat([
+        parsed[invalid].assign(reason='Missing or non-numeric Motor kW, Pole or Price'),
+        parsed[duplicate].assign(reason='Duplicate Brand/Motor kW/Pole/Efficiency')
+    ])
+    prices = parsed[~invalid & ~duplicate].copy()
+    prices['Pole'] = prices['Pole'].astype(int)
+    return prices[PRICE_COLUMNS].reset_index(drop=True), rejected.reset_index(drop=True)
+
+
+def _insert_version(cursor, rows, source, created_by=None, notes=None, status='staged'):
+    """Store a price list version, reusing an existing one with identical content."""
+    digest = _content_hash(rows)
+    cursor.execute(
+        "SELECT id FROM PriceListVersions WHERE content_hash = ? AND status != 'discarded' ORDER BY id LIMIT 1",
+        (digest,)
+    )
+    existing = cursor.fetchone()
+    if existing:
+        return existing[0], True
+
+    cursor.execute('''
+        INSERT INTO PriceListVersions (status, content_hash, row_count, source, notes, created_by)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (status, digest, len(rows), source, notes, created_by))
+    version_id = cursor.lastrowid
+    cursor.executemany(
+        'INSERT INTO MotorPriceEntries (version_id, "Brand", "Motor kW", "Pole", "Efficiency", "Price") VALUES (?, ?, ?, ?, ?, ?)',
+        [(version_id,) + row for row in rows]
+    )
+    return version_id, False
+
+
+def stage_price_list(prices, source=None, created_by=None, notes=None):
+    """Write a parsed price list as a staged version. Returns (version_id, reused)."""
+    from database import get_db_connection
+    rows = _normalize_rows(prices[PRICE_COLUMNS].itertuples(index=False, name=None))
+    if not rows:
+        raise ValueError("Price list is empty")
+
+    conn = get_db_connection()
+    try:
+        version_id, reused = _insert_version(conn.cursor(), rows, source, created_by, notes)
+        conn.commit()
+    finally:
+        conn.close()
+    logger.info(f"Staged motor price list version {version_id} ({len(rows)} rows{', reused' if reused else ''})")
+    return version_id, reused
+
+
+def _publish(cursor, version_id, published_by=None, note=None, effective_from=None):
+    cursor.execute("SELECT status, row_count FROM PriceListVersions WHERE id = ?", (version_id,))
+    version = cursor.fetchone()
+    if not version:
+        raise ValueError(f"Price list version {version_id} not found")
+    if version[0] == 'discarded' or not version[1]:
+        raise ValueError(f"Price list version {version_id} cannot be published")
+
+    cursor.execute('DELETE FROM MotorPrices')
+    cursor.execute('''
+        INSERT INTO MotorPrices ("Brand", "Motor kW", "Pole", "Efficiency", "Price")
+        SELECT "Brand", "Motor kW", "Pole", "Efficiency", "Price"
+        FROM MotorPriceEntries WHERE version_id = ?
+    ''', (version_id,))
+    cursor.execute("UPDATE PriceListVersions SET status = 'published' WHERE id = ?", (version_id,))
+    cursor.execute('''
+        INSERT INTO PriceListPublications (version_id, effective_from, published_by, note)
+        VALUES (?, ?, ?, ?)
+    ''', (version_id, effective_from or _now(), published_by, note))
+
+
+def publish_price_list(version_id, published_by=None, note=None):
+    """Make a version the live MotorPrices in a single transaction.
+
+    Readers keep seeing the previous prices until the commit, and the catalog
+    data version changes with it so cached dropdowns switch over on their next read.
+    """
+    from database import get_db_connection
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        _publish(conn.cursor(), version_id, published_by, note)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    logger.info(f"Published motor price list version {version_id} by {published_by}")
+
+
+def rollback_price_list(version_id=None, published_by=None):
+    """Republish a version (by default the one live before the current one)."""
+    from database import get_db_connection
+    conn = get_db_connection()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        cursor = conn.cursor()
+        cursor.execute('SELECT version_id FROM PriceListPublications ORDER BY id DESC')
+        history = [row[0] for row in cursor.fetchall()]
+        if version_id is None:
+            previous = [v for v in history if v != history[0]] if history else []
+            if not previous:
+                raise ValueError("There is no earlier price list to roll back to")
+            version_id = previous[0]
+        _publish(cursor, version_id, published_by, note=f"replaces version {history[0]}" if history else None)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    logger.info(f"Rolled motor prices back to version {version_id} by {published_by}")
+    return version_id
+
+
+def discard_price_list(version_id):
+    """Drop a staged version that was never published."""
+    from database import get_db_connection
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE PriceListVersions SET status = 'discarded' WHERE id = ? AND status = 'staged'", (version_id,))
+        if cursor.rowcount:
+            cursor.execute('DELETE FROM MotorPriceEntries WHERE version_id = ?', (version_id,))
+        conn.commit()
+        return cursor.rowcount > 0
+    finally:
+        conn.close()
+
+
+def import_motor_prices_from_excel(excel_file, created_by=None, source=None):
+    """Parse, stage and publish an uploaded price book. Returns an import summary."""
+    prices, rejected = parse_motor_price_workbook(excel_file)
+    version_id, reused = stage_price_list(prices, source=source, created_by=created_by)
+    publish_price_list(version_id, published_by=created_by)
+    return {
+        'version_id': version_id,
+        'reused': reused,
+        'imported': len(prices),
+        'rejected': rejected.to_dict('records')
+    }
+
+
+def _version_at(cursor, as_of):
+    cursor.execute('''
+        SELECT version_id, effective_from FROM PriceListPublications
+        WHERE effective_from IS NULL OR effective_from <= ?
+        ORDER BY effective_from DESC, id DESC
+        LIMIT 1
+    ''', (as_of,))
+    return cursor.fetchone()
+
+
+def _normalize_as_of(as_of):
+    """Accept a date or datetime (string or object); a bare date means the end of that day."""
+    if isinstance(as_of, datetime):
+        return as_of.strftime('%Y-%m-%d %H:%M:%S')
+    as_of = str(as_of).strip()
+    if len(as_of) == 10:
+        return as_of + ' 23:59:59'
+    return as_of.replace('T', ' ')
+
+
+def get_motor_price(brand, motor_kw, pole, efficiency, as_of=None):
+    """Look up a motor list price, optionally as it was on a past date.
+
+    Returns a dict with the price and the version it came from, or None.
+    """
+    from database import get_db_connection
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        params = (brand, float(motor_kw), int(pole), efficiency)
+        if as_of is None:
+            cursor.execute('''
+                SELECT "Price" FROM MotorPrices
+                WHERE "Brand" = ? AND "Motor kW" = ? AND "Pole" = ? AND "Efficiency" = ?
+            ''', params)
+            row = cursor.fetchone()
+            return {'price': row[0], 'version_id': None, 'effective_from': None} if row else None
+
+        publication = _version_at(cursor, _normalize_as_of(as_of))
+        if not publication:
+            return None
+        cursor.execute('''
+            SELECT "Price" FROM MotorPriceEntries
+            WHERE version_id = ? AND "Brand" = ? AND "Motor kW" = ? AND "Pole" = ? AND "Efficiency" = ?
+        ''', (publication[0],) + params)
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {'price': row[0], 'version_id': publication[0], 'effective_from': publication[1]}
+    finally:
+        conn.close()
+
+
+def list_price_list_versions():
+    """Versions with their row counts and publication history, newest first."""
+    from database import get_db_connection
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SELECT version_id FROM PriceListPublications ORDER BY id DESC LIMIT 1')
+        current = cursor.fetchone()
+        current_id = current[0] if current else None
+
+        cursor.execute('''
+            SELECT v.id, v.status, v.row_count, v.source, v.created_by, v.created_at,
+                   GROUP_CONCAT(COALESCE(p.effective_from, 'initial'), ', ') AS published
+            FROM PriceListVersions v
+            LEFT JOIN PriceListPublications p ON p.version_id = v.id
+            GROUP BY v.id
+            ORDER BY v.id DESC
+        ''')
+        return [dict(row, is_current=row['id'] == current_id) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def _read_price_rows(cursor, table):
+    cursor.execute(f'SELECT "Brand", "Motor kW", "Pole", "Efficiency", "Price" FROM "{table}"')
+    return _normalize_rows(tuple(row) for row in cursor.fetchall() if None not in tuple(row))
+
+
+def migrate_legacy_backups(cursor):
+    """Fold MotorPrices_backup* table copies into price list versions and drop them.
+
+    A backup named ``..._YYYYMMDD_HHMMSS`` holds the prices that were live until that
+    moment, so each distinct snapshot becomes a version effective from the previous
+    backup's timestamp. The live MotorPrices becomes the current publication.
+    """
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'MotorPrices\\_backup%' ESCAPE '\\'")
+    backup_tables = [row[0] for row in cursor.fetchall()]
+
+    cursor.execute('SELECT COUNT(*) FROM PriceListPublications')
+    has_history = cursor.fetchone()[0] > 0
+    if has_history and not backup_tables:
+        return
+
+    snapshots = []
+    for table in backup_tables:
+        match = re.search(r'_(\d{8}_\d{6})$', table)
+        stamp = datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').strftime('%Y-%m-%d %H:%M:%S') if match else None
+        rows = _read_price_rows(cursor, table)
+        if rows:
+            snapshots.append((stamp, table, rows, _content_hash(rows)))
+
+    dated = sorted((s for s in snapshots if s[0]), key=lambda s: s[0])
+    dated_hashes = {s[3] for s in dated}
+    # Undated copies come from before backups were timestamped
+    undated = [s for s in snapshots if not s[0] and s[3] not in dated_hashes]
+
+    if has_history:
+        # Backups written after the switch to versions (e.g. by an old script) are kept unpublished
+        for stamp, table, rows, _ in undated + dated:
+            _insert_version(cursor, rows, f"migrated from {table}", created_by='migration')
+    else:
+        history = []
+        last_stamp = None
+        for stamp, table, rows, digest in undated + dated:
+            if not history or history[-1]['hash'] != digest:
+                history.append({'hash': digest, 'rows': rows, 'effective_from': last_stamp, 'source': f"migrated from {table}"})
+            last_stamp = stamp or last_stamp
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='MotorPrices'")
+        current_rows = _read_price_rows(cursor, 'MotorPrices') if cursor.fetchone() else []
+        if current_rows and (not history or history[-1]['hash'] != _content_hash(current_rows)):
+            history.append({'hash': _content_hash(current_rows), 'rows': current_rows,
+                            'effective_from': last_stamp, 'source': 'MotorPrices at migration'})
+
+        for entry in history:
+            version_id, _ = _insert_version(cursor, entry['rows'], entry['source'], created_by='migration', status='published')
+            cursor.execute('''
+                INSERT INTO PriceListPublications (version_id, effective_from, published_by, note)
+                VALUES (?, ?, 'migration', ?)
+            ''', (version_id, entry['effective_from'], entry['source']))
+        if history:
+            logger.info(f"Created {len(history)} motor price list versions from existing data")
+
+    for table in backup_tables:
+        cursor.execute(f'DROP TABLE "{table}"')
+    if backup_tables:
+        logger.info(f"Dropped {len(backup_tables)} MotorPrices backup tables")
@@ -0,0 +1,148 @@
+import os
+import re
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Fraction of all requests profiled without being asked; 0 disables sampling
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+# Optional comma-separated endpoints sampling is limited to
+PROFILE_ENDPOINTS = {e.strip() for e in os.environ.get('PROFILE_ENDPOINTS', '').split(',') if e.strip()}
+# Oldest profiles beyond this count are deleted
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 200))
+
+_NAME = re.compile(r'^(\d{8}T\d{6}_\d{6})_([\w.]+)_(\d+)ms\.prof$')
+_UNSAFE = re.compile(r'[^\w.]')
+_request = threading.local()
+
+
+def _profile_dir():
+    from database import get_render_db_path
+    # Absolute, since send_file resolves relative paths against the app root
+    return os.path.abspath(os.environ.get('PROFILE_DIR') or os.path.join(os.path.dirname(get_render_db_path()), 'profiles'))
+
+
+def _requested(request, session):
+    """An admin asked for this request to be profiled (?_profile=1 or X-Profile: 1)."""
+    flag = request.headers.get('X-Profile') or request.args.get('_profile')
+    return flag in ('1', 'true') and bool(session.get('is_admin'))
+
+
+def _sampled(endpoint):
+    return PROFILE_SAMPLE_RATE > 0 and (not PROFILE_ENDPOINTS or endpoint in PROFILE_ENDPOINTS) \
+        and random.random() < PROFILE_SAMPLE_RATE
+
+
+def save_profile(profiler, endpoint, elapsed):
+    """Write a finished profile as <time>_<endpoint>_<ms>ms.prof and prune old ones."""
+    directory = _profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%dT%H%M%S_%f')
+    endpoint = _UNSAFE.sub('_', endpoint)
+    name = f"{stamp}_{endpoint}_{int(elapsed * 1000)}ms.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+
+    stored = sorted(f for f in os.listdir(directory) if _NAME.match(f))
+    for old in stored[:max(len(stored) - PROFILE_KEEP, 0)]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except OSError:
+            pass
+    return name
+
+
+def init_profiling(app):
+    """Profile flagged or sampled requests with cProfile.
+
+    The hook only checks a header, a query argument and the sample rate, so
+    requests that are not profiled pay nothing else.
+    """
+    from flask import request, session
+
+    @app.before_request
+    def _start_profile():
+        endpoint = request.endpoint or '<unmatched>'
+        if _requested(request, session) or _sampled(endpoint):
+            _request.profiler = cProfile.Profile()
+            _request.started = time.perf_counter()
+            _request.profiler.enable()
+
+    @app.teardown_request
+    def _finish_profile(exc):
+        profiler = getattr(_request, 'profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        _request.profiler = None
+        try:
+            name = save_profile(profiler, request.endpoint or '<unmatched>', time.perf_counter() - _request.started)
+            logger.info(f"Saved request profile {name}")
+        except Exception as e:
+            logger.error(f"Error saving request profile: {str(e)}")
+
+
+def list_profiles():
+    """Stored profiles, newest first: dicts with name, time, endpoint and elapsed_ms."""
+    directory = _profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        match = _NAME.match(name)
+        if match:
+            profiles.append({
+                'name': name,
+                'time': datetime.strptime(match.group(1), '%Y%m%dT%H%M%S_%f'),
+                'endpoint': match.group(2),
+                'elapsed_ms': int(match.group(3))
+            })
+    return sorted(profiles, key=lambda p: p['name'], reverse=True)
+
+
+def profile_path(name):
+    """Absolute path of a stored profile; ValueError for anything that is not one."""
+    if not _NAME.match(name or ''):
+        raise ValueError(f"Not a profile: {name}")
+    path = os.path.join(_profile_dir(), name)
+    if not os.path.exists(path):
+        raise ValueError(f"Profile not found: {name}")
+    return path
+
+
+def _function_stats(name):
+    stats = pstats.Stats(profile_path(name))
+    functions = {}
+    for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        label = f"{func} ({os.path.basename(filename)}:{line})" if line else func
+        functions[label] = {'calls': calls, 'tottime': tottime, 'cumtime': cumtime}
+    return functions, stats.total_tt
+
+
+def top_functions(name, sort='cumtime', limit=40):
+    """The limit most expensive functions of a profile by cumtime or tottime."""
+    if sort not in ('cumtime', 'tottime', 'calls'):
+        raise ValueError(f"Unknown sort: {sort}")
+    functions, total = _function_stats(name)
+    ranked = sorted(functions.items(), key=lambda item: item[1][sort], reverse=True)[:limit]
+    return [dict(function=label, **values) for label, values in ranked], total
+
+
+def compare_profiles(name_a, name_b, sort='cumtime', limit=40):
+    """Top functions of two profiles side by side with the change from a to b."""
+    if sort not in ('cumtime', 'tottime', 'calls'):
+        raise ValueError(f"Unknown sort: {sort}")
+    (a, total_a), (b, total_b) = _function_stats(name_a), _function_stats(name_b)
+    empty = {'calls': 0, 'tottime': 0.0, 'cumtime': 0.0}
+    rows = []
+    for label in set(a) | set(b):
+        before, after = a.get(label, empty), b.get(label, empty)
+        rows.append({'function': label, 'a': before, 'b': after, 'delta': after[sort] - before[sort]})
+    # Biggest movers first, whichever direction
+    rows.sort(key=lambda row: (abs(row['delta']), max(row['a'][sort], row['b'][sort])), reverse=True)
+    return rows[:limit], total_a, total_b
@@ -0,0 +1,105 @@
+import os
+import re
+import logging
+import threading
+from collections import Counter
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+QUERY_TRACE_ENABLED = os.environ.get('QUERY_TRACE_ENABLED', '1') != '0'
+# Statements slower than this are logged with their EXPLAIN QUERY PLAN
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 250))
+# The same normalized statement issued more often than this in one request is flagged
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 20))
+# Log every statement SQLite runs, trigger bodies included, at DEBUG
+QUERY_TRACE_ALL = os.environ.get('QUERY_TRACE_ALL') == '1'
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\?(?:\s*,\s*\?)+')
+_WHITESPACE = re.compile(r'\s+')
+
+_request = threading.local()
+
+
+@lru_cache(maxsize=4096)
+def normalize_sql(sql):
+    """Statement shape: literals become ?, IN lists collapse and whitespace is squeezed."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('?+', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN lines of a statement, or [] when it cannot be explained."""
+    import sqlite3
+    try:
+        # The base class method, so the plan itself is not traced
+        rows = sqlite3.Connection.execute(conn, f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+    except sqlite3.Error:
+        return []
+    depth = {0: 0}
+    lines = []
+    for row in rows:
+        node, parent, detail = row[0], row[1], row[3]
+        depth[node] = depth.get(parent, 0) + 1
+        lines.append('  ' * (depth[node] - 1) + detail)
+    return lines
+
+
+def start_request(endpoint):
+    _request.endpoint = endpoint
+    _request.statements = Counter()
+
+
+def finish_request():
+    """Flag statements repeated beyond N_PLUS_ONE_THRESHOLD. Returns [(count, statement)]."""
+    statements = getattr(_request, 'statements', None)
+    endpoint = getattr(_request, 'endpoint', None)
+    _request.statements = None
+    _request.endpoint = None
+    if not statements:
+        return []
+    repeated = [(count, sql) for sql, count in statements.most_common() if count > N_PLUS_ONE_THRESHOLD]
+    if repeated:
+        from services.metrics import registry
+        registry.inc('tcf_sql_repeated_statements_total', {'endpoint': endpoint}, len(repeated))
+        for count, sql in repeated:
+            logger.warning(f"Possible N+1 on {endpoint}: {count}x {sql}")
+    return repeated
+
+
+def trace_statement(conn, sql, parameters, seconds):
+    """Called by the instrumented cursor after each execute/executemany/executescript.
+
+    parameters is None when the statement cannot be re-run for a plan
+    (executemany with an iterator, executescript).
+    """
+    if not QUERY_TRACE_ENABLED:
+        return
+    statements = getattr(_request, 'statements', None)
+    if statements is not None:
+        statements[normalize_sql(sql)] += 1
+
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        endpoint = getattr(_request, 'endpoint', None) or '<background>'
+        plan = explain(conn, sql, parameters) if parameters is not None else []
+        if statements is not None:
+            from services.metrics import registry
+            registry.inc('tcf_sql_slow_queries_total', {'endpoint': endpoint})
+        logger.warning(
+            f"Slow query ({seconds * 1000:.0f}ms) on {endpoint}: {normalize_sql(sql)}"
+            + ''.join(f"\n    {line}" for line in plan)
+        )
+
+
+def _log_statement(sql):
+    logger.debug(f"SQL: {sql}")
+
+
+def attach(conn):
+    """Hook a new connection up to the full statement log when QUERY_TRACE_ALL is set."""
+    if QUERY_TRACE_ENABLED and QUERY_TRACE_ALL:
+        conn.set_trace_callback(_log_statement)
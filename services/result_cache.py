@@ -0,0 +1,88 @@
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# How long a background refresh may run before another worker takes it over
+REFRESH_LEASE_SECONDS = 120
+
+
+def ensure_cache_schema(cursor):
+    """Create CacheEntries, a small JSON result cache shared by every worker process.
+
+    Each entry records when it was computed and when it goes stale;
+    refreshing_until is a lease so only one worker recomputes a stale entry.
+    meta holds whatever the producer wants to keep alongside the value, such
+    as timings.
+    """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS CacheEntries (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            meta TEXT,
+            computed_at REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            refreshing_until REAL
+        ) WITHOUT ROWID
+    ''')
+
+
+def _store(key, value, meta, ttl):
+    from database import get_db_connection
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        conn.execute('''
+            INSERT INTO CacheEntries (key, value, meta, computed_at, expires_at, refreshing_until)
+            VALUES (?, ?, ?, ?, ?, NULL)
+            ON CONFLICT(key) DO UPDATE SET
+                value = excluded.value, meta = excluded.meta, computed_at = excluded.computed_at,
+                expires_at = excluded.expires_at, refreshing_until = NULL
+        ''', (key, json.dumps(value), json.dumps(meta), now, now + ttl))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _refresh(key, compute, ttl):
+    try:
+        value, meta = compute()
+        _store(key, value, meta, ttl)
+    except Exception as e:
+        logger.error(f"Error refreshing cache entry {key}: {str(e)}")
+
+
+def get_or_compute(key, compute, ttl):
+    """Stale-while-revalidate lookup.
+
+    compute() returns (value, meta) with JSON-serializable parts. A fresh
+    entry is returned as is. A stale one is returned immediately while one
+    worker, holding the refresh lease, recomputes it on a background thread.
+    Only a missing entry is computed inline.
+    """
+    from database import get_db_connection
+    now = time.time()
+    conn = get_db_connection()
+    try:
+        row = conn.execute('SELECT value, expires_at FROM CacheEntries WHERE key = ?', (key,)).fetchone()
+        if row is not None and row['expires_at'] <= now:
+            claimed = conn.execute('''
+                UPDATE CacheEntries SET refreshing_until = ?
+                WHERE key = ? AND (refreshing_until IS NULL OR refreshing_until < ?)
+            ''', (now + REFRESH_LEASE_SECONDS, key, now)).rowcount
+            conn.commit()
+            if claimed:
+                threading.Thread(target=_refresh, args=(key, compute, ttl), daemon=True,
+                                 name=f'cache-refresh-{key}').start()
+    finally:
+        conn.close()
+
+    if row is not None:
+        return json.loads(row['value'])
+
+    value, meta = compute()
+    _store(key, value, meta, ttl)
+    return value
+
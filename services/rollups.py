@@ -0,0 +1,155 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ('region', 'sales_engineer', 'sector', 'type_of_customer')
+# Derived from period ('YYYY-MM'); '' when the source row has no usable year/month
+PERIOD_DIMENSIONS = {'period': 'period', 'year': 'substr(period, 1, 4)', 'month': 'substr(period, 6, 2)'}
+MEASURES = ('record_count', 'qty', 'order_value', 'our_cost', 'contribution_value')
+
+# dataset -> (source table, dimensions it has, measures it has)
+SOURCES = {
+    'orders': ('Orders', DIMENSIONS, ('qty', 'order_value', 'our_cost', 'contribution_value')),
+    'enquiries': ('EnquiryRegister', ('region', 'sales_engineer'), ())
+}
+
+_MONTH_PREFIXES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+
+
+def _period_sql(row):
+    """'YYYY-MM' of a source row in SQL, so triggers can compute it.
+
+    Same formats as services.order_cadence.order_period: years like '2024',
+    '2024.0' or '2024-25', months like 'Jul', 'July' or '7'.
+    """
+    year = f"CAST(CAST({row}.year AS REAL) AS INTEGER)"
+    whens = ' '.join(f"WHEN '{prefix}' THEN {i}" for i, prefix in enumerate(_MONTH_PREFIXES, start=1))
+    month = f"(CASE lower(substr(trim({row}.month), 1, 3)) {whens} ELSE CAST(CAST({row}.month AS REAL) AS INTEGER) END)"
+    return f"(CASE WHEN {year} > 1900 AND {month} BETWEEN 1 AND 12 THEN printf('%04d-%02d', {year}, {month}) ELSE '' END)"
+
+
+def _key_values(dataset, row):
+    _, dims, _ = SOURCES[dataset]
+    return [_period_sql(row)] + [f"COALESCE(TRIM({row}.{d}), '')" if d in dims else "''" for d in DIMENSIONS]
+
+
+def _measure_values(dataset, row, sign):
+    _, _, measures = SOURCES[dataset]
+    return [str(sign)] + [f"{sign} * COALESCE(CAST({row}.{m} AS REAL), 0)" if m in measures else '0'
+                          for m in MEASURES[1:]]
+
+
+def _apply_sql(dataset, row, sign):
+    """Add (sign=1) or remove (sign=-1) one source row from its rollup cell.
+
+    Written as UPDATE + INSERT ... WHERE NOT EXISTS rather than an upsert: a
+    trigger body runs under the conflict policy of the statement that fired
+    it, and apply_orders fires these from an upsert of its own.
+    """
+    key = ['period'] + list(DIMENSIONS)
+    values = _key_values(dataset, row)
+    measures = _measure_values(dataset, row, sign)
+    where = f"dataset = '{dataset}' AND " + ' AND '.join(f"{col} = {val}" for col, val in zip(key, values))
+    sql = f'''
+        UPDATE MonthlyRollups SET {', '.join(f'{m} = {m} + {val}' for m, val in zip(MEASURES, measures))}
+        WHERE {where};
+        INSERT INTO MonthlyRollups (dataset, {', '.join(key)}, {', '.join(MEASURES)})
+        SELECT '{dataset}', {', '.join(values)}, {', '.join(measures)}
+        WHERE NOT EXISTS (SELECT 1 FROM MonthlyRollups WHERE {where});
+    '''
+    if sign < 0:
+        sql += f"DELETE FROM MonthlyRollups WHERE {where} AND record_count <= 0;"
+    return sql
+
+
+def rebuild_rollups(cursor, dataset=None):
+    """Recompute the cube from the source tables (all datasets by default)."""
+    for name, (table, _, _) in SOURCES.items():
+        if dataset and name != dataset:
+            continue
+        cursor.execute('DELETE FROM MonthlyRollups WHERE dataset = ?', (name,))
+        keys = _key_values(name, table)
+        measures = _measure_values(name, table, 1)
+        cursor.execute(f'''
+            INSERT INTO MonthlyRollups (dataset, period, {', '.join(DIMENSIONS)}, {', '.join(MEASURES)})
+            SELECT '{name}', {', '.join(keys)}, {', '.join(f'SUM({m})' for m in measures)}
+            FROM {table}
+            GROUP BY {', '.join(str(i) for i in range(2, len(keys) + 2))}
+        ''')
+
+
+def ensure_rollup_schema(cursor):
+    """Create MonthlyRollups and the triggers that maintain it.
+
+    One row per (dataset, period, region, sales_engineer, sector,
+    type_of_customer) cell with the record count and summed order measures.
+    Triggers on Orders and EnquiryRegister add and remove each changed row's
+    contribution, so imports and manual entries keep the cube current without
+    a rebuild. Blank dimensions are stored as ''.
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'MonthlyRollups'")
+    is_new = cursor.fetchone() is None
+
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS MonthlyRollups (
+            dataset TEXT NOT NULL,
+            period TEXT NOT NULL,
+            {' '.join(f'{d} TEXT NOT NULL,' for d in DIMENSIONS)}
+            record_count INTEGER NOT NULL,
+            {' '.join(f'{m} REAL NOT NULL,' for m in MEASURES[1:])}
+            PRIMARY KEY (dataset, period, {', '.join(DIMENSIONS)})
+        ) WITHOUT ROWID
+    ''')
+
+    for dataset, (table, dims, measures) in SOURCES.items():
+        watched = ', '.join(('year', 'month') + dims + measures)
+        triggers = {
+            f'trg_rollup_{dataset}_insert': ('AFTER INSERT', _apply_sql(dataset, 'NEW', 1)),
+            f'trg_rollup_{dataset}_update': (f'AFTER UPDATE OF {watched}', _apply_sql(dataset, 'OLD', -1) + _apply_sql(dataset, 'NEW', 1)),
+            f'trg_rollup_{dataset}_delete': ('AFTER DELETE', _apply_sql(dataset, 'OLD', -1))
+        }
+        for name, (event, body) in triggers.items():
+            # Recreated every time so existing databases pick up changes to the body
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+            cursor.execute(f'CREATE TRIGGER {name} {event} ON {table} BEGIN {body} END')
+
+    if is_new:
+        rebuild_rollups(cursor)
+        logger.info("Built monthly rollups from Orders and EnquiryRegister")
+
+
+def query_rollups(cursor, dataset, group_by=(), filters=None, period_from=None, period_to=None):
+    """Slice and dice the cube.
+
+    group_by names any of year, month, period and the DIMENSIONS; filters maps
+    the same names to a list of accepted values. Returns one dict per group
+    with the summed measures. Raises ValueError on unknown names.
+    """
+    if dataset not in SOURCES:
+        raise ValueError(f"Unknown dataset: {dataset}")
+    columns = dict(PERIOD_DIMENSIONS, **{d: d for d in DIMENSIONS})
+    unknown = [name for name in list(group_by) + list(filters or {}) if name not in columns]
+    if unknown:
+        raise ValueError(f"Unknown dimension(s): {', '.join(unknown)}")
+
+    where = ['dataset = ?']
+    params = [dataset]
+    if period_from:
+        where.append('period >= ?')
+        params.append(period_from)
+    if period_to:
+        where.append('period <= ?')
+        params.append(period_to)
+    for name, values in (filters or {}).items():
+        where.append(f"{columns[name]} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+
+    _, _, measures = SOURCES[dataset]
+    selected = [f'{columns[name]} AS {name}' for name in group_by]
+    selected += [f'SUM({m}) AS {m}' for m in ('record_count',) + measures]
+    query = f"SELECT {', '.join(selected)} FROM MonthlyRollups WHERE {' AND '.join(where)}"
+    if group_by:
+        query += f" GROUP BY {', '.join(columns[name] for name in group_by)} ORDER BY {', '.join(columns[name] for name in group_by)}"
+    cursor.execute(query, params)
+    names = [d[0] for d in cursor.description]
+    return [dict(zip(names, row)) for row in cursor.fetchall()]
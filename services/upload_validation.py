@@ -0,0 +1,369 @@
+import os
+import time
+import uuid
+import shutil
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Price moves beyond this percentage against the live list are flagged for review
+PRICE_OUTLIER_PCT = float(os.environ.get('PRICE_OUTLIER_THRESHOLD_PCT', 50))
+STAGED_UPLOAD_MAX_AGE = 24 * 3600
+SAMPLE_SIZE = 50
+
+ORDER_DIFF_COLUMNS = ['year', 'month', 'customer_name', 'sales_engineer', 'region', 'order_value', 'our_cost',
+                      'contribution_value', 'contribution_percentage', 'qty', 'type_of_customer', 'sector']
+ENQUIRY_DIFF_COLUMNS = ['year', 'month', 'sales_engineer', 'customer_name', 'region']
+
+
+def _excel_rows(index, limit=20):
+    """Frames keep the sheet's row index, so Excel row = index + 2 (header is row 1)."""
+    return [int(i) + 2 for i in list(index)[:limit]]
+
+
+def _issue(message, index=None):
+    issue = {'message': message}
+    if index is not None:
+        issue['rows'] = _excel_rows(index)
+        issue['count'] = len(index)
+    return issue
+
+
+def _key_label(row, key):
+    return ' / '.join(str(row[k]) for k in key) if isinstance(key, list) else str(row[key])
+
+
+def _differs(new, old, numeric):
+    """Element-wise 'value changed' for two aligned columns.
+
+    Values that parse as numbers on both sides are compared numerically (so a
+    year stored as '2019' matches 2019.0); everything else as stripped text.
+    """
+    result = pd.Series(False, index=new.index)
+    # Most rows are untouched; only normalise the ones that are not trivially equal
+    pending = ~((new.astype(object) == old.astype(object)) | (new.isna() & old.isna()))
+    if not pending.any():
+        return result
+    new, old = new[pending], old[pending]
+
+    a_text = new.astype(object).where(new.notna(), '').astype(str).str.strip()
+    b_text = old.astype(object).where(old.notna(), '').astype(str).str.strip()
+    a = pd.to_numeric(a_text, errors='coerce').to_numpy(dtype=float)
+    b = pd.to_numeric(b_text, errors='coerce').to_numpy(dtype=float)
+    if numeric:
+        # Blank numbers are imported as 0
+        a = np.where(a_text.eq('').to_numpy(), 0.0, a)
+        b = np.where(b_text.eq('').to_numpy(), 0.0, b)
+    both_numeric = ~np.isnan(a) & ~np.isnan(b)
+    same = np.where(both_numeric, np.isclose(a, b, rtol=0, atol=1e-9), (a_text == b_text).to_numpy())
+    result[pending] = ~same
+    return result
+
+
+def diff_frames(new, current, key, columns, numeric_columns=()):
+    """Compare an upload against the current rows in one outer merge.
+
+    A boolean ``_removable`` column on ``current`` limits which missing rows the
+    import would delete (e.g. only Excel-sourced orders). Returns the summary
+    dict and the merged frame.
+    """
+    columns = [c for c in columns if c in new.columns and c in current.columns]
+    keys = key if isinstance(key, list) else [key]
+    removable = '_removable' in current.columns
+    current = current[keys + columns + (['_removable'] if removable else [])]
+    merged = new[keys + columns].merge(current, on=keys, how='outer', suffixes=('', '_current'), indicator=True)
+
+    added = merged['_merge'] == 'left_only'
+    removed = merged['_merge'] == 'right_only'
+    if removable:
+        removed &= merged['_removable'].astype(object).where(merged['_removable'].notna(), False).astype(bool)
+    both = merged['_merge'] == 'both'
+
+    matched = merged[both]
+    changed_cols = pd.DataFrame({
+        col: _differs(matched[col], matched[f'{col}_current'], col in numeric_columns)
+        for col in columns
+    }, index=matched.index).reindex(merged.index, fill_value=False)
+    changed = changed_cols.any(axis=1) if columns else pd.Series(False, index=merged.index)
+
+    samples = []
+    for idx in merged.index[changed][:SAMPLE_SIZE]:
+        row = merged.loc[idx]
+        samples.append({
+            'key': _key_label(row, key),
+            'changes': {col: {'old': row[f'{col}_current'], 'new': row[col]}
+                        for col in columns if changed_cols.at[idx, col]}
+        })
+
+    summary = {
+        'added': int(added.sum()),
+        'removed': int(removed.sum()),
+        'changed': int(changed.sum()),
+        'unchanged': int((both & ~changed).sum()),
+        'added_keys': [_key_label(r, key) for _, r in merged[added].head(SAMPLE_SIZE).iterrows()],
+        'removed_keys': [_key_label(r, key) for _, r in merged[removed].head(SAMPLE_SIZE).iterrows()],
+        'changes': samples
+    }
+    return summary, merged.assign(_changed=changed)
+
+
+def _report(dataset, rows, valid_rows, errors, warnings, diff, started, **extra):
+    report = {
+        'dataset': dataset,
+        'rows': int(rows),
+        'valid_rows': int(valid_rows),
+        'errors': errors,
+        'warnings': warnings,
+        'diff': diff,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+    report.update(extra)
+    return report
+
+
+def validate_motor_prices(prices, rejected, current):
+    """Validate a parsed price list (see price_lists.parse_motor_price_workbook) against the live one."""
+    from services.price_lists import PRICE_KEY
+    started = time.perf_counter()
+    errors, warnings = [], []
+
+    for reason, group in rejected.groupby('reason', sort=False):
+        warnings.append(_issue(f"{reason} - skipped", group['excel_row'] - 2))
+
+    non_positive = prices['Price'] <= 0
+    if non_positive.any():
+        errors.append({'message': 'Price must be greater than zero', 'count': int(non_positive.sum()),
+                       'keys': [_key_label(r, PRICE_KEY) for _, r in prices[non_positive].head(20).iterrows()]})
+    if prices.empty:
+        errors.append({'message': 'The file contains no valid prices'})
+
+    diff, merged = diff_frames(prices, current, PRICE_KEY, ['Price'], numeric_columns=('Price',))
+
+    changed = merged[merged['_changed']]
+    pct = (changed['Price'] - changed['Price_current']) / changed['Price_current'].replace(0, np.nan) * 100
+    for sample in diff['changes']:
+        change = sample['changes']['Price']
+        if change['old']:
+            change['pct'] = round((change['new'] - change['old']) / change['old'] * 100, 1)
+
+    outliers = changed[pct.abs() > PRICE_OUTLIER_PCT]
+    if len(outliers):
+        warnings.append({
+            'message': f"Price changed by more than {PRICE_OUTLIER_PCT:g}% against the live list",
+            'count': len(outliers),
+            'keys': [f"{_key_label(r, PRICE_KEY)}: {r['Price_current']:g} -> {r['Price']:g}"
+                     for _, r in outliers.head(20).iterrows()]
+        })
+    if len(current) and diff['removed'] > len(current) / 2:
+        warnings.append({'message': f"{diff['removed']} of {len(current)} live prices are missing from the file"})
+
+    price_change = {
+        'mean_pct': round(float(pct.mean()), 1) if len(pct.dropna()) else 0.0,
+        'max_increase_pct': round(float(pct.max()), 1) if len(pct.dropna()) else 0.0,
+        'max_decrease_pct': round(float(pct.min()), 1) if len(pct.dropna()) else 0.0
+    }
+    return _report('motor_prices', len(prices) + len(rejected), len(prices), errors, warnings, diff, started,
+                   price_change=price_change)
+
+
+def _common_sheet_checks(raw, df, key, numeric_columns, expected_columns):
+    """Warnings shared by the order and enquiry registers."""
+    warnings = []
+    missing_cols = [c for c in expected_columns if c not in raw.columns]
+    if missing_cols:
+        warnings.append({'message': f"Columns not found in the sheet: {', '.join(missing_cols)}"})
+
+    keys = raw[key].astype(object).where(raw[key].notna(), '').astype(str).str.strip()
+    blank = keys.isin(['', 'nan'])
+    if blank.any():
+        warnings.append(_issue(f"Rows without {key} - skipped", raw.index[blank]))
+
+    duplicated = keys[~blank].duplicated(keep='last')
+    if duplicated.any():
+        warnings.append(_issue(f"Duplicate {key} - only the last occurrence is kept", duplicated[duplicated].index))
+
+    for col in numeric_columns:
+        if col not in raw.columns:
+            continue
+        coerced = pd.to_numeric(raw[col], errors='coerce')
+        bad = raw[col].notna() & coerced.isna() & raw.index.isin(df.index)
+        if bad.any():
+            warnings.append(_issue(f"Non-numeric {col} - imported as 0", raw.index[bad]))
+    return warnings
+
+
+def validate_orders(df, raw, current):
+    """Validate a cleaned order register frame against the Orders table."""
+    from database import ORDER_COLUMN_MAP, ORDER_NUMERIC_COLUMNS
+    started = time.perf_counter()
+    errors = []
+    warnings = _common_sheet_checks(raw, df, 'job_ref', ORDER_NUMERIC_COLUMNS, ORDER_COLUMN_MAP.values())
+
+    if 'order_value' in df.columns:
+        negative = df['order_value'] < 0
+        if negative.any():
+            warnings.append(_issue('Negative order value', df.index[negative]))
+    if df.empty:
+        errors.append({'message': 'The sheet contains no orders'})
+
+    current = current.assign(_removable=current['source'].eq('excel'))
+    diff, _ = diff_frames(df, current, 'job_ref', ORDER_DIFF_COLUMNS, numeric_columns=ORDER_NUMERIC_COLUMNS)
+    return _report('orders', len(raw), len(df), errors, warnings, diff, started)
+
+
+def validate_enquiries(df, raw, current):
+    """Validate a cleaned enquiry register frame against EnquiryRegister."""
+    from database import ENQUIRY_COLUMN_MAP
+    started = time.perf_counter()
+    errors = []
+    warnings = _common_sheet_checks(raw, df, 'enquiry_number', [], ENQUIRY_COLUMN_MAP.values())
+
+    unknown = df['month'] == 'Unknown'
+    if unknown.any():
+        warnings.append(_issue('Enquiry number is not in EQyyMM... form - month set to Unknown', df.index[unknown]))
+    if df.empty:
+        errors.append({'message': 'The sheet contains no enquiries'})
+
+    current = current.assign(_removable=current['source'].eq('excel'))
+    diff, _ = diff_frames(df, current, 'enquiry_number', ENQUIRY_DIFF_COLUMNS)
+    return _report('enquiries', len(raw), len(df), errors, warnings, diff, started)
+
+
+def stage_motor_prices(file, created_by=None, source=None):
+    """Parse, validate and stage an uploaded price book for review.
+
+    Returns (version_id, report); version_id is None when the file has blocking errors.
+    """
+    from database import get_db_connection
+    from services.price_lists import parse_motor_price_workbook, stage_price_list
+
+    prices, rejected = parse_motor_price_workbook(file)
+    conn = get_db_connection()
+    try:
+        current = pd.read_sql_query('SELECT "Brand", "Motor kW", "Pole", "Efficiency", "Price" FROM MotorPrices', conn)
+    finally:
+        conn.close()
+
+    report = validate_motor_prices(prices, rejected, current)
+    if report['errors']:
+        return None, report
+    version_id, _ = stage_price_list(prices, source=source, created_by=created_by)
+    return version_id, report
+
+
+# --- Staged master-data uploads -------------------------------------------------
+
+def _staging_dir():
+    from database import get_render_db_path
+    path = os.environ.get('UPLOAD_STAGING_DIR') or os.path.join(os.path.dirname(get_render_db_path()), 'upload_staging')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _token_dir(token):
+    # Tokens are generated here; refuse anything else so a token can never escape the staging dir
+    if not token or not all(c in '0123456789abcdef' for c in token) or len(token) != 32:
+        raise ValueError("Invalid upload token")
+    return os.path.join(_staging_dir(), token)
+
+
+def _purge_stale_uploads():
+    root = _staging_dir()
+    cutoff = time.time() - STAGED_UPLOAD_MAX_AGE
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def stage_master_data(file, datasets=('orders', 'enquiries')):
+    """Parse and validate the order/enquiry registers of an upload without touching the tables.
+
+    The cleaned frames are kept under a token until the upload is confirmed or discarded.
+    Returns (token, reports, messages).
+    """
+    from database import (get_db_connection, read_orders_sheet, read_enquiries_sheet,
+                          ORDERS_SHEET, ENQUIRIES_SHEET)
+
+    xlsx = pd.ExcelFile(file)
+    readers = {
+        'orders': (ORDERS_SHEET, read_orders_sheet, validate_orders, 'SELECT * FROM Orders'),
+        'enquiries': (ENQUIRIES_SHEET, read_enquiries_sheet, validate_enquiries, 'SELECT * FROM EnquiryRegister')
+    }
+
+    _purge_stale_uploads()
+    token = uuid.uuid4().hex
+    path = _token_dir(token)
+    os.makedirs(path)
+
+    reports, messages = [], []
+    conn = get_db_connection()
+    try:
+        for dataset in datasets:
+            sheet, reader, validator, query = readers[dataset]
+            if sheet not in xlsx.sheet_names:
+                messages.append(f"'{sheet}' sheet not found.")
+                continue
+            df, raw = reader(xlsx)
+            if df is None:
+                messages.append(f"'{sheet}' has no key column - skipped.")
+                continue
+            current = pd.read_sql_query(query, conn)
+            report = validator(df, raw, current)
+            reports.append(report)
+            if not report['errors']:
+                df.to_pickle(os.path.join(path, f'{dataset}.pkl'))
+    finally:
+        conn.close()
+
+    if not any(os.scandir(path)):
+        shutil.rmtree(path, ignore_errors=True)
+        token = None
+    return token, reports, messages
+
+
+def commit_staged_upload(token, link_customers=True):
+    """Apply a previously validated upload. Returns the result messages."""
+    from database import apply_orders, apply_enquiries
+
+    path = _token_dir(token)
+    applying = path + '.applying'
+    # Claim the upload atomically so a double-submitted confirm cannot apply it twice
+    try:
+        os.rename(path, applying)
+    except OSError:
+        raise ValueError("This upload has expired, was already applied or is being applied - please upload the file again")
+
+    appliers = {'orders': ('Orders', apply_orders), 'enquiries': ('Enquiry Register', apply_enquiries)}
+    messages = []
+    try:
+        for dataset, (label, apply) in appliers.items():
+            frame_path = os.path.join(applying, f'{dataset}.pkl')
+            if os.path.exists(frame_path):
+                count = apply(pd.read_pickle(frame_path))
+                messages.append(f"Successfully imported {count} rows into {label}.")
+    except Exception:
+        # Hand the token back so the upload can be confirmed again; the appliers are idempotent
+        os.rename(applying, path)
+        raise
+    shutil.rmtree(applying, ignore_errors=True)
+
+    if link_customers:
+        # Run ML engine to link customers and remove duplicates
+        try:
+            from scripts.run_customer_matcher import deduplicate_and_link_customers, format_stage_counts
+            stages = deduplicate_and_link_customers()
+            messages.append(f"Successfully linked and deduplicated customers using ML engine ({format_stage_counts(stages)}).")
+        except Exception as e:
+            logger.error(f"Error running ML Customer matching: {str(e)}")
+            messages.append(f"Customer deduplication error: {str(e)}")
+    return messages
+
+
+def discard_staged_upload(token):
+    shutil.rmtree(_token_dir(token), ignore_errors=True)
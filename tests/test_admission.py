@@ -0,0 +1,122 @@
+import os
+import sys
+import signal
+import tempfile
+import threading
+import subprocess
+import unittest
+from flask import Flask, jsonify
+from services import metrics
+from services.admission import init_admission_control, parse_limits, ADMISSION_DEFAULTS
+from services.metrics import MetricsRegistry
+
+class TestAdmissionControl(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original = metrics.registry
+        metrics.registry = MetricsRegistry(os.path.join(self.tmp.name, 'metrics.db'))
+        self.started = threading.Event()
+        self.finish = threading.Event()
+
+    def tearDown(self):
+        self.finish.set()
+        metrics.registry = self.original
+        self.tmp.cleanup()
+
+    def _app(self, limits):
+        app = Flask(__name__)
+        init_admission_control(app, dict(ADMISSION_DEFAULTS, **limits))
+
+        @app.route('/api/dashboard_stats')
+        def api_dashboard_stats():
+            self.started.set()
+            self.finish.wait(10)
+            return jsonify({'ok': True})
+
+        @app.route('/api/exports/bulk')
+        def api_bulk_export():
+            return app.response_class((b'chunk' for _ in range(3)), direct_passthrough=True)
+
+        @app.route('/calculate_fan', methods=['POST'])
+        def calculate_fan():
+            return jsonify({'ok': True})
+
+        return app
+
+    def _hold_slot(self, app):
+        holder = threading.Thread(target=lambda: app.test_client().get('/api/dashboard_stats').close())
+        holder.start()
+        self.assertTrue(self.started.wait(5))
+        return holder
+
+    def test_saturated_class_is_refused_while_interactive_requests_pass(self):
+        app = self._app({'analytics': (1, 0, 0)})
+        holder = self._hold_slot(app)
+        client = app.test_client()
+
+        refused = client.get('/api/dashboard_stats')
+        self.assertEqual(refused.status_code, 429)
+        self.assertEqual(refused.headers['Retry-After'], '1')
+        self.assertEqual(client.post('/calculate_fan').status_code, 200)
+
+        self.finish.set()
+        holder.join(5)
+        self.assertEqual(client.get('/api/dashboard_stats').status_code, 200)
+        self.assertEqual(app.extensions['admission_gates']['analytics'].active, 0)
+
+        rendered = metrics.registry.render()
+        self.assertIn('tcf_admission_rejected_total{class="analytics",reason="queue_full"} 1', rendered)
+        self.assertIn('tcf_admission_in_flight{class="analytics"} 0', rendered)
+
+    def test_streamed_response_holds_the_slot_until_closed(self):
+        app = self._app({'import_export': (1, 0, 0)})
+        client = app.test_client()
+        streaming = client.get('/api/exports/bulk', buffered=False)
+        self.assertEqual(client.get('/api/exports/bulk').status_code, 429)
+        streaming.close()
+        self.assertEqual(app.extensions['admission_gates']['import_export'].active, 0)
+        self.assertEqual(client.get('/api/exports/bulk').get_data(), b'chunk' * 3)
+
+    def test_queued_request_times_out(self):
+        app = self._app({'analytics': (1, 1, 0.2)})
+        holder = self._hold_slot(app)
+        refused = app.test_client().get('/api/dashboard_stats')
+        self.finish.set()
+        holder.join(5)
+        self.assertEqual(refused.status_code, 429)
+        rendered = metrics.registry.render()
+        self.assertIn('tcf_admission_rejected_total{class="analytics",reason="timeout"} 1', rendered)
+        self.assertIn('tcf_admission_queue_depth{class="analytics"} 0', rendered)
+
+    def test_killed_worker_does_not_leave_its_slot_in_the_gauge(self):
+        # A worker SIGKILLed (gunicorn timeout) while holding a slot never releases it
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        worker = subprocess.Popen([sys.executable, '-c', (
+            'import sys\n'
+            'from services import metrics\n'
+            'from services.admission import Gate\n'
+            'metrics.registry = metrics.MetricsRegistry(sys.argv[1])\n'
+            'Gate("import_export", 1, 0, 0).acquire()\n'
+            'metrics.registry.flush()\n'
+            'print("holding", flush=True)\n'
+            'sys.stdin.read()\n'
+        ), metrics.registry.path], cwd=root, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(worker.stdout.readline().strip(), 'holding')
+            self.assertIn('tcf_admission_in_flight{class="import_export"} 1', metrics.registry.render())
+        finally:
+            worker.send_signal(signal.SIGKILL)
+            worker.wait(5)
+            worker.stdin.close()
+            worker.stdout.close()
+        self.assertNotIn('tcf_admission_in_flight{class="import_export"}', metrics.registry.render())
+
+    def test_parse_limits(self):
+        limits = parse_limits('analytics=3:5, import_export=2, admin_sql=0:0:0, bogus=1, interactive=x')
+        self.assertEqual(limits['analytics'], (3, 5, 10.0))
+        self.assertEqual(limits['import_export'], (2, 1, 5.0))
+        self.assertEqual(limits['admin_sql'], (0, 0, 0.0))
+        self.assertEqual(limits['interactive'], ADMISSION_DEFAULTS['interactive'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from services.artifact_cache import ArtifactCache
+
+class TestArtifactCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ArtifactCache(cache_dir=self.cache_dir, max_bytes=1000)
+        self.project = {'enquiry_number': 'EQ2601001', 'customer_name': 'SPT', 'fans': [{'fan_number': 1, 'costs': {'total_selling_price': 100}}]}
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_key_changes_with_project_and_template(self):
+        """Any change to the fans or the template version yields a new key"""
+        key = ArtifactCache.make_key(self.project, 'quote_pdf', 1)
+        self.assertEqual(key, ArtifactCache.make_key(dict(self.project), 'quote_pdf', 1))
+        self.assertNotEqual(key, ArtifactCache.make_key(self.project, 'quote_pdf', 2))
+
+        edited = dict(self.project, fans=[{'fan_number': 1, 'costs': {'total_selling_price': 120}}])
+        self.assertNotEqual(key, ArtifactCache.make_key(edited, 'quote_pdf', 1))
+
+    def test_get_or_build_only_builds_once(self):
+        calls = []
+        def builder():
+            calls.append(1)
+            return b'%PDF-data'
+
+        key = ArtifactCache.make_key(self.project, 'quote_pdf', 1)
+        self.assertEqual(self.cache.get_or_build('EQ2601001', key, 'pdf', builder), b'%PDF-data')
+        self.assertEqual(self.cache.get_or_build('EQ2601001', key, 'pdf', builder), b'%PDF-data')
+        self.assertEqual(len(calls), 1)
+        self.assertFalse([n for n in os.listdir(self.cache_dir) if n.startswith('.tmp-')])
+
+    def test_invalidate_project(self):
+        """Invalidation only touches the given enquiry"""
+        self.cache.put('EQ2601001', 'a' * 64, 'pdf', b'one')
+        self.cache.put('EQ2601001', 'b' * 64, 'xlsx', b'two')
+        self.cache.put('EQ2601002', 'c' * 64, 'pdf', b'three')
+
+        self.assertEqual(self.cache.invalidate_project('EQ2601001'), 2)
+        self.assertIsNone(self.cache.get('EQ2601001', 'a' * 64, 'pdf'))
+        self.assertEqual(self.cache.get('EQ2601002', 'c' * 64, 'pdf'), b'three')
+
+    def test_lru_eviction(self):
+        """Least recently used files go first once the size cap is exceeded"""
+        self.cache.put('A', 'a' * 64, 'pdf', b'x' * 400)
+        self.cache.put('B', 'b' * 64, 'pdf', b'x' * 400)
+        past = time.time() - 60
+        os.utime(self.cache._path('B', 'b' * 64, 'pdf'), (past, past))
+        os.utime(self.cache._path('A', 'a' * 64, 'pdf'), (past + 1, past + 1))
+
+        self.cache.put('C', 'c' * 64, 'pdf', b'x' * 400)
+
+        self.assertIsNone(self.cache.get('B', 'b' * 64, 'pdf'))
+        self.assertIsNotNone(self.cache.get('A', 'a' * 64, 'pdf'))
+        self.assertIsNotNone(self.cache.get('C', 'c' * 64, 'pdf'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from synthetic import generate
+from compare import compare
+
+class TestSyntheticData(unittest.TestCase):
+    def _dump(self, directory):
+        conn = sqlite3.connect(os.path.join(directory, 'data', 'fan_pricing.db'))
+        try:
+            return {table: conn.execute(f'SELECT * FROM {table} ORDER BY id').fetchall()
+                    for table in ('Customers', 'EnquiryRegister', 'Orders', 'Projects', 'Fans')}
+        finally:
+            conn.close()
+
+    def test_same_seed_gives_same_rows(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            rows = generate(a, 0.1, seed=3, register=False)
+            generate(b, 0.1, seed=3, register=False)
+            first, second = self._dump(a), self._dump(b)
+        self.assertEqual(first, second)
+        self.assertEqual(len(first['Orders']), rows['Orders'])
+        # Every enquiry and order points at a generated customer
+        customer_ids = {row[0] for row in first['Customers']}
+        self.assertTrue(all(row[8] in customer_ids for row in first['EnquiryRegister']))
+
+class TestCompare(unittest.TestCase):
+    def test_regressions_need_both_ratio_and_absolute_change(self):
+        before = {'scales': {'1': {'benchmarks': {'slow': {'median': 0.100}, 'tiny': {'median': 0.0002}}}}}
+        after = {'scales': {'1': {'benchmarks': {'slow': {'median': 0.150}, 'tiny': {'median': 0.0006}}}}}
+        rows = {row[1]: row for row in compare(before, after, threshold=0.2, min_ms=1.0)}
+        self.assertTrue(rows['slow'][5])
+        self.assertFalse(rows['tiny'][5])
+
+if __name__ == '__main__':
+    unittest.main()
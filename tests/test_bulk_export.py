@@ -0,0 +1,76 @@
+import os
+import sys
+import signal
+import tempfile
+import unittest
+import subprocess
+from unittest import mock
+from flask import Flask
+from routes import register_routes
+from services import bulk_export
+from services.bulk_export import BulkExport
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+class TestBulkExportSlots(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.lock_dir = mock.patch.object(bulk_export, 'BULK_EXPORT_LOCK_DIR', self.tmp.name)
+        self.lock_dir.start()
+
+    def tearDown(self):
+        self.lock_dir.stop()
+        self.tmp.cleanup()
+
+    def _client(self):
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        register_routes(app)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = 1
+        return client
+
+    def test_route_refuses_while_a_stream_is_open_and_frees_the_slot_on_close(self):
+        def stream(export):
+            # Unlike BulkExport.stream this never closes the export, so only the response can
+            yield b'PK'
+            yield b'rest'
+
+        client = self._client()
+        with mock.patch('database.get_projects_with_fans', return_value=[{'enquiry_number': 'E-1'}]), \
+                mock.patch.object(BulkExport, 'stream', stream):
+            streaming = client.get('/api/exports/bulk', buffered=False)
+            self.assertEqual(streaming.status_code, 200)
+
+            refused = client.get('/api/exports/bulk')
+            self.assertEqual(refused.status_code, 429)
+            self.assertEqual(refused.headers['Retry-After'], '30')
+
+            streaming.close()
+            self.assertEqual(client.get('/api/exports/bulk').get_data(), b'PKrest')
+
+    def test_slot_is_shared_with_other_processes(self):
+        holder = subprocess.Popen([sys.executable, '-c', (
+            'import sys\n'
+            'from services import bulk_export\n'
+            'bulk_export.BULK_EXPORT_LOCK_DIR = sys.argv[1]\n'
+            'export = bulk_export.BulkExport.try_start([])\n'
+            'print("holding" if export else "refused", flush=True)\n'
+            'sys.stdin.read()\n'
+        ), self.tmp.name], cwd=ROOT, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        try:
+            self.assertEqual(holder.stdout.readline().strip(), 'holding')
+            self.assertIsNone(BulkExport.try_start([]))
+        finally:
+            # A worker killed mid-export must not keep the slot
+            holder.send_signal(signal.SIGKILL)
+            holder.wait(5)
+            holder.stdin.close()
+            holder.stdout.close()
+        export = BulkExport.try_start([])
+        self.assertIsNotNone(export)
+        export.close()
+
+if __name__ == '__main__':
+    unittest.main()
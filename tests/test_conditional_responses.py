@@ -0,0 +1,124 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from database import get_db_connection, migrate_to_unified_schema
+from routes import register_routes
+
+SOURCE_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'fan_pricing.db')
+
+class TestConditionalResponses(unittest.TestCase):
+    """Read APIs answer a repeated request with 304 until the data behind them changes."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        shutil.copy(SOURCE_DB, os.path.join(self.tmp.name, 'fan_pricing.db'))
+        self.env = mock.patch.dict(os.environ, {'DB_PATH': self.tmp.name})
+        self.env.start()
+        self.assertTrue(migrate_to_unified_schema())
+
+        app = Flask(__name__)
+        app.secret_key = 'test'
+        register_routes(app)
+        self.client = app.test_client()
+        with self.client.session_transaction() as session:
+            session['user_id'] = 1
+
+        conn = get_db_connection()
+        self.enquiry, self.project_id = conn.execute('''
+            SELECT p.enquiry_number, p.id FROM Projects p WHERE EXISTS (SELECT 1 FROM Fans f WHERE f.project_id = p.id)
+        ''').fetchone()
+        self.customer_id = conn.execute('''
+            SELECT c.id FROM Customers c WHERE EXISTS (SELECT 1 FROM Orders o WHERE o.customer_id = c.id)
+        ''').fetchone()[0]
+        self.fan_model = conn.execute('SELECT "Fan Model" FROM FanWeights LIMIT 1').fetchone()[0]
+        conn.close()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def _execute(self, sql, params=()):
+        conn = get_db_connection()
+        conn.execute(sql, params)
+        conn.commit()
+        conn.close()
+
+    def _revalidate(self, path):
+        """(ETag of the first response, status of a conditional repeat)."""
+        first = self.client.get(path)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        self.assertFalse(first.headers['ETag'].startswith('W/'))
+        repeat = self.client.get(path, headers={'If-None-Match': etag})
+        return etag, repeat
+
+    def test_unchanged_resources_are_not_rebuilt(self):
+        paths = [
+            f'/api/projects/{self.enquiry}',
+            f'/api/customers/{self.customer_id}',
+            '/api/dashboard_stats',
+            '/api/combined-enquiries',
+            f'/api/options/sizes/{self.fan_model}'
+        ]
+        for path in paths:
+            with self.subTest(path=path):
+                etag, repeat = self._revalidate(path)
+                self.assertEqual(repeat.status_code, 304)
+                self.assertEqual(repeat.data, b'')
+                self.assertEqual(repeat.headers['ETag'], etag)
+
+        etag = self.client.get(f'/api/projects/{self.enquiry}').headers['ETag']
+        with mock.patch('database.get_project', side_effect=AssertionError('rebuilt')):
+            repeat = self.client.get(f'/api/projects/{self.enquiry}', headers={'If-None-Match': etag})
+            self.assertEqual(repeat.status_code, 304)
+
+    def test_fan_change_invalidates_project_and_sales_views(self):
+        tags = {path: self._revalidate(path)[0] for path in (f'/api/projects/{self.enquiry}', '/api/dashboard_stats', '/api/combined-enquiries')}
+        self._execute("UPDATE Fans SET specifications = specifications WHERE project_id = ?", (self.project_id,))
+        for path, etag in tags.items():
+            with self.subTest(path=path):
+                response = self.client.get(path, headers={'If-None-Match': etag})
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_order_change_invalidates_customer(self):
+        path = f'/api/customers/{self.customer_id}'
+        etag, _ = self._revalidate(path)
+        self._execute("UPDATE Orders SET order_value = order_value + 1 WHERE customer_id = ?", (self.customer_id,))
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_register_reimport_invalidates_customer(self):
+        # The imports upsert, which turns OR IGNORE inside the triggers into ABORT
+        import pandas as pd
+        from database import apply_orders, apply_enquiries, ORDER_COLUMN_MAP, ENQUIRY_COLUMN_MAP
+        conn = get_db_connection()
+        orders = pd.read_sql_query(f"SELECT {', '.join(ORDER_COLUMN_MAP.values())} FROM Orders WHERE customer_id IS NOT NULL", conn)
+        enquiries = pd.read_sql_query(
+            f"SELECT {', '.join(set(ENQUIRY_COLUMN_MAP.values()) | {'month'})} FROM EnquiryRegister WHERE customer_id IS NOT NULL", conn)
+        conn.close()
+        self.assertGreater(len(orders), 1)
+        self.assertGreater(len(enquiries), 1)
+
+        path = f'/api/customers/{self.customer_id}'
+        etag, _ = self._revalidate(path)
+        for _ in range(2):
+            self.assertEqual(apply_orders(orders.copy()), len(orders))
+            self.assertEqual(apply_enquiries(enquiries.copy()), len(enquiries))
+        response = self.client.get(path, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_missing_resources_carry_no_etag(self):
+        for path in ('/api/projects/NO-SUCH-ENQUIRY', '/api/customers/999999999'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 404)
+                self.assertNotIn('ETag', response.headers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import sqlite3
+import unittest
+from services.customer_matcher import CustomerMatchIndex, find_best_match
+from scripts.run_customer_matcher import load_alias_lookup
+
+CUSTOMERS = [
+    {'id': 1, 'primary_name': 'Acme Engineering Limited'},
+    {'id': 2, 'primary_name': 'ACME Engineering'},
+    {'id': 3, 'primary_name': 'Blue Star Limited'},
+    {'id': 4, 'primary_name': 'Bluestar Ltd'},
+    {'id': 5, 'primary_name': 'Voltas'},
+    {'id': 6, 'primary_name': 'ab'},
+]
+
+class TestCustomerMatchIndex(unittest.TestCase):
+    def test_matches_linear_scan(self):
+        index = CustomerMatchIndex(CUSTOMERS)
+        targets = ['acme engineering', 'Acme Enginering Co.', 'Blue Star', 'Blue-Star Industries',
+                   'Voltas Limited', 'Voltaz', 'Thermax', 'ab', '', None]
+        for threshold in (0.85, 0.88):
+            for target in targets:
+                expected = find_best_match(target, CUSTOMERS, threshold)
+                result = index.find_best_match(target, threshold)
+                self.assertEqual(result[0], expected[0], (target, threshold))
+                if expected[0] is not None:
+                    self.assertEqual(result[1], expected[1])
+
+    def test_exact_match_prefers_first_customer(self):
+        index = CustomerMatchIndex(CUSTOMERS)
+        self.assertEqual(index.find_best_match('Acme Engineering Ltd'), (1, 1.0))
+
+    def test_added_customers_are_matched(self):
+        index = CustomerMatchIndex(CUSTOMERS)
+        self.assertEqual(index.find_best_match('Kirloskar Brothers', 0.88)[0], None)
+        index.add(7, 'Kirloskar Brothers Ltd')
+        self.assertEqual(index.find_best_match('Kirloskar Brother', 0.88)[0], 7)
+
+    def test_exact_hits_skip_scoring(self):
+        index = CustomerMatchIndex(CUSTOMERS)
+        index.find_best_match('Voltas Ltd')
+        index.find_best_match('Voltass')
+        self.assertEqual((index.stats['lookups'], index.stats['exact'], index.stats['scored']), (2, 1, 1))
+
+class TestAliasLookup(unittest.TestCase):
+    def test_ambiguous_cleaned_aliases_are_dropped(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE Customers (id INTEGER PRIMARY KEY, primary_name TEXT)')
+        conn.execute('CREATE TABLE CustomerAliases (customer_id INTEGER, alias_name TEXT)')
+        conn.executemany('INSERT INTO Customers VALUES (?, ?)', [(1, 'Blue Star'), (2, 'Voltas')])
+        conn.executemany('INSERT INTO CustomerAliases VALUES (?, ?)',
+                         [(1, 'Blue Star Ltd'), (1, 'BLUE STAR'), (2, 'Voltas'), (2, 'Voltas Ltd.'), (1, 'Voltas Limited'), (3, 'Gone Ltd')])
+        raw, cleaned = load_alias_lookup(conn.cursor())
+        self.assertEqual(raw['Voltas Limited'], 1)
+        self.assertNotIn('Gone Ltd', raw)
+        self.assertEqual(cleaned, {'blue star': 1})
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,7 +22,7 @@ class TestFanCalculations(unittest.TestCase):
         }
         selected_accessories = []
         
-        bare_weight, isolators, shaft_dia, total_weight, error = calculate_fan_weight(
+        bare_weight, isolators, shaft_dia, total_weight, error, accessory_weights = calculate_fan_weight(
             self.cursor, fan_data, selected_accessories
         )
         
@@ -32,13 +32,14 @@ class TestFanCalculations(unittest.TestCase):
 
         # Test with accessories
         selected_accessories = ['Isolation Base Frame', 'Inlet Companion Flange']
-        bare_weight, isolators, shaft_dia, total_weight, error = calculate_fan_weight(
+        bare_weight, isolators, shaft_dia, total_weight, error, accessory_weights = calculate_fan_weight(
             self.cursor, fan_data, selected_accessories
         )
         
         self.assertIsNone(error)
         self.assertEqual(bare_weight, 355)
         self.assertEqual(total_weight, 415)  # 355 + 48 + 12
+        self.assertEqual(accessory_weights, {'Isolation Base Frame': 48, 'Inlet Companion Flange': 12})
 
     def test_invalid_fan_model(self):
         """Test error handling for invalid fan model"""
@@ -50,12 +51,12 @@ class TestFanCalculations(unittest.TestCase):
         }
         selected_accessories = []
         
-        bare_weight, isolators, shaft_dia, total_weight, error = calculate_fan_weight(
+        bare_weight, isolators, shaft_dia, total_weight, error, accessory_weights = calculate_fan_weight(
             self.cursor, fan_data, selected_accessories
         )
         
         self.assertIsNotNone(error)
-        self.assertEqual(error, "No matching fan model found")
+        self.assertTrue(error.startswith("Fan weight data not found for Model='INVALID'"))
 
     def test_fabrication_cost(self):
         """Test fabrication cost calculation"""
@@ -65,10 +66,11 @@ class TestFanCalculations(unittest.TestCase):
         }
         total_weight = 355
         
-        cost, error = calculate_fabrication_cost(self.cursor, fan_data, total_weight)
+        cost, weight, custom_weights, rate, error = calculate_fabrication_cost(self.cursor, fan_data, total_weight)
         
         self.assertIsNone(error)
         self.assertEqual(cost, 74550)  # 355 * 210 (MS price for TCF Factory)
+        self.assertEqual(rate, 210)
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,35 @@
+import sqlite3
+import unittest
+from services.forecast import compute_win_rates, forecast_pipeline
+
+class TestForecast(unittest.TestCase):
+    def test_win_rates_are_shrunk_toward_broader_rates(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE Orders (sales_engineer TEXT, region TEXT)')
+        conn.execute('CREATE TABLE EnquiryRegister (sales_engineer TEXT, region TEXT)')
+        conn.executemany('INSERT INTO EnquiryRegister VALUES (?, ?)', [('NEM', 'South')] * 80 + [('NEM', 'West')] * 20)
+        conn.executemany('INSERT INTO Orders VALUES (?, ?)', [('NEM', 'South')] * 20 + [('NEM', 'West')] * 20)
+        rates = compute_win_rates(conn.cursor())
+        conn.close()
+        self.assertAlmostEqual(rates['overall'], 0.4)
+        self.assertAlmostEqual(rates['engineer']['NEM'], 0.4)
+        self.assertAlmostEqual(rates['engineer_region'][('NEM', 'South')], (20 + 20 * 0.4) / 100)
+        self.assertLess(rates['engineer_region'][('NEM', 'West')], 1.0)
+
+    def test_forecast_percentiles(self):
+        rates = {'overall': 0.5, 'engineer': {}, 'engineer_region': {}}
+        projects = [
+            {'value': 100.0, 'probability': 1.0, 'month': '2026-01', 'sales_engineer': 'NEM', 'region': ''},
+            {'value': 50.0, 'probability': 0.0, 'month': '2026-02', 'sales_engineer': 'PVN', 'region': ''}
+        ]
+        result = forecast_pipeline(projects, rates, draws=20000, seed=1)
+        # Blended with the 50% history: 0.75 and 0.25
+        self.assertEqual(result['expected'], 87.5)
+        self.assertEqual(result['total'], {'p10': 0.0, 'p50': 100.0, 'p90': 150.0})
+        self.assertEqual([m['month'] for m in result['by_month']], ['2026-01', '2026-02'])
+        self.assertEqual(result['by_engineer'][1], {'sales_engineer': 'PVN', 'projects': 1, 'expected': 12.5,
+                                                    'p10': 0.0, 'p50': 0.0, 'p90': 50.0})
+        self.assertEqual(forecast_pipeline([], rates)['projects'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import sys
+import logging
+import unittest
+from flask import Flask
+from routes import register_routes
+from database import get_db_connection
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from golden_master import generate_forms, legacy_engine, legacy_result, run, COMPARED_FIELDS
+
+class TestGoldenMaster(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.ERROR)
+        self.conn = get_db_connection()
+        self.forms = generate_forms(self.conn, 150, seed=7)
+
+    def tearDown(self):
+        self.conn.close()
+        logging.disable(logging.NOTSET)
+
+    def test_legacy_path_matches_the_route(self):
+        app = Flask(__name__)
+        register_routes(app)
+        client = app.test_client()
+        cursor = self.conn.cursor()
+        for form in self.forms:
+            expected = legacy_result(cursor, form)
+            response = client.post('/calculate_fan', json=form)
+            if 'error' in expected:
+                self.assertEqual(response.status_code, 400)
+                continue
+            served = response.get_json()
+            served.update(served['weights'])
+            for field in COMPARED_FIELDS:
+                self.assertEqual(served[field], expected[field], field)
+
+    def test_mismatches_beyond_tolerance_are_reported(self):
+        def off_by_a_rupee(conn):
+            legacy = legacy_engine(conn)
+            def price(forms):
+                results = legacy(forms)
+                for result in results:
+                    if 'error' not in result and result['bearing_price']:
+                        result['bearing_price'] += 1
+                return results
+            return price
+
+        report = run(self.conn, self.forms, {'off': off_by_a_rupee, 'same': legacy_engine}, tolerance=0.01)
+        self.assertEqual(report['same']['mismatches'], [])
+        mismatches = report['off']['mismatches']
+        self.assertTrue(mismatches)
+        self.assertTrue(all(field == 'bearing_price' for _, diffs in mismatches for field, _, _ in diffs))
+
+if __name__ == '__main__':
+    unittest.main()
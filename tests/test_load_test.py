@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from load_test import load_replay, summarize
+
+class TestLoadTest(unittest.TestCase):
+    def test_replay_keeps_only_requests(self):
+        lines = [
+            {'offset': 0.5, 'method': 'PUT', 'path': '/api/projects/E1/fans/1', 'json': {'motor': {}}},
+            {'request_id': 'user-001', 'title': 'Not a request', 'body': '...'},
+            {'path': 'relative/path'},
+            {'path': '/api/dashboard_stats'}
+        ]
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as f:
+            f.write('\n'.join(json.dumps(line) for line in lines) + '\nnot json\n\n')
+        try:
+            entries, skipped = load_replay(f.name)
+        finally:
+            os.unlink(f.name)
+        self.assertEqual([entry['path'] for entry in entries], ['/api/projects/E1/fans/1', '/api/dashboard_stats'])
+        self.assertEqual(skipped, 3)
+
+    def test_summary(self):
+        samples = [{'seconds': i / 1000, 'status': 200, 'locked': False, 'error': None} for i in range(1, 101)]
+        samples.append({'seconds': 5.0, 'status': 500, 'locked': True, 'error': None})
+        samples.append({'seconds': 300.0, 'status': None, 'locked': False, 'error': 'ReadTimeout'})
+        summary = summarize(samples, 10.0)
+        self.assertEqual(summary['requests'], 102)
+        self.assertAlmostEqual(summary['per_second'], 10.2)
+        self.assertEqual((summary['errors'], summary['failed_to_complete'], summary['database_locked']), (2, 1, 1))
+        # Requests that never completed have no latency
+        self.assertAlmostEqual(summary['p50_ms'], 51)
+        self.assertAlmostEqual(summary['max_ms'], 5000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import io
+import logging
+import unittest
+from unittest import mock
+from logging.handlers import QueueHandler
+from services import logging_config
+from services.logging_config import parse_levels, log_payload
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+class _Exploding:
+    def __str__(self):
+        raise AssertionError("payload formatted")
+
+class TestLoggingConfig(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('tests.logging_config')
+        self.logger.propagate = False
+        self.records = _Records()
+        self.logger.addHandler(self.records)
+        logging_config._limits.clear()
+
+    def tearDown(self):
+        self.logger.removeHandler(self.records)
+        self.logger.setLevel(logging.NOTSET)
+        logging_config._limits.clear()
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels(' calculations=debug, services.query_trace=WARNING,bad,x=LOUD,'),
+                         {'calculations': 'DEBUG', 'services.query_trace': 'WARNING'})
+
+    def test_payload_is_not_formatted_below_debug(self):
+        self.logger.setLevel(logging.INFO)
+        log_payload(self.logger, "Received data: %s", _Exploding())
+        self.assertEqual(self.records.messages, [])
+
+    def test_payload_is_rate_limited_per_call_site(self):
+        self.logger.setLevel(logging.DEBUG)
+        with mock.patch.object(logging_config, 'LOG_PAYLOAD_PER_MINUTE', 2), \
+                mock.patch.object(logging_config.time, 'monotonic', return_value=60.0) as clock:
+            for i in range(5):
+                log_payload(self.logger, "Received data: %s", i)
+            log_payload(self.logger, "Calculation response: %s", 'r')
+            clock.return_value = 120.0
+            log_payload(self.logger, "Received data: %s", 5)
+        self.assertEqual(self.records.messages, ['Received data: 0', 'Received data: 1', 'Calculation response: r',
+                                                 'Received data: 5 (3 similar suppressed)'])
+
+    def test_records_go_through_the_queue(self):
+        root = logging.getLogger()
+        saved = root.handlers[:], root.level, logging_config._configured_pid
+        output = io.StringIO()
+        root.addHandler(logging.StreamHandler(output))
+        try:
+            logging_config._configured_pid = None
+            with mock.patch.object(logging_config, 'LOG_LEVELS', 'tests_queue.child=ERROR'), \
+                    mock.patch.object(logging_config, 'LOG_FORMAT', '%(name)s %(message)s'), \
+                    mock.patch('sys.stderr', output):
+                logging_config.configure_logging()
+            self.assertTrue(any(isinstance(h, QueueHandler) for h in root.handlers))
+            self.assertFalse(any(type(h) is logging.StreamHandler for h in root.handlers))
+            logging.getLogger('tests_queue.other').info("queued")
+            logging.getLogger('tests_queue.child').warning("filtered")
+            logging_config.stop_logging()
+        finally:
+            root.handlers[:] = saved[0]
+            root.setLevel(saved[1])
+            logging_config._configured_pid = saved[2]
+            logging.getLogger('tests_queue.child').setLevel(logging.NOTSET)
+        self.assertEqual(output.getvalue(), 'tests_queue.other queued\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+import tracemalloc
+from unittest import mock
+from flask import Flask
+from services import metrics, memory_tracking
+from services.metrics import MetricsRegistry
+
+class TestMemoryTracking(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original = metrics.registry
+        metrics.registry = MetricsRegistry(os.path.join(self.tmp.name, 'metrics.db'))
+        memory_tracking._endpoint_stats.clear()
+
+    def tearDown(self):
+        tracemalloc.stop()
+        memory_tracking._endpoint_stats.clear()
+        memory_tracking._state.update(baseline=None, baseline_at=None, requests=0)
+        metrics.registry = self.original
+        self.tmp.cleanup()
+
+    def test_off_by_default_adds_no_hooks(self):
+        app = Flask(__name__)
+        with mock.patch.object(memory_tracking, 'MEMORY_TRACKING', False):
+            memory_tracking.init_memory_tracking(app)
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(app.before_request_funcs, {})
+
+    def test_request_allocations_are_recorded(self):
+        app = Flask(__name__)
+        with mock.patch.object(memory_tracking, 'MEMORY_TRACKING', True):
+            memory_tracking.init_memory_tracking(app)
+
+        kept = []
+
+        @app.route('/grow')
+        def grow():
+            scratch = [bytes(1024) for _ in range(2000)]
+            kept.append(bytes(512 * 1024))
+            return str(len(scratch))
+
+        client = app.test_client()
+        client.get('/grow')
+        memory_tracking.reset_baseline()
+        client.get('/grow')
+
+        report = memory_tracking.memory_report()
+        self.assertTrue(report['enabled'])
+        row = next(r for r in report['endpoints'] if r['endpoint'] == 'grow')
+        self.assertEqual(row['requests'], 2)
+        # ~2 MiB of scratch lists at the peak, 512 KiB kept per request
+        self.assertGreater(row['max_peak'], 2 * 1024 * 1024)
+        self.assertGreater(row['retained'], 2 * 512 * 1024)
+        self.assertTrue(report['growth_sites'])
+
+        text = metrics.registry.render()
+        self.assertIn('tcf_request_alloc_peak_bytes_count{endpoint="grow"} 2', text)
+        self.assertIn('tcf_worker_rss_bytes_count 2', text)
+
+    def test_shrinking_requests_never_lower_a_counter(self):
+        memory_tracking.record_request('grow', 4096, 3000, 8192, 10 ** 8)
+        memory_tracking.record_request('grow', 4096, -1000, -4096, 10 ** 8)
+        text = metrics.registry.render()
+        self.assertIn('tcf_request_retained_grown_bytes_total{endpoint="grow"} 3000', text)
+        self.assertIn('tcf_request_retained_freed_bytes_total{endpoint="grow"} 1000', text)
+        self.assertIn('tcf_request_rss_grown_bytes_total{endpoint="grow"} 8192', text)
+        self.assertIn('tcf_request_rss_shrunk_bytes_total{endpoint="grow"} 4096', text)
+        # The admin page keeps the net figures
+        row = memory_tracking.memory_report()['endpoints'][0]
+        self.assertEqual((row['retained'], row['rss_growth']), (2000, 4096))
+
+if __name__ == '__main__':
+    unittest.main()
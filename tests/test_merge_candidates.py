@@ -0,0 +1,44 @@
+import sqlite3
+import unittest
+from services.merge_candidates import (ensure_merge_candidate_schema, refresh_merge_candidates,
+                                       get_merge_candidates, dismiss_merge_candidate)
+
+class TestMergeCandidates(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.cursor = self.conn.cursor()
+        self.cursor.execute('CREATE TABLE Customers (id INTEGER PRIMARY KEY AUTOINCREMENT, primary_name TEXT NOT NULL UNIQUE)')
+        self.cursor.executemany('INSERT INTO Customers (primary_name) VALUES (?)',
+                                [('Blue Star Limited',), ('Bluestar Ltd',), ('Voltas',)])
+        ensure_merge_candidate_schema(self.cursor)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def pairs(self):
+        refresh_merge_candidates(self.cursor)
+        return [(s['primary_customer']['id'], s['secondary_customer']['id'])
+                for s in get_merge_candidates(self.cursor)]
+
+    def test_existing_customers_are_compared_on_first_refresh(self):
+        self.assertEqual(self.pairs(), [(2, 1)])
+
+    def test_new_and_renamed_customers_are_refreshed(self):
+        self.pairs()
+        self.cursor.execute("INSERT INTO Customers (primary_name) VALUES ('Voltaas')")
+        self.cursor.execute("UPDATE Customers SET primary_name = 'Thermax' WHERE id = 2")
+        self.assertEqual(self.pairs(), [(4, 3)])
+
+    def test_dismissed_pairs_stay_dismissed(self):
+        self.pairs()
+        self.assertTrue(dismiss_merge_candidate(self.cursor, 1, 2))
+        self.cursor.execute("UPDATE Customers SET primary_name = 'Blue Star Ltd.' WHERE id = 1")
+        self.assertEqual(self.pairs(), [])
+
+    def test_deleted_customers_drop_their_pairs(self):
+        self.pairs()
+        self.cursor.execute('DELETE FROM Customers WHERE id = 1')
+        self.assertEqual(self.pairs(), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from flask import Flask
+from services import metrics
+from services.metrics import MetricsRegistry, InstrumentedConnection, init_metrics
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'metrics.db')
+        self.original = metrics.registry
+        metrics.registry = MetricsRegistry(self.path)
+
+    def tearDown(self):
+        metrics.registry = self.original
+        self.tmp.cleanup()
+
+    def test_workers_aggregate_in_shared_file(self):
+        other = MetricsRegistry(self.path)
+        for registry in (metrics.registry, other):
+            registry.inc('tcf_http_requests_total', {'endpoint': 'index', 'method': 'GET', 'status': 200})
+            registry.observe('tcf_db_connect_seconds', {}, 0.002, metrics.CONNECT_BUCKETS)
+        other.flush()
+        text = metrics.registry.render()
+        self.assertIn('tcf_http_requests_total{endpoint="index",method="GET",status="200"} 2', text)
+        self.assertIn('tcf_db_connect_seconds_bucket{le="0.001"} 0', text)
+        self.assertIn('tcf_db_connect_seconds_bucket{le="0.0025"} 2', text)
+        self.assertIn('tcf_db_connect_seconds_count 2', text)
+
+    def test_request_sql_is_counted(self):
+        app = Flask(__name__)
+        init_metrics(app)
+
+        @app.route('/items')
+        def items():
+            conn = sqlite3.connect(':memory:', factory=InstrumentedConnection)
+            conn.execute('CREATE TABLE t (x)')
+            cursor = conn.cursor()
+            cursor.executemany('INSERT INTO t VALUES (?)', [(1,), (2,)])
+            cursor.execute('SELECT x FROM t')
+            rows = cursor.fetchall()
+            conn.close()
+            return str(len(rows))
+
+        client = app.test_client()
+        self.assertEqual(client.get('/items').data, b'2')
+        text = client.get('/metrics').data.decode()
+        self.assertIn('tcf_sql_statements_per_request_sum{endpoint="items"} 3', text)
+        self.assertIn('tcf_http_response_bytes_total{endpoint="items"} 1', text)
+        self.assertIn('tcf_http_request_duration_seconds_count{endpoint="items",method="GET"} 1', text)
+
+    def test_gauges_are_per_worker_values(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute('CREATE TABLE Metrics (name TEXT NOT NULL, labels TEXT NOT NULL, le TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, labels, le)) WITHOUT ROWID')
+        conn.execute("INSERT INTO Metrics VALUES ('tcf_admission_in_flight', 'class=\"analytics\"', '', 3)")
+        conn.commit()
+        conn.close()
+
+        registry = metrics.registry
+        registry.set_gauge('tcf_admission_in_flight', {'class': 'analytics'}, 2)
+        registry.set_gauge('tcf_admission_in_flight', {'class': 'analytics'}, 1)
+        self.assertIn('tcf_admission_in_flight{class="analytics"} 1', registry.render())
+        registry.forget_worker(os.getpid())
+        self.assertNotIn('tcf_admission_in_flight{class="analytics"}', registry.render())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sqlite3
+import unittest
+from datetime import date
+from services.order_cadence import order_period, ensure_order_cadence_schema, refresh_order_cadence
+
+class TestOrderCadence(unittest.TestCase):
+    def test_order_period_formats(self):
+        self.assertEqual(order_period('2024.0', 'Jul'), date(2024, 7, 1))
+        self.assertEqual(order_period('2024-25', 'September'), date(2024, 9, 1))
+        self.assertEqual(order_period(2023, '03'), date(2023, 3, 1))
+        self.assertEqual(order_period(None, 'Jan-26'), date(2026, 1, 1))
+        self.assertIsNone(order_period('2024', 'Q3'))
+        self.assertIsNone(order_period(None, 'Jul'))
+
+    def test_orders_queue_incremental_refresh(self):
+        conn = sqlite3.connect(':memory:')
+        cursor = conn.cursor()
+        cursor.execute('CREATE TABLE Orders (id INTEGER PRIMARY KEY, customer_name TEXT, year TEXT, month TEXT)')
+        cursor.executemany('INSERT INTO Orders (customer_name, year, month) VALUES (?, ?, ?)',
+                           [('Acme ', '2024', 'Jan'), ('ACME', '2024', 'Mar'), ('Voltas', '2024', 'Feb')])
+        ensure_order_cadence_schema(cursor)
+        self.assertEqual(refresh_order_cadence(cursor), 2)
+
+        cursor.execute("INSERT INTO Orders (customer_name, year, month) VALUES ('acme', '2024', 'Feb')")
+        self.assertEqual(refresh_order_cadence(cursor), 1)
+        cursor.execute("SELECT order_count, first_period, last_period, mean_interval_days FROM CustomerOrderCadence WHERE customer_key = 'ACME'")
+        self.assertEqual(cursor.fetchone(), (3, '2024-01-01', '2024-03-01', 30.0))
+
+        cursor.execute("DELETE FROM Orders WHERE customer_name = 'Voltas'")
+        refresh_order_cadence(cursor)
+        cursor.execute('SELECT customer_key FROM CustomerOrderCadence')
+        self.assertEqual(cursor.fetchall(), [('ACME',)])
+        conn.close()
+
+    def test_upserts_can_queue_a_key_twice(self):
+        conn = sqlite3.connect(':memory:')
+        cursor = conn.cursor()
+        cursor.execute('CREATE TABLE Orders (id INTEGER PRIMARY KEY, job_ref TEXT UNIQUE, customer_name TEXT, year TEXT, month TEXT)')
+        ensure_order_cadence_schema(cursor)
+        upsert = '''
+            INSERT INTO Orders (job_ref, customer_name, year, month) VALUES (?, 'Acme', '2024', ?)
+            ON CONFLICT(job_ref) DO UPDATE SET customer_name = excluded.customer_name, month = excluded.month
+        '''
+        cursor.executemany(upsert, [('J1', 'Jan'), ('J2', 'Feb'), ('J1', 'Mar')])
+        self.assertEqual(refresh_order_cadence(cursor), 1)
+        conn.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sqlite3
+import unittest
+from services.pivot import build_snapshot, pivot
+
+class TestPivot(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('''CREATE TABLE Orders (year, month, region, sales_engineer, sector, type_of_customer,
+                        customer_name, order_value, our_cost, contribution_value, qty)''')
+        conn.execute('CREATE TABLE EnquiryRegister (year, month, region, sales_engineer, customer_name)')
+        conn.execute('CREATE TABLE Projects (created_at, sales_engineer, status, customer_name, total_value, probability)')
+        conn.executemany('INSERT INTO Orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            ('2023.0', 'Jan', 'South', 'NEM', 'Pharma', 'EPC', 'Acme', 100, 75, 25, 1),
+            ('2024.0', 'Feb', 'South ', 'NEM', 'Pharma', 'EPC', 'Acme', 300, 200, 100, 2),
+            ('2024.0', 'Mar', 'West', 'PVN', 'Steel', 'End User', 'Tata', 200, 150, 50, 1)
+        ])
+        conn.executemany('INSERT INTO EnquiryRegister VALUES (?, ?, ?, ?, ?)', [
+            ('2024', 'February', 'South', 'NEM', 'Acme'), ('2024', 'March', 'South', 'NEM', 'Acme'),
+            ('2024', 'March', 'West', 'PVN', 'Tata'), ('2024', 'April', 'West', 'PVN', 'Tata')
+        ])
+        conn.executemany('INSERT INTO Projects VALUES (?, ?, ?, ?, ?, ?)', [
+            ('2025-03-18 10:00:00', 'NEM', None, 'Acme', 1000, None),
+            ('2025-04-02 10:00:00', 'NEM', 'Ordered', 'Acme', 500, 100)
+        ])
+        cls.frames = build_snapshot(conn)
+        conn.close()
+
+    def test_contribution_pct_by_sector_and_year(self):
+        result = pivot(self.frames, rows=['sector'], columns=['year'], measure='contribution_pct')
+        self.assertEqual(result['row_keys'], [['Pharma'], ['Steel']])
+        self.assertEqual(result['column_keys'], [['2023'], ['2024']])
+        self.assertEqual(result['values'], [[25, 33.3333], [None, 25]])
+        self.assertEqual(result['column_totals'], [25, 30])
+        self.assertEqual(result['total'], 29.1667)
+
+    def test_win_rate_and_filters(self):
+        result = pivot(self.frames, rows=['region', 'sales_engineer'], measure='win_rate', filters={'year': ['2024']})
+        self.assertEqual(result['row_keys'], [['South', 'NEM'], ['West', 'PVN']])
+        self.assertEqual(result['values'], [[50], [50]])
+        result = pivot(self.frames, measure='order_value', period_from='2024-01', period_to='2024-02')
+        self.assertEqual(result['total'], 300)
+        result = pivot(self.frames, columns=['status'], measure='weighted_value')
+        self.assertEqual(result['values'], [[500, 500]])
+        with self.assertRaises(ValueError):
+            pivot(self.frames, rows=['status'], measure='win_rate')
+
+if __name__ == '__main__':
+    unittest.main()
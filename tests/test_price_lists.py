@@ -0,0 +1,77 @@
+import io
+import sqlite3
+import unittest
+import pandas as pd
+from services.price_lists import ensure_price_list_schema, migrate_legacy_backups, parse_motor_price_workbook
+
+class TestPriceLists(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.cursor = self.conn.cursor()
+        columns = '"Brand" TEXT, "Motor kW" REAL, "Pole" INT, "Efficiency" TEXT, "Price" REAL'
+        for table, price in [('MotorPrices_backup_20250101_090000', 100),
+                             ('MotorPrices_backup', 200),
+                             ('MotorPrices_backup_20250601_090000', 200),
+                             ('MotorPrices_backup_20250701_090000', 300),
+                             ('MotorPrices', 300)]:
+            self.cursor.execute(f'CREATE TABLE "{table}" ({columns})')
+            self.cursor.execute(f'INSERT INTO "{table}" VALUES (\'ABB\', 0.75, 4, \'IE2\', ?)', (price,))
+        ensure_price_list_schema(self.cursor)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_backups_become_dated_versions(self):
+        """Each distinct snapshot is one version, effective from the backup before it"""
+        migrate_legacy_backups(self.cursor)
+
+        self.cursor.execute('''
+            SELECT p.effective_from, e."Price" FROM PriceListPublications p
+            JOIN MotorPriceEntries e ON e.version_id = p.version_id ORDER BY p.id
+        ''')
+        self.assertEqual(self.cursor.fetchall(), [
+            (None, 100.0),
+            ('2025-01-01 09:00:00', 200.0),
+            ('2025-06-01 09:00:00', 300.0)
+        ])
+        self.cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE 'MotorPrices%'")
+        self.assertEqual(self.cursor.fetchall(), [('MotorPrices',)])
+
+    def test_migration_runs_once(self):
+        migrate_legacy_backups(self.cursor)
+        migrate_legacy_backups(self.cursor)
+        self.cursor.execute('SELECT COUNT(*) FROM PriceListVersions')
+        self.assertEqual(self.cursor.fetchone()[0], 3)
+
+    def test_late_backups_are_staged(self):
+        """A backup found once versions exist was never live, so it is not marked published"""
+        migrate_legacy_backups(self.cursor)
+        self.cursor.execute('CREATE TABLE "MotorPrices_backup_20250801_090000" ("Brand" TEXT, "Motor kW" REAL, "Pole" INT, "Efficiency" TEXT, "Price" REAL)')
+        self.cursor.execute('''INSERT INTO "MotorPrices_backup_20250801_090000" VALUES ('ABB', 0.75, 4, 'IE2', 400)''')
+        migrate_legacy_backups(self.cursor)
+
+        self.cursor.execute('''
+            SELECT v.status, COUNT(p.id) FROM PriceListVersions v
+            LEFT JOIN PriceListPublications p ON p.version_id = v.id
+            WHERE v.source = 'migrated from MotorPrices_backup_20250801_090000' GROUP BY v.id
+        ''')
+        self.assertEqual(self.cursor.fetchall(), [('staged', 0)])
+
+    def test_parse_rejects_bad_and_duplicate_rows(self):
+        df = pd.DataFrame({
+            'Brand': ['ABB', 'ABB', 'ABB', 'Brand'],
+            'Motor kW': ['0.75', '0.75', '1.1', 'Motor kW'],
+            'Pole': ['4.0', '4', '4', 'Pole'],
+            'Efficiency': ['IE2', 'IE2', 'IE2', 'Efficiency'],
+            'Price': ['1,200', '1300', '-', 'Price']
+        })
+        buffer = io.BytesIO()
+        df.to_excel(buffer, index=False)
+        buffer.seek(0)
+
+        prices, rejected = parse_motor_price_workbook(buffer)
+        self.assertEqual(prices.values.tolist(), [['ABB', 0.75, 4, 'IE2', 1200.0]])
+        self.assertEqual(sorted(rejected['excel_row']), [3, 4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask, session
+from services.profiling import init_profiling, list_profiles, top_functions, compare_profiles
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {'PROFILE_DIR': self.tmp.name})
+        self.env.start()
+        app = Flask(__name__)
+        app.config['SECRET_KEY'] = 'test'
+        init_profiling(app)
+
+        @app.route('/work')
+        def work():
+            return str(sum(i * i for i in range(20000)))
+
+        @app.route('/login')
+        def login():
+            session['is_admin'] = 1
+            return 'ok'
+
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_only_flagged_admin_requests_are_profiled(self):
+        self.client.get('/work?_profile=1')
+        self.assertEqual(list_profiles(), [])
+        self.client.get('/login')
+        self.client.get('/work')
+        self.assertEqual(list_profiles(), [])
+        self.client.get('/work?_profile=1')
+        self.client.get('/work', headers={'X-Profile': '1'})
+        profiles = list_profiles()
+        self.assertEqual([p['endpoint'] for p in profiles], ['work', 'work'])
+
+        functions, total = top_functions(profiles[0]['name'])
+        self.assertTrue(any(f['function'].startswith('work (') for f in functions))
+        rows, _, _ = compare_profiles(profiles[0]['name'], profiles[1]['name'], sort='tottime')
+        self.assertTrue(rows)
+        with self.assertRaises(ValueError):
+            top_functions('../fan_pricing.db')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import sqlite3
+import unittest
+from database import _ensure_project_totals
+
+class TestProjectTotals(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.cursor = self.conn.cursor()
+        self.cursor.execute('CREATE TABLE Projects (id INTEGER PRIMARY KEY, enquiry_number TEXT, updated_at TIMESTAMP)')
+        self.cursor.execute('CREATE TABLE Fans (id INTEGER PRIMARY KEY, project_id INTEGER, costs TEXT)')
+        self.cursor.executemany('INSERT INTO Projects (id, enquiry_number) VALUES (?, ?)', [(1, 'E-1'), (2, 'E-2'), (3, 'E-3')])
+        self.cursor.executemany('INSERT INTO Fans (project_id, costs) VALUES (?, ?)', [
+            (1, json.dumps({'total_selling_price': 100.5})),
+            (1, json.dumps({'total_selling_price': 50})),
+            (1, 'not json'),
+            (2, json.dumps({'fabrication_cost': 10}))
+        ])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _totals(self):
+        return self.cursor.execute('SELECT id, total_value, priced_fan_count FROM Projects ORDER BY id').fetchall()
+
+    def test_existing_fans_are_backfilled_and_kept_in_step(self):
+        _ensure_project_totals(self.cursor)
+        self.assertEqual(self._totals(), [(1, 150.5, 2), (2, 0.0, 0), (3, 0.0, 0)])
+
+        self.cursor.execute("UPDATE Fans SET costs = ? WHERE project_id = 2", (json.dumps({'total_selling_price': 20}),))
+        self.cursor.execute("DELETE FROM Fans WHERE costs = 'not json'")
+        self.assertEqual(self._totals(), [(1, 150.5, 2), (2, 20.0, 1), (3, 0.0, 0)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from flask import Flask
+from services import metrics, query_trace
+from services.metrics import MetricsRegistry, InstrumentedConnection, init_metrics
+from services.query_trace import normalize_sql
+
+class TestQueryTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original = metrics.registry
+        metrics.registry = MetricsRegistry(os.path.join(self.tmp.name, 'metrics.db'))
+        self.conn = sqlite3.connect(':memory:', factory=InstrumentedConnection)
+        self.conn.execute('CREATE TABLE Fans (id INTEGER PRIMARY KEY, project_id INTEGER)')
+
+    def tearDown(self):
+        self.conn.close()
+        metrics.registry = self.original
+        self.tmp.cleanup()
+
+    def test_normalize_sql(self):
+        self.assertEqual(normalize_sql("SELECT * FROM Fans WHERE id IN (1, 2, 3) AND name = 'a''b'"),
+                         'SELECT * FROM Fans WHERE id IN (?+) AND name = ?')
+        self.assertEqual(normalize_sql('SELECT  x1\n FROM t2 WHERE id = ?'), 'SELECT x1 FROM t2 WHERE id = ?')
+
+    def test_repeated_statement_flagged_per_request(self):
+        app = Flask(__name__)
+        init_metrics(app)
+
+        @app.route('/fans')
+        def fans():
+            for project_id in range(25):
+                self.conn.execute(f'SELECT id FROM Fans WHERE project_id = {project_id}').fetchall()
+            return 'ok'
+
+        with self.assertLogs('services.query_trace', 'WARNING') as logs:
+            app.test_client().get('/fans')
+        self.assertIn('Possible N+1 on fans: 25x SELECT id FROM Fans WHERE project_id = ?', logs.output[0])
+
+    def test_slow_query_logged_with_plan(self):
+        with mock.patch.object(query_trace, 'SLOW_QUERY_MS', 0):
+            with self.assertLogs('services.query_trace', 'WARNING') as logs:
+                self.conn.execute('SELECT id FROM Fans WHERE project_id = ?', (1,))
+        self.assertIn('Slow query', logs.output[0])
+        self.assertIn('SCAN Fans', logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import sqlite3
+import unittest
+from services.rollups import ensure_rollup_schema, rebuild_rollups, query_rollups
+
+ORDER_COLUMNS = 'year, month, region, sales_engineer, sector, type_of_customer, qty, order_value, our_cost, contribution_value'
+
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        self.cursor = self.conn.cursor()
+        self.cursor.execute(f'CREATE TABLE Orders (id INTEGER PRIMARY KEY, job_ref TEXT UNIQUE, {ORDER_COLUMNS})')
+        self.cursor.execute('CREATE TABLE EnquiryRegister (id INTEGER PRIMARY KEY, year, month, region, sales_engineer)')
+        self.cursor.executemany(f'INSERT INTO Orders (job_ref, {ORDER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            ('J1', '2024', 'Jan', 'South', 'NEM', 'Pharma', 'EPC', 2, 100, 60, 40),
+            ('J2', '2024.0', 'July', 'South', 'NEM', 'Pharma', 'EPC', 1, 50, 30, 20),
+            ('J3', '2024-25', '7', 'West ', 'PVN', None, 'End User', 3, 200, 150, 50)
+        ])
+        ensure_rollup_schema(self.cursor)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _cube(self):
+        self.cursor.execute('SELECT * FROM MonthlyRollups ORDER BY 1, 2, 3, 4, 5, 6')
+        return self.cursor.fetchall()
+
+    def test_slice_and_dice(self):
+        rows = query_rollups(self.cursor, 'orders', group_by=['year', 'region'])
+        self.assertEqual([(r['year'], r['region'], r['record_count'], r['order_value']) for r in rows],
+                         [('2024', 'South', 2, 150.0), ('2024', 'West', 1, 200.0)])
+        rows = query_rollups(self.cursor, 'orders', group_by=['month'], filters={'sales_engineer': ['NEM']},
+                             period_from='2024-06')
+        self.assertEqual([(r['month'], r['contribution_value']) for r in rows], [('07', 20.0)])
+        with self.assertRaises(ValueError):
+            query_rollups(self.cursor, 'orders', group_by=['customer_name'])
+
+    def test_triggers_match_rebuild(self):
+        self.cursor.execute("UPDATE Orders SET region = 'West', order_value = 75 WHERE job_ref = 'J2'")
+        self.cursor.execute("DELETE FROM Orders WHERE job_ref = 'J1'")
+        self.cursor.execute('''
+            INSERT INTO Orders (job_ref, year, month, region, order_value) VALUES ('J3', '2024', 'Aug', 'North', 10)
+            ON CONFLICT(job_ref) DO UPDATE SET month = excluded.month, region = excluded.region
+        ''')
+        self.cursor.execute("INSERT INTO EnquiryRegister (year, month, region) VALUES ('2024', 'Mar', 'South')")
+        incremental = self._cube()
+        rebuild_rollups(self.cursor)
+        self.assertEqual(incremental, self._cube())
+        self.assertEqual(len(incremental), 3)
+
+if __name__ == '__main__':
+    unittest.main()
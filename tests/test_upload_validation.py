@@ -0,0 +1,78 @@
+import os
+import uuid
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+from services.upload_validation import diff_frames, validate_motor_prices, commit_staged_upload
+
+class TestUploadValidation(unittest.TestCase):
+    def test_diff_counts_and_removable(self):
+        new = pd.DataFrame({'job_ref': ['A', 'B', 'C'], 'year': [2019.0, 2020.0, 2021.0], 'qty': [1, 2, 3]})
+        current = pd.DataFrame({'job_ref': ['A', 'B', 'M', 'X'], 'year': ['2019', '2020', '2020', '2020'],
+                                'qty': [1, 5, 1, 1], '_removable': [True, True, False, True]})
+
+        diff, _ = diff_frames(new, current, 'job_ref', ['year', 'qty'], numeric_columns=['qty'])
+
+        self.assertEqual((diff['added'], diff['removed'], diff['changed'], diff['unchanged']), (1, 1, 1, 1))
+        self.assertEqual(diff['removed_keys'], ['X'])
+        self.assertEqual(diff['changes'], [{'key': 'B', 'changes': {'qty': {'old': 5, 'new': 2}}}])
+
+    def test_price_outliers_are_flagged(self):
+        row = {'Brand': 'ABB', 'Motor kW': 0.75, 'Pole': 4, 'Efficiency': 'IE2'}
+        current = pd.DataFrame([dict(row, Price=100.0), dict(row, Pole=2, Price=100.0)])
+        prices = pd.DataFrame([dict(row, Price=110.0), dict(row, Pole=2, Price=300.0)])
+
+        report = validate_motor_prices(prices, pd.DataFrame(columns=['reason', 'excel_row']), current)
+
+        self.assertEqual(report['diff']['changed'], 2)
+        self.assertEqual(report['price_change']['max_increase_pct'], 200.0)
+        self.assertEqual([w['count'] for w in report['warnings']], [1])
+        self.assertFalse(report['errors'])
+
+class TestStagedUploads(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {'UPLOAD_STAGING_DIR': self.tmp.name})
+        self.env.start()
+        self.token = uuid.uuid4().hex
+        self.path = os.path.join(self.tmp.name, self.token)
+        os.makedirs(self.path)
+        pd.DataFrame({'job_ref': ['A']}).to_pickle(os.path.join(self.path, 'orders.pkl'))
+        pd.DataFrame({'enquiry_number': ['E1']}).to_pickle(os.path.join(self.path, 'enquiries.pkl'))
+
+    def tearDown(self):
+        self.env.stop()
+        self.tmp.cleanup()
+
+    def test_second_confirm_is_refused_while_the_first_applies(self):
+        second = []
+
+        def apply_orders(df):
+            with self.assertRaises(ValueError):
+                commit_staged_upload(self.token, link_customers=False)
+            second.append(True)
+            return len(df)
+
+        with mock.patch('database.apply_orders', side_effect=apply_orders) as orders, \
+                mock.patch('database.apply_enquiries', return_value=1):
+            messages = commit_staged_upload(self.token, link_customers=False)
+        self.assertEqual(orders.call_count, 1)
+        self.assertEqual(second, [True])
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_failed_apply_keeps_the_upload_for_a_retry(self):
+        with mock.patch('database.apply_orders', return_value=1), \
+                mock.patch('database.apply_enquiries', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                commit_staged_upload(self.token, link_customers=False)
+        self.assertEqual(sorted(os.listdir(self.path)), ['enquiries.pkl', 'orders.pkl'])
+
+        with mock.patch('database.apply_orders', return_value=1), \
+                mock.patch('database.apply_enquiries', return_value=1):
+            commit_staged_upload(self.token, link_customers=False)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+if __name__ == '__main__':
+    unittest.main()